@@ -1,35 +1,75 @@
 """
 LOGODETH API - Metal Logo Recognition Engine
 """
-from fastapi import FastAPI
+import asyncio
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import logging
 from loguru import logger
 
 from backend.config import get_settings
-from backend.routers import recognition
-from backend.utils.logging import setup_logging
+from backend.routers import admin, recognition
+from backend.services.cache import close_redis_clients, prune_periodically
+from backend.services.health import get_health_monitor, start_health_monitor, stop_health_monitor
+from backend.services.jobs import JobQueue
+from backend.services.llm_client import close_llm_client, get_llm_client
+from backend.services.snapshot import warm_cache
+from backend.utils.logging import RequestContextMiddleware, setup_logging
+from backend.utils.loop_monitor import start_loop_monitor
+from backend.utils.metrics import METRICS_AVAILABLE, JOB_QUEUE_DEPTH, InFlightMiddleware, render_metrics
+from backend.utils.timing import ServerTimingMiddleware
+from backend.utils.traffic import start_traffic_capture, stop_traffic_capture
 
 # Get settings
 settings = get_settings()
 
-# Setup logging
-setup_logging(settings.log_level)
-
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
-    # Startup
+    # Startup. Per-process resources (log writer threads, provider clients)
+    # are created here rather than at import, so importing stays cheap and a
+    # preloading parent process does not fork them into its workers
+    setup_logging(settings.log_level, settings.log_format, settings.log_sample_threshold)
     logger.info("> LOGODETH API starting up...")
     logger.info(f"Debug mode: {settings.debug}")
     logger.info(f"Redis URL: {settings.redis_url}")
     
+    if settings.cache_warm_snapshot:
+        await warm_cache(settings.cache_warm_snapshot)
+    
+    loop_monitor = None
+    if settings.loop_lag_threshold:
+        loop_monitor = start_loop_monitor(settings.loop_lag_interval, settings.loop_lag_threshold)
+    
+    if settings.traffic_capture_dir:
+        # Only an explicitly set secret key is shared by all workers
+        key = settings.secret_key if "secret_key" in settings.model_fields_set else None
+        start_traffic_capture(settings.traffic_capture_dir, key, settings.traffic_capture_sample)
+    
+    # Serve right away; the provider SDKs load in the background
+    preload = asyncio.create_task(get_llm_client().preload())
+    start_health_monitor(settings.health_refresh_interval, settings.health_probe_interval)
+    pruner = None
+    if settings.cache_prune_interval:
+        pruner = asyncio.create_task(prune_periodically(settings.cache_prune_interval))
+    
     yield
     
     # Shutdown
     logger.info("=y LOGODETH API shutting down...")
+    if loop_monitor:
+        await loop_monitor.stop()
+    stop_traffic_capture()
+    await stop_health_monitor()
+    preload.cancel()
+    if pruner:
+        pruner.cancel()
+    await close_llm_client()
+    await close_redis_clients()
+    await logger.complete()
 
 
 # Create FastAPI app
@@ -48,14 +88,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Request-ID"],
 )
 
+if settings.server_timing or settings.traffic_capture_dir:
+    # Traffic capture records the stage timings even when the header is off
+    app.add_middleware(ServerTimingMiddleware, send_header=settings.server_timing)
+
+app.add_middleware(RequestContextMiddleware)
+
+if settings.metrics_enabled and METRICS_AVAILABLE:
+    app.add_middleware(InFlightMiddleware)
+
 # Include routers
 app.include_router(
     recognition.router,
     prefix="/api/v1",
     tags=["recognition"]
 )
+app.include_router(
+    admin.router,
+    prefix="/api/v1/admin",
+    tags=["admin"],
+    include_in_schema=False
+)
 
 # Health check endpoint
 @app.get("/", tags=["health"])
@@ -70,12 +126,30 @@ async def root():
 
 @app.get("/health", tags=["health"])
 async def health_check():
-    """Detailed health check"""
-    return {
-        "status": "healthy",
-        "checks": {
-            "api": "ok",
-            "redis": "ok",  # TODO: Implement actual Redis health check
-            "openai": "ok"  # TODO: Implement actual API health check
-        }
-    }
\ No newline at end of file
+    """
+    Health of Redis, the providers and the job queue
+    
+    Answered from memory; backend/services/health.py refreshes the report in
+    the background, so probing this often costs nothing.
+    """
+    monitor = get_health_monitor()
+    if monitor is None:
+        return {"status": "starting", "checks": {"api": "ok"}}
+    return Response(content=monitor.body, media_type="application/json")
+
+
+@app.get("/metrics", tags=["health"], include_in_schema=False)
+async def metrics():
+    """Prometheus metrics, aggregated across workers in multiprocess mode"""
+    if not (settings.metrics_enabled and METRICS_AVAILABLE):
+        return Response(status_code=404)
+    
+    try:
+        depth = await asyncio.wait_for(JobQueue().depth(), timeout=1)
+        for state, count in depth.items():
+            JOB_QUEUE_DEPTH.labels(state).set(count)
+    except Exception as e:
+        logger.debug(f"Could not read job queue depth: {e}")
+    
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
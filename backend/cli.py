@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+"""
+LOGODETH command-line tools
+
+Usage:
+    python -m backend.cli invalidate --older-than 30d --max-confidence 40
+    python -m backend.cli invalidate --all
+    python -m backend.cli export cache.jsonl.gz
+    python -m backend.cli import cache.jsonl.gz
+    python -m backend.cli ingest ./archive results.csv --concurrency 4
+"""
+import argparse
+import asyncio
+import re
+import sys
+
+from backend.services.cache import CacheService
+from backend.services.snapshot import export_snapshot, import_snapshot
+
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_duration(value: str) -> int:
+    """Parse a duration like 90, 30m, 12h or 7d into seconds"""
+    match = re.fullmatch(r"(\d+)([smhd]?)", value.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"Invalid duration: {value}")
+    return int(match.group(1)) * DURATION_UNITS[match.group(2) or "s"]
+
+
+async def invalidate(args: argparse.Namespace) -> int:
+    """Stream-delete cache entries matching the given filters"""
+    filters = {
+        "model_version": args.model_version,
+        "older_than": args.older_than,
+        "min_confidence": args.min_confidence,
+        "max_confidence": args.max_confidence,
+        "band_name": args.band_name,
+    }
+    if not args.all and all(value is None for value in filters.values()):
+        print("Refusing to delete every entry without --all", file=sys.stderr)
+        return 2
+
+    cache = CacheService()
+    progress = {"scanned": 0, "matched": 0, "deleted": 0}
+    try:
+        async for progress in cache.invalidate(chunk_size=args.chunk_size, pause=args.pause, **filters):
+            print(
+                f"\r   scanned {progress['scanned']:>9,}  matched {progress['matched']:>9,}  "
+                f"deleted {progress['deleted']:>9,}",
+                end="",
+                flush=True
+            )
+    finally:
+        await cache.close()
+
+    print(f"\n✅ Invalidated {progress['deleted']:,} cached logos")
+    return 0
+
+
+async def export(args: argparse.Namespace) -> int:
+    """Write every cached result to a snapshot file"""
+    cache = CacheService()
+    exported = 0
+    try:
+        async for exported in export_snapshot(cache, args.path, chunk_size=args.chunk_size):
+            print(f"\r   exported {exported:>9,}", end="", flush=True)
+    finally:
+        await cache.close()
+
+    print(f"\n✅ Exported {exported:,} cached logos to {args.path}")
+    return 0
+
+
+async def import_(args: argparse.Namespace) -> int:
+    """Load a snapshot file into the cache"""
+    cache = CacheService()
+    imported = 0
+    try:
+        async for imported in import_snapshot(cache, args.path, batch_size=args.batch_size, overwrite=args.overwrite):
+            print(f"\r   imported {imported:>9,}", end="", flush=True)
+    except (OSError, ValueError) as e:
+        print(f"\nCould not import {args.path}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        await cache.close()
+
+    print(f"\n✅ Imported {imported:,} cached logos from {args.path}")
+    return 0
+
+
+async def ingest(args: argparse.Namespace) -> int:
+    """Recognize every image in a directory or tarball"""
+    from backend.services.ingest import BulkIngest
+
+    def progress(report) -> None:
+        print(
+            f"\r   cached {report.cached:>7,}  recognized {report.recognized:>7,}  failed {report.failed:>6,}",
+            end="",
+            flush=True
+        )
+
+    try:
+        job = BulkIngest(
+            args.source,
+            args.output,
+            fmt=args.format,
+            concurrency=args.concurrency,
+            workers=args.workers,
+            resume=not args.restart,
+            retry_failed=args.retry_failed,
+            progress=progress
+        )
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    try:
+        report = await job.run()
+    finally:
+        await job.service.cache.close()
+
+    print(f"\n✅ Ingested {report.files:,} files ({report.unique_images:,} unique images to process, "
+          f"{report.resumed:,} done in earlier runs) in {report.total_seconds:.1f}s")
+    print(f"   hashing      {report.hash_seconds:.1f}s")
+    print(f"   cache hits   {report.cached:,} ({report.hit_ratio:.1%})")
+    print(f"   recognized   {report.recognized:,}")
+    print(f"   failed       {report.failed:,}")
+    print(f"   throughput   {report.throughput:.1f} images/s")
+    print(f"   est. cost    ${report.cost:.2f}")
+    print(f"   results      {args.output}")
+    return 1 if report.failed else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser"""
+    parser = argparse.ArgumentParser(prog="python -m backend.cli", description="LOGODETH maintenance tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    inv = commands.add_parser("invalidate", help="Delete cached results in chunks, optionally filtered")
+    inv.add_argument("--all", action="store_true", help="Delete every entry when no filter is given")
+    inv.add_argument("--model-version", help="Only entries produced with this model/prompt version")
+    inv.add_argument("--older-than", type=parse_duration, help="Only entries cached longer ago than this (e.g. 7d)")
+    inv.add_argument("--min-confidence", type=float, help="Only entries with at least this confidence")
+    inv.add_argument("--max-confidence", type=float, help="Only entries with at most this confidence")
+    inv.add_argument("--band-name", help="Only entries for this band (case-insensitive)")
+    inv.add_argument("--chunk-size", type=int, default=500, help="Keys per SCAN/UNLINK batch")
+    inv.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    inv.set_defaults(handler=invalidate)
+
+    exp = commands.add_parser("export", help="Write all cached results to a gzipped JSON-lines snapshot")
+    exp.add_argument("path", help="Snapshot file to create, e.g. cache.jsonl.gz")
+    exp.add_argument("--chunk-size", type=int, default=500, help="Keys per SCAN batch")
+    exp.set_defaults(handler=export)
+
+    imp = commands.add_parser("import", help="Load a snapshot into the cache")
+    imp.add_argument("path", help="Snapshot file written by export")
+    imp.add_argument("--batch-size", type=int, default=500, help="Entries per pipelined write")
+    imp.add_argument("--overwrite", action="store_true", help="Replace entries that already exist")
+    imp.set_defaults(handler=import_)
+
+    ing = commands.add_parser("ingest", help="Recognize every image in a directory or tarball")
+    ing.add_argument("source", help="Directory (searched recursively) or tarball, optionally compressed")
+    ing.add_argument("output", help="Results file; also used to resume an interrupted run")
+    ing.add_argument("--format", choices=["csv", "jsonl"], help="Results format (default: from the file extension)")
+    ing.add_argument("--concurrency", type=int, default=4, help="Provider calls in flight")
+    ing.add_argument("--workers", type=int, help="Hashing processes (default: CPU count)")
+    ing.add_argument("--restart", action="store_true", help="Ignore earlier progress and start over")
+    ing.add_argument("--retry-failed", action="store_true", help="When resuming, retry images that failed before")
+    ing.set_defaults(handler=ingest)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    """CLI entry point"""
+    args = build_parser().parse_args(argv)
+    return asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
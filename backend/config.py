@@ -26,13 +26,59 @@ class Settings(BaseSettings):
     # Redis Configuration
     redis_url: str = Field(default="redis://localhost:6379", description="Redis connection URL")
     redis_password: Optional[str] = Field(default=None, description="Redis password if required")
+    redis_cluster: bool = Field(default=False, description="Treat redis_url as a Redis Cluster node and hash-tag multi-key commands")
+    redis_replica_url: Optional[str] = Field(default=None, description="Read replica for cache lookups (standalone mode; cluster mode reads from replicas itself)")
+    redis_max_connections: int = Field(default=50, ge=1, le=10000, description="Connection pool size per worker (per node in cluster mode)")
+    redis_socket_timeout: float = Field(default=5.0, gt=0, le=60, description="Redis socket read/write timeout in seconds")
+    redis_connect_timeout: float = Field(default=5.0, gt=0, le=60, description="Redis connect timeout in seconds")
+    
+    # Redis outage handling
+    redis_circuit_failures: int = Field(default=3, ge=1, le=100, description="Consecutive Redis connection errors before cache calls fail fast")
+    redis_circuit_reset: int = Field(default=30, ge=1, le=3600, description="Seconds to fail fast before probing Redis again")
+    fallback_cache_path: Optional[str] = Field(default="/tmp/logodeth-fallback-cache.db", description="SQLite file used as cache while Redis is down (empty to disable)")
+    fallback_cache_max_entries: int = Field(default=10000, ge=100, le=1000000, description="Maximum entries kept in the local fallback cache")
+    
+    # Recognition job queue (POST /jobs, worker.py)
+    job_ttl: int = Field(default=86400, ge=60, le=604800, description="How long job records and results are kept in seconds")
+    job_max_attempts: int = Field(default=3, ge=1, le=20, description="Attempts before a job is moved to the dead-letter stream")
+    job_retry_delay: int = Field(default=30, ge=1, le=3600, description="Backoff before the first retry of a failed job in seconds")
+    job_visibility_timeout: int = Field(default=300, ge=30, le=86400, description="Seconds before a job held by an unresponsive worker is given to another")
+    job_worker_concurrency: int = Field(default=4, ge=1, le=100, description="Jobs processed concurrently per worker process")
+    job_stream_maxlen: int = Field(default=100000, ge=1000, description="Approximate cap on dead-letter stream length")
+    
+    # Cache warm-up
+    cache_warm_snapshot: Optional[str] = Field(default=None, description="Snapshot file imported at startup, before serving traffic")
     cache_ttl: int = Field(default=86400, ge=60, le=604800, description="Cache TTL in seconds (1min-7days)")
+    cache_min_ttl: int = Field(default=3600, ge=60, le=604800, description="TTL for low-confidence entries in seconds")
+    cache_max_ttl: int = Field(default=2592000, ge=60, le=7776000, description="Upper bound for TTLs extended by cache hits in seconds")
+    cache_layout: str = Field(default="string", pattern="^(string|bucketed)$", description="Cache storage layout: one key per entry, or entries grouped into hash buckets")
+    cache_bucket_prefix_length: int = Field(default=2, ge=1, le=4, description="Hex characters of the image hash used to pick a bucket (16^n buckets)")
+    cache_prune_interval: int = Field(default=60, ge=0, le=86400, description="Seconds between removals of expired entries from the cache indexes and buckets (0 disables)")
+    cache_low_confidence: float = Field(default=40.0, ge=0, le=100, description="Results below this confidence get cache_min_ttl")
     cache_max_keys: int = Field(default=10000, ge=100, description="Maximum number of cache keys")
     
+    # Background refresh of results from older model/prompt versions
+    refresh_concurrency: int = Field(default=2, ge=1, le=50, description="Max concurrent background refreshes per worker")
+    refresh_lock_ttl: int = Field(default=600, ge=10, le=86400, description="Seconds before a stale entry may be refreshed again")
+    
+    # Negative Caching (failed recognitions)
+    negative_cache_ttl: int = Field(default=3600, ge=60, le=86400, description="How long failure records are kept in seconds")
+    failure_backoff_base: int = Field(default=30, ge=1, le=3600, description="Retry backoff after the first failed recognition in seconds")
+    failure_backoff_max: int = Field(default=900, ge=1, le=86400, description="Maximum retry backoff for a failing image in seconds")
+    quarantine_after: int = Field(default=4, ge=1, le=100, description="Consecutive failures before an image is quarantined")
+    quarantine_ttl: int = Field(default=86400, ge=60, le=604800, description="How long a quarantined image is rejected in seconds")
+    
+    # Cache statistics
+    cache_stats_ttl: int = Field(default=10, ge=0, le=3600, description="Seconds /cache/stats responses are reused per worker")
+    
+    # HTTP Caching (cached result lookups)
+    http_cache_max_age: int = Field(default=3600, ge=0, le=604800, description="Browser max-age for cached result lookups in seconds")
+    http_cache_s_maxage: int = Field(default=86400, ge=0, le=2592000, description="CDN/proxy s-maxage for cached result lookups in seconds")
+    
     # API Configuration
     host: str = Field(default="0.0.0.0", description="API server host")
     port: int = Field(default=8000, ge=1000, le=65535, description="API server port")
-    api_rate_limit: int = Field(default=10, ge=1, le=1000, description="Requests per minute per IP")
+    api_rate_limit: int = Field(default=10, ge=1, le=100000, description="Requests per minute per IP")
     max_file_size: int = Field(default=10 * 1024 * 1024, ge=1024, le=50 * 1024 * 1024, description="Max file size in bytes")
     allowed_extensions: List[str] = Field(default=[".jpg", ".jpeg", ".png", ".gif", ".webp"], description="Allowed file extensions")
     
@@ -49,9 +95,22 @@ class Settings(BaseSettings):
     temperature: float = Field(default=0.1, ge=0.0, le=1.0, description="AI response temperature")
     ai_timeout: int = Field(default=60, ge=10, le=300, description="AI API timeout in seconds")
     
+    # Provider call scheduling (per worker process)
+    llm_max_concurrency: int = Field(default=8, ge=1, le=256, description="Max provider calls in flight per worker")
+    llm_reserved_interactive: int = Field(default=2, ge=0, le=64, description="Provider slots only interactive requests may use")
+    llm_weight_interactive: int = Field(default=8, ge=1, le=100, description="Fair-queuing weight of interactive uploads")
+    llm_weight_api: int = Field(default=4, ge=1, le=100, description="Fair-queuing weight of API jobs")
+    llm_weight_bulk: int = Field(default=1, ge=1, le=100, description="Fair-queuing weight of bulk ingest, bulk jobs and refreshes")
+    trust_tenant_header: bool = Field(default=False, description="Share provider capacity by the X-Tenant-ID header instead of the client address (only behind a proxy that sets it)")
+    
+    # Cost control (estimated provider spend per worker process)
+    daily_budget: float = Field(default=10.0, gt=0, description="Estimated provider spend per day in USD before uploads get 402")
+    monthly_budget: float = Field(default=100.0, gt=0, description="Estimated provider spend per month in USD before uploads get 402")
+    
     # Logging
     log_level: str = Field(default="INFO", pattern="^(DEBUG|INFO|WARNING|ERROR|CRITICAL)$", description="Log level")
     log_format: str = Field(default="json", pattern="^(json|text)$", description="Log format")
+    log_sample_threshold: int = Field(default=50, ge=0, le=100000, description="Requests per second above which per-request INFO logs are sampled (0 disables)")
     
     # Development Settings
     debug: bool = Field(default=False, description="Enable debug mode")
@@ -59,14 +118,27 @@ class Settings(BaseSettings):
     
     # Security
     secret_key: str = Field(default_factory=lambda: os.urandom(32).hex(), description="Secret key for sessions/JWT")
+    admin_token: Optional[str] = Field(default=None, description="Bearer token for /api/v1/admin endpoints (unset disables them)")
     
     # Monitoring & Analytics
     sentry_dsn: Optional[str] = Field(default=None, description="Sentry DSN for error tracking")
     posthog_api_key: Optional[str] = Field(default=None, description="PostHog API key for analytics")
+    metrics_enabled: bool = Field(default=True, description="Serve Prometheus metrics at /metrics (needs prometheus_client)")
+    server_timing: bool = Field(default=True, description="Report stage timings in a Server-Timing header and recognition responses")
+    loop_lag_interval: float = Field(default=0.1, ge=0.01, le=10, description="Seconds between event loop lag samples")
+    loop_lag_threshold: float = Field(default=0.25, ge=0, le=60, description="Loop lag in seconds that logs the blocking stack (0 disables the monitor)")
+    traffic_capture_dir: Optional[str] = Field(default=None, description="Directory for request traces used by tests/load/replay.py (unset disables capture)")
+    traffic_capture_sample: float = Field(default=1.0, gt=0, le=1, description="Share of images whose requests are traced")
+    health_refresh_interval: float = Field(default=5, ge=0.5, le=300, description="Seconds between background refreshes of the state /health reports")
+    health_window: int = Field(default=300, ge=10, le=86400, description="Seconds of real provider calls that provider health is judged on")
+    health_probe_interval: int = Field(default=900, ge=0, description="Seconds without provider calls after which a free model-list request checks the provider (0 disables)")
     
-    # Performance
-    worker_count: int = Field(default=1, ge=1, le=10, description="Number of worker processes")
-    worker_timeout: int = Field(default=300, ge=30, le=3600, description="Worker timeout in seconds")
+    # Performance (python -m backend.server)
+    worker_count: Optional[int] = Field(default=None, ge=1, le=64, description="Number of worker processes (unset: one per available CPU)")
+    worker_timeout: int = Field(default=300, ge=30, le=3600, description="Seconds before an unresponsive worker is restarted, and the grace period for shutdowns")
+    worker_max_requests: int = Field(default=10000, ge=0, description="Requests after which a worker is gracefully replaced (0 disables)")
+    worker_max_memory_mb: int = Field(default=1024, ge=0, description="Resident memory in MB above which a worker is gracefully replaced (0 disables)")
+    worker_preload: bool = Field(default=True, description="Load the app and provider SDKs once before forking workers, sharing their memory")
     
     @validator('environment')
     def validate_environment(cls, v):
@@ -75,9 +147,9 @@ class Settings(BaseSettings):
             raise ValueError(f'Environment must be one of: {", ".join(allowed)}')
         return v
     
-    @validator('redis_url')
+    @validator('redis_url', 'redis_replica_url')
     def validate_redis_url(cls, v):
-        if not v.startswith(('redis://', 'rediss://')):
+        if v is not None and not v.startswith(('redis://', 'rediss://')):
             raise ValueError('Redis URL must start with redis:// or rediss://')
         return v
     
@@ -115,9 +187,10 @@ class Settings(BaseSettings):
         config = {
             "url": self.redis_url,
             "decode_responses": True,
-            "socket_connect_timeout": 5,
-            "socket_timeout": 5,
-            "retry_on_timeout": True
+            "socket_connect_timeout": self.redis_connect_timeout,
+            "socket_timeout": self.redis_socket_timeout,
+            "retry_on_timeout": True,
+            "max_connections": self.redis_max_connections
         }
         if self.redis_password:
             config["password"] = self.redis_password
@@ -171,6 +244,12 @@ LOGODETH_ANTHROPIC_API_KEY=sk-ant-REDACTED
 # Redis Configuration
 LOGODETH_REDIS_URL=redis://localhost:6379
 LOGODETH_REDIS_PASSWORD=
+LOGODETH_REDIS_CLUSTER=false
+# LOGODETH_REDIS_REPLICA_URL=redis://localhost:6380
+LOGODETH_REDIS_MAX_CONNECTIONS=50
+LOGODETH_REDIS_CIRCUIT_FAILURES=3
+LOGODETH_REDIS_CIRCUIT_RESET=30
+LOGODETH_FALLBACK_CACHE_PATH=/tmp/logodeth-fallback-cache.db
 
 # API Configuration
 LOGODETH_HOST=0.0.0.0
@@ -184,21 +263,55 @@ LOGODETH_OPENAI_MODEL=gpt-4o
 LOGODETH_ANTHROPIC_MODEL=claude-3-5-sonnet-20241022
 LOGODETH_MAX_TOKENS=300
 LOGODETH_TEMPERATURE=0.1
+LOGODETH_LLM_MAX_CONCURRENCY=8
+LOGODETH_LLM_RESERVED_INTERACTIVE=2
+# Only behind a proxy that sets X-Tenant-ID and strips it from client requests
+LOGODETH_TRUST_TENANT_HEADER=false
+LOGODETH_DAILY_BUDGET=10.0
+LOGODETH_MONTHLY_BUDGET=100.0
 
 # Caching
 LOGODETH_CACHE_TTL=86400
+LOGODETH_CACHE_MIN_TTL=3600
+LOGODETH_CACHE_MAX_TTL=2592000
+LOGODETH_CACHE_LOW_CONFIDENCE=40
+LOGODETH_CACHE_LAYOUT=string
+LOGODETH_CACHE_PRUNE_INTERVAL=60
+LOGODETH_NEGATIVE_CACHE_TTL=3600
+LOGODETH_QUARANTINE_AFTER=4
 LOGODETH_CACHE_MAX_KEYS=10000
 
+# Server processes (python -m backend.server)
+# LOGODETH_WORKER_COUNT=4
+LOGODETH_WORKER_TIMEOUT=300
+LOGODETH_WORKER_MAX_REQUESTS=10000
+LOGODETH_WORKER_MAX_MEMORY_MB=1024
+LOGODETH_WORKER_PRELOAD=true
+
 # Logging
 LOGODETH_LOG_LEVEL=INFO
 LOGODETH_LOG_FORMAT=json
+LOGODETH_LOG_SAMPLE_THRESHOLD=50
 
 # Optional: Monitoring
 LOGODETH_SENTRY_DSN=
 LOGODETH_POSTHOG_API_KEY=
+LOGODETH_METRICS_ENABLED=true
+LOGODETH_SERVER_TIMING=true
+# Required for /metrics with several gunicorn workers (an empty, writable directory)
+# PROMETHEUS_MULTIPROC_DIR=/tmp/logodeth-metrics
+# Privacy-safe request traces for replay (set LOGODETH_SECRET_KEY so all workers share image ids)
+# LOGODETH_TRAFFIC_CAPTURE_DIR=logs/traffic
+LOGODETH_TRAFFIC_CAPTURE_SAMPLE=1.0
+# /health is answered from state refreshed in the background; idle providers get a free probe
+LOGODETH_HEALTH_REFRESH_INTERVAL=5
+LOGODETH_HEALTH_WINDOW=300
+LOGODETH_HEALTH_PROBE_INTERVAL=900
 
 # Security
 LOGODETH_SECRET_KEY=your-secret-key-here
+# Enables the profiling endpoints under /api/v1/admin
+LOGODETH_ADMIN_TOKEN=
 '''
     return template
 
@@ -2,7 +2,7 @@
 Data models for logo recognition
 """
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 
 
@@ -15,6 +15,7 @@ class RecognitionResult(BaseModel):
     ai_model: str = Field(..., description="AI model used for recognition")
     cached: bool = Field(False, description="Whether result was from cache")
     processing_time: float = Field(..., description="Processing time in seconds")
+    timings: Optional[Dict[str, float]] = Field(None, description="Milliseconds per stage of this request, as in the Server-Timing header")
     timestamp: datetime = Field(default_factory=datetime.now)
 
 
@@ -25,6 +26,17 @@ class RecognitionError(BaseModel):
     detail: Optional[str] = Field(None, description="Additional details")
 
 
+class JobStatus(BaseModel):
+    """Asynchronous recognition job"""
+    job_id: str = Field(..., description="Job id")
+    status: str = Field(..., description="queued, processing, completed or failed")
+    attempts: int = Field(0, description="Recognition attempts made so far")
+    created_at: datetime = Field(..., description="When the job was submitted")
+    updated_at: datetime = Field(..., description="When the status last changed")
+    result: Optional[RecognitionResult] = Field(None, description="Result once completed")
+    error: Optional[str] = Field(None, description="Last error, if any")
+
+
 class HealthStatus(BaseModel):
     """Health check status"""
     status: str
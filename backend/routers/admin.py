@@ -0,0 +1,158 @@
+"""
+Diagnostics endpoints for a running worker
+
+Each request is served by whichever worker process receives it; the
+X-Worker-PID response header says which one was profiled.
+"""
+import asyncio
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import tempfile
+import time
+import tracemalloc
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response
+from loguru import logger
+
+from backend.config import get_settings
+from backend.services.cache import CacheService
+from backend.utils.loop_monitor import get_loop_monitor
+
+router = APIRouter()
+
+# One capture at a time per worker; profilers are process-wide
+_capture_lock = asyncio.Lock()
+
+
+def require_admin(request: Request) -> None:
+    """Dependency rejecting requests without the admin bearer token"""
+    token = get_settings().admin_token
+    if not token:
+        # Not configured: behave as if the endpoints did not exist
+        raise HTTPException(status_code=404, detail={"error": "not_found", "message": "Not Found"})
+
+    supplied = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+        raise HTTPException(
+            status_code=401,
+            detail={"error": "unauthorized", "message": "A valid admin token is required"},
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+def _check_capture_free() -> None:
+    """Fail fast instead of queueing a second capture behind a running one"""
+    if _capture_lock.locked():
+        raise HTTPException(
+            status_code=409,
+            detail={"error": "capture_in_progress", "message": "A profile is already being captured on this worker"}
+        )
+
+
+def _attachment(content: bytes, filename: str, media_type: str) -> Response:
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Worker-PID": str(os.getpid()),
+        }
+    )
+
+
+@router.get("/loop", summary="Event loop lag of this worker")
+async def loop_lag(_: None = Depends(require_admin)):
+    """Max and p99 loop lag over the last minute, and stalls logged since startup"""
+    monitor = get_loop_monitor()
+    if monitor is None:
+        return {"enabled": False, "pid": os.getpid()}
+    stats = monitor.stats()
+    return {
+        "enabled": True,
+        "pid": os.getpid(),
+        "max_ms": round(stats["max"] * 1000, 1),
+        "p99_ms": round(stats["p99"] * 1000, 1),
+        "stalls": monitor.stalls,
+    }
+
+
+@router.get("/cache/stats", summary="Cache statistics with Redis server details")
+async def cache_stats(_: None = Depends(require_admin)):
+    """/cache/stats plus Redis memory and client counts, or the full error while Redis is down"""
+    return await CacheService().get_stats()
+
+
+@router.post("/profile/cpu", summary="Capture a CPU profile")
+async def profile_cpu(
+    seconds: float = Query(10, gt=0, le=60, description="How long to profile"),
+    format: str = Query("pstats", pattern="^(pstats|text)$", description="pstats file, or a text report"),
+    _: None = Depends(require_admin)
+) -> Response:
+    """
+    Profile everything the event loop runs for a number of seconds
+
+    The pstats file opens with `python -m pstats`, snakeviz or similar tools.
+    Work done in thread pools is not included.
+    """
+    _check_capture_free()
+    async with _capture_lock:
+        logger.info(f"Capturing a {seconds}s CPU profile")
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+
+    name = f"logodeth-cpu-{os.getpid()}-{int(time.time())}"
+    if format == "text":
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(60)
+        return _attachment(out.getvalue().encode(), f"{name}.txt", "text/plain")
+
+    with tempfile.NamedTemporaryFile(suffix=".prof") as f:
+        profiler.dump_stats(f.name)
+        return _attachment(f.read(), f"{name}.prof", "application/octet-stream")
+
+
+@router.post("/profile/memory", summary="Capture a tracemalloc snapshot")
+async def profile_memory(
+    seconds: float = Query(10, gt=0, le=300, description="How long to trace allocations"),
+    frames: int = Query(10, ge=1, le=50, description="Stack frames kept per allocation"),
+    format: str = Query("snapshot", pattern="^(snapshot|text)$", description="tracemalloc snapshot, or a text report"),
+    _: None = Depends(require_admin)
+) -> Response:
+    """
+    Trace allocations for a number of seconds and return those still alive
+
+    The snapshot file loads with tracemalloc.Snapshot.load(). Tracing slows
+    the worker down noticeably while it runs.
+    """
+    _check_capture_free()
+    async with _capture_lock:
+        started_here = not tracemalloc.is_tracing()
+        if started_here:
+            tracemalloc.start(frames)
+        logger.info(f"Tracing allocations for {seconds}s")
+        try:
+            await asyncio.sleep(seconds)
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            if started_here:
+                tracemalloc.stop()
+
+    name = f"logodeth-memory-{os.getpid()}-{int(time.time())}"
+    if format == "text":
+        stats = snapshot.statistics("lineno")
+        total = sum(stat.size for stat in stats)
+        lines = [f"{total / 1024:.1f} KiB in {len(stats)} locations, top 50:"]
+        lines += [str(stat) for stat in stats[:50]]
+        return _attachment("\n".join(lines).encode(), f"{name}.txt", "text/plain")
+
+    with tempfile.NamedTemporaryFile(suffix=".tracemalloc") as f:
+        snapshot.dump(f.name)
+        return _attachment(f.read(), f"{name}.tracemalloc", "application/octet-stream")
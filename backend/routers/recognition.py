@@ -1,56 +1,74 @@
 """
 Logo recognition API endpoints
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Request
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from typing import Optional
+import asyncio
+import json
+import re
 import time
 from loguru import logger
 
 from backend.config import get_settings
-from backend.models.recognition import RecognitionResult, RecognitionError
+from backend.models.recognition import RecognitionResult, RecognitionError, JobStatus
+from backend.services.jobs import JobQueue
 from backend.services.recognition import RecognitionService
+from backend.services.scheduler import get_scheduler
 from backend.utils.validators import validate_image_file
 from backend.utils.rate_limiter import rate_limiter, cost_tracker
+from backend.utils.http_cache import cache_headers, etag_matches
+from backend.utils.metrics import REJECTIONS
+from backend.utils.timing import current_timings
+from backend.utils.traffic import capture_traffic
 
 router = APIRouter()
 settings = get_settings()
 
+# Lowercase hex SHA-256, as produced by ImageHasher and the web frontend
+IMAGE_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+# Last /cache/stats result per worker, as (computed_at, stats)
+_cache_stats: tuple = (0.0, None)
+
+# Redis server details, served only by the admin endpoint /api/v1/admin/cache/stats
+REDIS_DETAIL_FIELDS = ("redis_memory_used", "redis_connected_clients")
+
 
 def get_recognition_service() -> RecognitionService:
     """Dependency to get recognition service"""
     return RecognitionService()
 
 
-@router.post(
-    "/recognize",
-    response_model=RecognitionResult,
-    responses={
-        400: {"model": RecognitionError, "description": "Invalid input"},
-        413: {"model": RecognitionError, "description": "File too large"},
-        500: {"model": RecognitionError, "description": "Internal server error"}
-    },
-    summary="Recognize metal band logo",
-    description="Upload a metal band logo image and get the band name using AI"
-)
-async def recognize_logo(
-    request: Request,
-    file: UploadFile = File(..., description="Logo image file"),
-    service: RecognitionService = Depends(get_recognition_service)
-) -> RecognitionResult:
+def get_job_queue() -> JobQueue:
+    """Dependency to get the job queue"""
+    return JobQueue()
+
+
+def get_tenant(request: Request) -> str:
     """
-    Recognize a metal band logo using multimodal AI.
-    
-    Supports formats: JPG, PNG, GIF, WebP
-    Max file size: 10MB
+    Caller that provider capacity is shared fairly across
+
+    The client address, or X-Tenant-ID when trust_tenant_header says a proxy
+    in front of the API sets it; otherwise any caller could pick a fresh
+    tenant per request and claim an extra fair share each time.
     """
-    start_time = time.time()
-    
+    if settings.trust_tenant_header:
+        tenant = request.headers.get("X-Tenant-ID", "")[:64]
+        if tenant:
+            return tenant
+    return request.client.host
+
+
+async def check_request_limits(request: Request, original_hash: Optional[str]) -> None:
+    """Apply the rate limit, budget limit and original_hash checks for uploads"""
     # Check rate limit
     client_ip = request.client.host
     allowed, wait_seconds = await rate_limiter.check_rate_limit(client_ip)
     
     if not allowed:
+        REJECTIONS.labels("rate_limit").inc()
         raise HTTPException(
             status_code=429,
             detail={
@@ -62,9 +80,13 @@ async def recognize_logo(
         )
     
     # Check budget limits (optional)
-    within_budget, reason = await cost_tracker.check_budget_limit()
+    within_budget, reason = await cost_tracker.check_budget_limit(
+        daily_limit=settings.daily_budget,
+        monthly_limit=settings.monthly_budget
+    )
     if not within_budget:
         logger.warning(f"Budget limit exceeded: {reason}")
+        REJECTIONS.labels("budget").inc()
         raise HTTPException(
             status_code=402,
             detail={
@@ -74,56 +96,272 @@ async def recognize_logo(
             }
         )
     
-    try:
-        # Validate file
-        await validate_image_file(file, settings)
-        
-        # Read file content
-        content = await file.read()
-        
-        # Process recognition
-        logger.info(f"Processing logo recognition for file: {file.filename}")
-        result = await service.recognize_logo(content, file.filename)
-        
-        # Add processing time
-        result.processing_time = time.time() - start_time
-        
-        logger.info(f"Recognition completed in {result.processing_time:.2f}s")
-        return result
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Recognition failed: {str(e)}")
+    if original_hash is not None and not IMAGE_HASH_PATTERN.match(original_hash):
         raise HTTPException(
-            status_code=500,
-            detail={"error": "recognition_failed", "message": str(e)}
+            status_code=400,
+            detail={
+                "error": "invalid_original_hash",
+                "message": "original_hash must be a lowercase hex SHA-256 digest"
+            }
         )
-    finally:
-        # Clean up
-        await file.close()
 
 
-@router.get(
+@router.post(
+    "/recognize",
+    response_model=RecognitionResult,
+    responses={
+        400: {"model": RecognitionError, "description": "Invalid input"},
+        413: {"model": RecognitionError, "description": "File too large"},
+        422: {"model": RecognitionError, "description": "Image quarantined after repeated failures"},
+        500: {"model": RecognitionError, "description": "Internal server error"},
+        503: {"model": RecognitionError, "description": "Image failed recently, retry after backoff"}
+    },
+    summary="Recognize metal band logo",
+    description="Upload a metal band logo image and get the band name using AI"
+)
+async def recognize_logo(
+    request: Request,
+    file: UploadFile = File(..., description="Logo image file"),
+    original_hash: Optional[str] = Form(
+        None,
+        description="SHA-256 of the original file when the client downscaled it before upload"
+    ),
+    service: RecognitionService = Depends(get_recognition_service)
+) -> RecognitionResult:
+    """
+    Recognize a metal band logo using multimodal AI.
+    
+    Supports formats: JPG, PNG, GIF, WebP
+    Max file size: 10MB
+    """
+    start_time = time.time()
+    timings = current_timings()
+    if timings:
+        # The multipart body has been received and parsed by now
+        timings.mark("upload")
+    
+    with capture_traffic("upload", size=file.size) as traffic:
+        await check_request_limits(request, original_hash)
+        
+        try:
+            # Validate file
+            await validate_image_file(file, settings)
+            
+            # Read file content
+            content = await file.read()
+            image_hash = service.hash_image(content)
+            traffic.set_image(len(content), image_hash)
+            
+            # Process recognition
+            logger.info(f"Processing logo recognition for file: {file.filename}")
+            result = await service.recognize_logo(
+                content,
+                file.filename,
+                original_hash=original_hash,
+                priority="interactive",
+                tenant=get_tenant(request),
+                image_hash=image_hash
+            )
+            
+            # Add processing time
+            result.processing_time = time.time() - start_time
+            if timings:
+                result.timings = timings.as_dict()
+            
+            logger.info(f"Recognition completed in {result.processing_time:.2f}s")
+            traffic.outcome, traffic.status = ("hit" if result.cached else "miss"), 200
+            return result
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Recognition failed: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail={"error": "recognition_failed", "message": str(e)}
+            )
+        finally:
+            # Clean up
+            await file.close()
+
+
+@router.api_route(
     "/recognize/{image_hash}",
+    methods=["GET", "HEAD"],
     response_model=RecognitionResult,
+    responses={
+        304: {"description": "Not modified (If-None-Match matched the current ETag)"},
+        404: {"model": RecognitionError, "description": "No cached result"}
+    },
     summary="Get cached recognition result",
-    description="Retrieve a previously cached recognition result by image hash"
+    description="Retrieve a previously cached recognition result by image hash. "
+                "Supports ETag revalidation via If-None-Match and HEAD requests."
 )
 async def get_cached_result(
     image_hash: str,
+    request: Request,
     service: RecognitionService = Depends(get_recognition_service)
-) -> RecognitionResult:
+):
     """Get cached recognition result by image hash"""
-    result = await service.get_cached_result(image_hash)
+    with capture_traffic("lookup") as traffic:
+        traffic.image_hash = image_hash.lower()
+        entry = await service.get_cached_entry(image_hash.lower())
+        
+        # A result from an older model or prompt is a miss here, so the client
+        # uploads the image and the upload refreshes the entry
+        if not entry or not service.is_current(entry):
+            raise HTTPException(
+                status_code=404,
+                detail={"error": "not_found", "message": "No cached result found"},
+                # Misses must not be cached: the result may appear right after an upload
+                headers={"Cache-Control": "no-store"}
+            )
+        
+        headers = cache_headers(entry, settings)
+        
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            traffic.outcome, traffic.status = "not_modified", 304
+            return Response(status_code=304, headers=headers)
+        
+        result = service.result_from_entry(entry)
+        traffic.outcome, traffic.status = "hit", 200
+        return JSONResponse(content=jsonable_encoder(result), headers=headers)
+
+
+@router.post(
+    "/jobs",
+    status_code=202,
+    response_model=JobStatus,
+    responses={
+        400: {"model": RecognitionError, "description": "Invalid input"},
+        413: {"model": RecognitionError, "description": "File too large"},
+        503: {"model": RecognitionError, "description": "Job queue unavailable"}
+    },
+    summary="Submit a recognition job",
+    description="Queue a logo for recognition and return a job id straight away. "
+                "Poll GET /jobs/{job_id} or stream GET /jobs/{job_id}/events for the result."
+)
+async def submit_job(
+    request: Request,
+    file: UploadFile = File(..., description="Logo image file"),
+    original_hash: Optional[str] = Form(
+        None,
+        description="SHA-256 of the original file when the client downscaled it before upload"
+    ),
+    priority: str = Form(
+        "api",
+        description="Scheduling class: api, or bulk for backfills that may wait behind other traffic"
+    ),
+    service: RecognitionService = Depends(get_recognition_service),
+    queue: JobQueue = Depends(get_job_queue)
+) -> JSONResponse:
+    """Submit an asynchronous recognition job"""
+    await check_request_limits(request, original_hash)
+    
+    if priority not in ("api", "bulk"):
+        raise HTTPException(
+            status_code=400,
+            detail={"error": "invalid_priority", "message": "priority must be api or bulk"}
+        )
+    
+    try:
+        await validate_image_file(file, settings)
+        content = await file.read()
+    finally:
+        await file.close()
+    
+    # Cached images complete immediately and never reach a worker
+    cached = None
+    for key in (original_hash, service.cache.hasher.hash_image(content)):
+        entry = await service.get_cached_entry(key) if key else None
+        if entry:
+            cached = service.result_from_entry(entry)
+            break
+    
+    try:
+        job_id = await queue.submit(
+            content,
+            file.filename,
+            original_hash=original_hash,
+            result=cached,
+            priority=priority,
+            tenant=get_tenant(request)
+        )
+        job = await queue.get(job_id)
+    except Exception as e:
+        logger.error(f"Job submission failed: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail={"error": "queue_unavailable", "message": "Could not queue the job, please retry"}
+        )
     
-    if not result:
+    return JSONResponse(
+        status_code=202,
+        content=jsonable_encoder(JobStatus(**job)),
+        headers={"Location": str(request.url_for("get_job", job_id=job_id))}
+    )
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=JobStatus,
+    responses={404: {"model": RecognitionError, "description": "Unknown or expired job"}},
+    summary="Get a recognition job",
+    description="Get a job's status and result. With wait=N the request is held for up to N seconds "
+                "until the job completes or fails (long polling)."
+)
+async def get_job(
+    job_id: str,
+    wait: float = 0,
+    queue: JobQueue = Depends(get_job_queue)
+) -> JobStatus:
+    """Get a recognition job, optionally waiting for it to finish"""
+    job = await queue.wait(job_id, timeout=min(max(wait, 0), 30))
+    if job is None:
         raise HTTPException(
             status_code=404,
-            detail={"error": "not_found", "message": "No cached result found"}
+            detail={"error": "job_not_found", "message": "Unknown or expired job"}
         )
+    return JobStatus(**job)
+
+
+@router.get(
+    "/jobs/{job_id}/events",
+    responses={404: {"model": RecognitionError, "description": "Unknown or expired job"}},
+    summary="Stream a recognition job",
+    description="Server-sent events with the job's status, until it completes or fails."
+)
+async def stream_job(
+    job_id: str,
+    queue: JobQueue = Depends(get_job_queue)
+) -> StreamingResponse:
+    """Stream a job's status changes as server-sent events"""
+    job = await queue.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail={"error": "job_not_found", "message": "Unknown or expired job"}
+        )
+    
+    async def events():
+        current = job
+        last_update = None
+        deadline = time.monotonic() + settings.job_visibility_timeout
+        while current is not None:
+            if current["updated_at"] != last_update:
+                last_update = current["updated_at"]
+                payload = jsonable_encoder(JobStatus(**current))
+                yield f"event: {current['status']}\ndata: {json.dumps(payload)}\n\n"
+            if current["status"] in JobQueue.FINAL or time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(1)
+            current = await queue.get(job_id)
     
-    return result
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.get(
@@ -144,11 +382,41 @@ async def get_usage_stats():
         },
         "limits": {
             "rate_limit": f"{settings.api_rate_limit} requests/minute",
-            "daily_budget": "$10.00",
-            "monthly_budget": "$100.00"
+            "daily_budget": f"${settings.daily_budget:.2f}",
+            "monthly_budget": f"${settings.monthly_budget:.2f}"
         },
         "cache_info": {
             "ttl": f"{settings.cache_ttl} seconds",
             "type": "Redis"
-        }
-    }
\ No newline at end of file
+        },
+        "scheduler": get_scheduler().stats()
+    }
+
+
+@router.get(
+    "/cache/stats",
+    summary="Get cache statistics",
+    description="Get cache size, entry ages and hit rate. Results are reused for a few seconds."
+)
+async def get_cache_stats(
+    service: RecognitionService = Depends(get_recognition_service)
+):
+    """Get cache statistics"""
+    global _cache_stats
+    
+    computed_at, stats = _cache_stats
+    if stats is None or time.time() - computed_at >= settings.cache_stats_ttl:
+        stats = await service.cache.get_stats()
+        if "error" not in stats:
+            _cache_stats = (time.time(), stats)
+    
+    if "error" in stats:
+        # Error messages can name Redis hosts
+        public = {"error": "Redis unavailable", "circuit": stats.get("circuit")}
+    else:
+        public = {name: value for name, value in stats.items() if name not in REDIS_DETAIL_FIELDS}
+    
+    return JSONResponse(
+        content=public,
+        headers={"Cache-Control": f"private, max-age={settings.cache_stats_ttl}"}
+    )
@@ -0,0 +1,156 @@
+"""
+Production entry point: python -m backend.server
+
+Runs the API under gunicorn with uvicorn workers, configured from Settings
+by gunicorn.conf.py:
+
+- worker_count workers, or one per available CPU when unset
+- uvloop and httptools, whenever they are installed
+- the app, and the provider SDKs, loaded once in the parent process and
+  shared by the forked workers (worker_preload)
+- workers replaced gracefully after worker_max_requests requests, or when
+  their memory passes worker_max_memory_mb
+
+Extra arguments are passed to gunicorn. Where gunicorn is unavailable
+(Windows) a plain uvicorn process is started instead.
+"""
+import math
+import os
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+from backend.config import get_settings
+
+APP = "backend.app:app"
+CONFIG_PATH = Path(__file__).resolve().parents[1] / "gunicorn.conf.py"
+MEMORY_CHECK_INTERVAL = 10
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+
+def cgroup_cpu_quota(root: Path = CGROUP_ROOT) -> Optional[float]:
+    """CPUs allowed by the cgroup (v2, else v1) CPU quota, or None if unlimited or unknown"""
+    try:
+        # "max 100000" when unlimited, "200000 100000" for two CPUs
+        quota, period = (root / "cpu.max").read_text().split()
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+
+    try:
+        # -1 when unlimited
+        quota = int((root / "cpu" / "cpu.cfs_quota_us").read_text())
+        period = int((root / "cpu" / "cpu.cfs_period_us").read_text())
+        return None if quota <= 0 or period <= 0 else quota / period
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus() -> int:
+    """CPUs this process may use, honouring affinity and a cgroup CPU quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = cgroup_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+def worker_count(settings=None) -> int:
+    """Configured worker count, or one worker per available CPU"""
+    settings = settings or get_settings()
+    return settings.worker_count or available_cpus()
+
+
+def bind_address(settings=None) -> str:
+    """Host and port to listen on; PORT (set by Railway and similar) wins"""
+    settings = settings or get_settings()
+    return f"{settings.host}:{os.environ.get('PORT', settings.port)}"
+
+
+def rss_mb() -> Optional[float]:
+    """Resident memory of this process in MB, where /proc is available"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def start_memory_watchdog(limit_mb: int, interval: float = MEMORY_CHECK_INTERVAL) -> Optional[threading.Thread]:
+    """
+    Ask this worker to shut down gracefully once its memory passes limit_mb
+
+    SIGTERM makes a uvicorn worker stop accepting connections and finish
+    the requests in flight; gunicorn then starts a replacement.
+
+    Returns:
+        The watchdog thread, or None if memory cannot be measured here
+    """
+    if rss_mb() is None:
+        logger.warning("Memory-based worker recycling is not supported on this platform")
+        return None
+
+    def watch():
+        while True:
+            time.sleep(interval)
+            rss = rss_mb()
+            if rss is not None and rss > limit_mb:
+                logger.warning(f"Worker {os.getpid()} uses {rss:.0f}MB (limit {limit_mb}MB), restarting it")
+                os.kill(os.getpid(), signal.SIGTERM)
+                return
+
+    thread = threading.Thread(target=watch, name="memory-watchdog", daemon=True)
+    thread.start()
+    return thread
+
+
+def preload_shared_state() -> None:
+    """Import what every worker needs before forking, so the memory is shared"""
+    import anthropic  # noqa: F401
+    import magic  # noqa: F401
+    import openai  # noqa: F401
+
+
+def run_uvicorn() -> None:
+    """Fallback without gunicorn: one uvicorn process, no memory-based recycling"""
+    import uvicorn
+
+    settings = get_settings()
+    host, port = bind_address(settings).rsplit(":", 1)
+    uvicorn.run(
+        APP,
+        host=host,
+        port=int(port),
+        loop="auto",
+        http="auto",
+        timeout_keep_alive=5,
+        limit_max_requests=settings.worker_max_requests or None,
+        log_level=settings.log_level.lower()
+    )
+
+
+def main() -> None:
+    """Start the production server"""
+    try:
+        from gunicorn.app.wsgiapp import run
+    except ImportError:
+        logger.warning("gunicorn is not installed, starting a single uvicorn process")
+        run_uvicorn()
+        return
+
+    sys.argv = [sys.argv[0], "--config", str(CONFIG_PATH), *sys.argv[1:]]
+    run()
+
+
+if __name__ == "__main__":
+    main()
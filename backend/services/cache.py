@@ -1,14 +1,24 @@
 """
 Redis cache service for recognition results
 """
-import json
+import asyncio
 import hashlib
-from typing import Optional, Dict, Any
+import os
+import sqlite3
+import time
+from collections import Counter
+from typing import Optional, Dict, Any, AsyncIterator, List, Tuple
 import redis.asyncio as redis
+from redis.asyncio.cluster import RedisCluster
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
 from loguru import logger
 from datetime import datetime, timedelta
 
 from backend.config import get_settings
+from backend.services.cache_layouts import StringLayout, BucketedLayout, version_tag
+from backend.services.fallback_cache import FallbackStore
+from backend.utils.circuit_breaker import CircuitBreaker
+from backend.utils.metrics import CACHE_EVENTS, timed
 
 
 class ImageHasher:
@@ -50,6 +60,99 @@ class ImageHasher:
         return image_hash
 
 
+# Counter increments waiting to ride along with this worker's next pipeline
+_pending_counters: Counter = Counter()
+# Hits on entries, by cache key, likewise
+_pending_hits: Counter = Counter()
+
+# Redis clients shared by every CacheService in this worker, by role
+_clients: Dict[str, Any] = {}
+
+
+def get_redis_client(role: str = "primary"):
+    """
+    Get this worker's shared Redis client
+    
+    Services are created per request, so clients (and their connection
+    pools) live at module level instead. Pool size and timeouts come from
+    Settings.get_redis_config.
+    
+    Args:
+        role: "primary" for writes, "replica" for lookups
+        
+    Returns:
+        Redis or RedisCluster client; the primary when no replica is configured
+    """
+    settings = get_settings()
+    if role == "replica" and (settings.redis_cluster or not settings.redis_replica_url):
+        # A cluster client routes reads to replicas by itself
+        role = "primary"
+    
+    if role not in _clients:
+        config = settings.get_redis_config()
+        url = config.pop("url")
+        if role == "replica":
+            url = settings.redis_replica_url
+        
+        if settings.redis_cluster:
+            # Cluster clients retry on topology errors rather than on timeouts
+            config.pop("retry_on_timeout")
+            _clients[role] = RedisCluster.from_url(url, read_from_replicas=True, **config)
+        else:
+            _clients[role] = redis.from_url(url, **config)
+        logger.info(f"Connected Redis {role} client ({'cluster' if settings.redis_cluster else 'standalone'})")
+    
+    return _clients[role]
+
+
+async def close_redis_clients() -> None:
+    """Close this worker's shared Redis clients"""
+    for role in list(_clients):
+        client = _clients.pop(role)
+        await client.close()
+
+
+# Errors that mean Redis is unreachable, as opposed to a bad command
+REDIS_DOWN_ERRORS = (RedisConnectionError, RedisTimeoutError, OSError)
+
+# Redis outage handling, shared by every CacheService in this worker
+_circuit: Optional[CircuitBreaker] = None
+_fallback_store: Optional[FallbackStore] = None
+_sync_task: Optional[asyncio.Task] = None
+# Entries left pending by a previous process are synced on first contact
+_fallback_checked = False
+
+
+def get_circuit() -> CircuitBreaker:
+    """Get this worker's Redis circuit breaker"""
+    global _circuit
+    if _circuit is None:
+        settings = get_settings()
+        _circuit = CircuitBreaker("Redis", settings.redis_circuit_failures, settings.redis_circuit_reset)
+    return _circuit
+
+
+def get_fallback_store(create: bool = True) -> Optional[FallbackStore]:
+    """
+    Get the local fallback store
+    
+    Args:
+        create: Create the file if missing; otherwise only open an existing one
+        
+    Returns:
+        The store, or None if it is disabled, unusable or (without create) absent
+    """
+    global _fallback_store
+    settings = get_settings()
+    path = settings.fallback_cache_path
+    if _fallback_store is None and path and (create or os.path.exists(path)):
+        try:
+            _fallback_store = FallbackStore(path, settings.fallback_cache_max_entries)
+        except (sqlite3.Error, OSError) as e:
+            logger.error(f"Fallback cache unavailable at {path}: {e}")
+    return _fallback_store
+
+
 class CacheService:
     """Redis-based caching service"""
     
@@ -57,44 +160,216 @@ class CacheService:
         self.settings = get_settings()
         self.redis_client = None
         self.prefix = "logodeth:logo:"
+        self.hits_prefix = "logodeth:hits:"
+        self.negative_prefix = "logodeth:neg:"
+        self.refresh_prefix = "logodeth:refresh:"
+        self.lock_prefix = "logodeth:lock:"
+        self.stats_key = "logodeth:stats"
+        # Sorted-set index of entries by creation and expiry time (score = unix time)
+        self.created_index = "logodeth:index:created"
+        self.expires_index = "logodeth:index:expires"
         self.hasher = ImageHasher()
+        self.circuit = get_circuit()
+        
+        string_layout = StringLayout(self.prefix, self.hits_prefix, cluster=self.settings.redis_cluster)
+        if self.settings.cache_layout == "bucketed":
+            self.layout = BucketedLayout(
+                prefix_length=self.settings.cache_bucket_prefix_length,
+                bucket_ttl=self.settings.cache_max_ttl,
+                legacy=string_layout
+            )
+            self.layouts = [self.layout, string_layout]
+        else:
+            self.layout = string_layout
+            self.layouts = [string_layout]
     
     async def _get_client(self) -> redis.Redis:
-        """Get or create Redis client"""
+        """Get the Redis client for writes"""
         if not self.redis_client:
-            self.redis_client = redis.from_url(
-                self.settings.redis_url,
-                decode_responses=True
-            )
+            self.redis_client = get_redis_client("primary")
         return self.redis_client
     
+    async def _get_read_client(self) -> redis.Redis:
+        """Get the Redis client for lookups (a replica if one is configured)"""
+        if self.redis_client is not None and self.redis_client is not _clients.get("primary"):
+            # An explicitly injected client serves both roles
+            return self.redis_client
+        return get_redis_client("replica")
+    
+    def _redis_ok(self) -> None:
+        """Note a successful Redis call, syncing fallback entries back after an outage"""
+        global _fallback_checked
+        if self.circuit.record_success() or not _fallback_checked:
+            _fallback_checked = True
+            self._start_sync()
+    
+    def _redis_failed(self, error: Exception) -> bool:
+        """
+        Note a failed Redis call
+        
+        Returns:
+            True if the error means Redis is down
+        """
+        if isinstance(error, REDIS_DOWN_ERRORS):
+            self.circuit.record_failure()
+            return True
+        # Redis answered, so a half-open probe has succeeded
+        self.circuit.record_success()
+        return False
+    
+    @staticmethod
+    def _count(name: str, amount: int = 1) -> None:
+        """Count a cache event; it is sent to Redis with the next pipeline"""
+        _pending_counters[name] += amount
+        CACHE_EVENTS.labels(name).inc(amount)
+    
+    def _queue_counters(self, pipe) -> Tuple[Counter, Counter]:
+        """
+        Move pending counter and hit increments onto a pipeline
+        
+        Returns:
+            The increments, for _restore_counters if the pipeline fails
+        """
+        counters, hits = _pending_counters.copy(), _pending_hits.copy()
+        _pending_counters.clear()
+        _pending_hits.clear()
+        for name, amount in counters.items():
+            pipe.hincrby(self.stats_key, name, amount)
+        for key, amount in hits.items():
+            self.layout.queue_count_hit(pipe, key, amount, self.settings.cache_ttl)
+        return counters, hits
+    
+    @staticmethod
+    def _restore_counters(batch: Tuple[Counter, Counter]) -> None:
+        """Put back increments whose pipeline failed, for the next pipeline"""
+        counters, hits = batch
+        _pending_counters.update(counters)
+        _pending_hits.update(hits)
+    
+    async def _execute_with_counters(self, pipe) -> list:
+        """Add the pending increments to a pipeline and run it, keeping them if it fails"""
+        batch = self._queue_counters(pipe)
+        try:
+            return await pipe.execute() if len(pipe) else []
+        except BaseException:
+            self._restore_counters(batch)
+            raise
+    
+    async def _flush_counters(self, client) -> list:
+        """Send the pending increments in a pipeline of their own"""
+        async with client.pipeline(transaction=False) as pipe:
+            return await self._execute_with_counters(pipe)
+    
+    def ttl_for(self, value: Dict[str, Any], hits: int = 0) -> int:
+        """
+        Work out how long an entry should live
+        
+        Low-confidence results start at cache_min_ttl, everything else at
+        cache_ttl. Each hit within the counting window adds another base
+        period, up to cache_max_ttl (or cache_ttl for low-confidence results,
+        which are never worth keeping longer than a normal entry).
+        
+        Args:
+            value: Cached data (uses its confidence)
+            hits: Number of recent cache hits
+            
+        Returns:
+            TTL in seconds
+        """
+        try:
+            confidence = float(value.get("confidence", 0))
+        except (TypeError, ValueError):
+            confidence = 0.0
+        
+        if confidence < self.settings.cache_low_confidence:
+            base, cap = self.settings.cache_min_ttl, self.settings.cache_ttl
+        else:
+            base, cap = self.settings.cache_ttl, self.settings.cache_max_ttl
+        
+        return min(cap, base * (1 + max(0, hits)))
+    
+    @timed("cache_get")
     async def get(self, key: str) -> Optional[Dict[str, Any]]:
         """
         Get cached value by key
         
+        Reads the hit count and remaining TTL in the same pipeline, and a hit
+        is counted with this worker's next pipeline, so popularity tracking
+        costs no extra round trip and misses leave nothing behind. With a read
+        replica the lookup and the pending counters go to replica and primary
+        concurrently. The entry is only re-expired when its remaining TTL
+        falls below half of what its popularity earns, which is at most once
+        per half-life per key.
+        
         Args:
             key: Cache key (usually image hash)
             
         Returns:
             Cached data or None
         """
+        if not self.circuit.allow():
+            return await self._fallback_get(key)
+        
         try:
             client = await self._get_client()
-            full_key = f"{self.prefix}{key}"
+            reader = await self._get_read_client()
+            
+            if reader is client:
+                async with client.pipeline(transaction=False) as pipe:
+                    self.layout.queue_get(pipe, key)
+                    results = await self._execute_with_counters(pipe)
+            else:
+                results, _ = await asyncio.gather(
+                    self._execute(reader, lambda pipe: self.layout.queue_get(pipe, key)),
+                    self._flush_counters(client)
+                )
+            data, remaining_ttl, hits = self.layout.decode_get(key, results)
+            self._redis_ok()
+            
+            if data:
+                logger.debug(f"Cache hit for key: {key} (hits: {hits})")
+                self._count("hits")
+                _pending_hits[key] += 1
+                
+                target_ttl = self.ttl_for(data, hits)
+                if 0 <= remaining_ttl < target_ttl // 2:
+                    async with client.pipeline(transaction=False) as pipe:
+                        self.layout.queue_extend(pipe, key, data, target_ttl, hits)
+                        pipe.zadd(self.expires_index, {key: time.time() + target_ttl})
+                        await pipe.execute()
+                    logger.debug(f"Extended TTL for key: {key} to {target_ttl}s")
+                
+                return data
             
-            value = await client.get(full_key)
-            if value:
-                logger.debug(f"Cache hit for key: {key}")
-                return json.loads(value)
+            if remaining_ttl == 0:
+                # An expired value the layout still stores (a bucketed field)
+                async with client.pipeline(transaction=False) as pipe:
+                    self.layout.queue_delete(pipe, [key])
+                    pipe.zrem(self.created_index, key)
+                    pipe.zrem(self.expires_index, key)
+                    await pipe.execute()
             
             logger.debug(f"Cache miss for key: {key}")
+            self._count("misses")
             return None
             
         except Exception as e:
             logger.error(f"Cache get error: {e}")
+            self._count("errors")
+            if self._redis_failed(e):
+                return await self._fallback_get(key)
             # Don't fail if cache is down
             return None
     
+    @staticmethod
+    async def _execute(client, queue) -> list:
+        """Run the commands queued by queue(pipe) in one pipeline"""
+        async with client.pipeline(transaction=False) as pipe:
+            queue(pipe)
+            if not len(pipe):
+                return []
+            return await pipe.execute()
+    
     async def get_by_image(self, image_bytes: bytes, **params) -> Optional[Dict[str, Any]]:
         """
         Get cached result by image bytes
@@ -130,53 +405,251 @@ class CacheService:
                 "cached_at": datetime.utcnow().isoformat(),
                 "image_hash": image_hash,
                 "cache_params": params,
-                "ttl_seconds": self.settings.cache_ttl
+                "ttl_seconds": self.ttl_for(value)
             }
         }
         
         return await self.set(image_hash, enhanced_value)
     
-    async def set(self, key: str, value: Dict[str, Any]) -> bool:
+    @timed("cache_set")
+    async def set(
+        self,
+        key: str,
+        value: Dict[str, Any],
+        only_if_missing: bool = False,
+        version: Optional[str] = None
+    ) -> bool:
         """
         Set cache value with TTL
         
         Args:
             key: Cache key (usually image hash)
             value: Data to cache
+            only_if_missing: Leave an existing entry untouched (SET NX)
+            version: Model/prompt version the value was produced with
             
         Returns:
             Success status
         """
+        ttl = self.ttl_for(value)
+        
+        # Enhance value with cache metadata if not already present
+        if "_cache_metadata" not in value:
+            value = {
+                **value,
+                "_cache_metadata": {
+                    "cached_at": datetime.utcnow().isoformat(),
+                    "cache_key": key,
+                    "ttl_seconds": ttl,
+                    "version": version
+                }
+            }
+        
+        if not self.circuit.allow():
+            return await self._fallback_set(key, value, ttl, only_if_missing)
+        
         try:
             client = await self._get_client()
-            full_key = f"{self.prefix}{key}"
-            
-            # Enhance value with cache metadata if not already present
-            if "_cache_metadata" not in value:
-                value = {
-                    **value,
-                    "_cache_metadata": {
-                        "cached_at": datetime.utcnow().isoformat(),
-                        "cache_key": key,
-                        "ttl_seconds": self.settings.cache_ttl
-                    }
-                }
+            now = time.time()
+            self._count("sets")
+            async with client.pipeline(transaction=False) as pipe:
+                self.layout.queue_set(pipe, key, value, ttl, only_if_missing)
+                pipe.zadd(self.created_index, {key: now}, nx=only_if_missing)
+                pipe.zadd(self.expires_index, {key: now + ttl}, gt=only_if_missing)
+                await self._execute_with_counters(pipe)
+            if only_if_missing:
+                await self._replace_expired(client, [(key, value, ttl)])
+            self._redis_ok()
             
-            json_value = json.dumps(value, default=str)
-            await client.setex(
-                full_key,
-                self.settings.cache_ttl,
-                json_value
-            )
-            
-            logger.debug(f"Cached result for key: {key} (TTL: {self.settings.cache_ttl}s)")
+            logger.debug(f"Cached result for key: {key} (TTL: {ttl}s)")
             return True
             
         except Exception as e:
             logger.error(f"Cache set error: {e}")
+            self._count("errors")
+            if self._redis_failed(e):
+                return await self._fallback_set(key, value, ttl, only_if_missing)
             # Don't fail if cache is down
             return False
     
+    async def _fallback_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a key in the local fallback store"""
+        store = get_fallback_store()
+        if store is None:
+            return None
+        
+        try:
+            data = await asyncio.to_thread(store.get, key)
+        except sqlite3.Error as e:
+            logger.error(f"Fallback cache get error: {e}")
+            return None
+        
+        self._count("hits" if data else "misses")
+        return data
+    
+    async def _fallback_set(self, key: str, value: Dict[str, Any], ttl: int, only_if_missing: bool) -> bool:
+        """Write a key to the local fallback store, to be synced to Redis later"""
+        store = get_fallback_store()
+        if store is None:
+            return False
+        
+        try:
+            if only_if_missing and await asyncio.to_thread(store.get, key):
+                return True
+            await asyncio.to_thread(store.set, key, value, ttl)
+            logger.debug(f"Cached result for key: {key} in fallback store (TTL: {ttl}s)")
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Fallback cache set error: {e}")
+            return False
+    
+    def _start_sync(self) -> None:
+        """Start copying fallback entries back to Redis, unless already running"""
+        global _sync_task
+        if (_sync_task and not _sync_task.done()) or get_fallback_store(create=False) is None:
+            return
+        _sync_task = asyncio.create_task(self.sync_fallback())
+    
+    async def sync_fallback(self, batch_size: int = 500) -> int:
+        """
+        Copy entries written to the fallback store during an outage to Redis
+        
+        Entries are written with NX, as anything that reached Redis in the
+        meantime is at least as fresh, and removed locally once copied.
+        
+        Returns:
+            Number of entries copied
+        """
+        store = get_fallback_store(create=False)
+        if store is None:
+            return 0
+        
+        synced = 0
+        try:
+            client = await self._get_client()
+            while True:
+                batch = await asyncio.to_thread(store.pending, batch_size)
+                if not batch:
+                    break
+                
+                now = time.time()
+                async with client.pipeline(transaction=False) as pipe:
+                    for key, value, ttl in batch:
+                        self.layout.queue_set(pipe, key, value, ttl, True)
+                        pipe.zadd(self.created_index, {key: now}, nx=True)
+                        pipe.zadd(self.expires_index, {key: now + ttl}, gt=True)
+                    await pipe.execute()
+                await self._replace_expired(client, batch)
+                
+                await asyncio.to_thread(store.remove, [key for key, _, _ in batch])
+                synced += len(batch)
+        except Exception as e:
+            self._redis_failed(e)
+            logger.error(f"Fallback cache sync stopped after {synced} entries: {e}")
+        
+        if synced:
+            logger.info(f"Synced {synced} entries from the fallback cache back to Redis")
+        return synced
+    
+    @staticmethod
+    def is_current(value: Dict[str, Any], version: str) -> bool:
+        """Check whether a cached value was produced with the given version"""
+        # The bucketed layout stores a short tag instead of the full version
+        return value.get("_cache_metadata", {}).get("version") in (version, version_tag(version))
+    
+    async def acquire_refresh_lock(self, key: str, ttl: int) -> bool:
+        """
+        Claim the right to re-generate an entry, across all workers
+        
+        Args:
+            key: Cache key (usually image hash)
+            ttl: Lock lifetime in seconds
+            
+        Returns:
+            True if this caller should refresh the entry
+        """
+        if self.circuit.is_open:
+            return False
+        
+        try:
+            client = await self._get_client()
+            return bool(await client.set(f"{self.refresh_prefix}{key}", 1, ex=ttl, nx=True))
+        except Exception as e:
+            logger.error(f"Cache refresh lock error: {e}")
+            self._redis_failed(e)
+            return False
+    
+    async def acquire_lock(self, name: str, ttl: int) -> bool:
+        """
+        Claim a named one-off task (e.g. warming the cache), across all workers
+        
+        Args:
+            name: Task name
+            ttl: Lock lifetime in seconds
+            
+        Returns:
+            True if this caller should run the task
+        """
+        client = await self._get_client()
+        return bool(await client.set(f"{self.lock_prefix}{name}", 1, ex=ttl, nx=True))
+    
+    async def set_many(self, entries: List[Tuple[str, Dict[str, Any]]], only_if_missing: bool = True) -> int:
+        """
+        Write many entries in one pipeline
+        
+        Unlike set, this raises on Redis errors and never uses the fallback
+        store, as it is meant for bulk loads that should fail loudly.
+        
+        Args:
+            entries: (key, value) pairs; values keep any _cache_metadata they have
+            only_if_missing: Leave existing entries untouched
+            
+        Returns:
+            Number of entries sent
+        """
+        client = await self._get_client()
+        now = time.time()
+        written = [(key, value, self.ttl_for(value)) for key, value in entries]
+        
+        async with client.pipeline(transaction=False) as pipe:
+            for key, value, ttl in written:
+                self.layout.queue_set(pipe, key, value, ttl, only_if_missing)
+                pipe.zadd(self.created_index, {key: now}, nx=only_if_missing)
+                pipe.zadd(self.expires_index, {key: now + ttl}, gt=only_if_missing)
+            await pipe.execute()
+        if only_if_missing:
+            await self._replace_expired(client, written)
+        
+        return len(entries)
+    
+    async def _replace_expired(self, client, entries: List[Tuple[str, Dict[str, Any], int]]) -> None:
+        """Overwrite entries that a write with only_if_missing kept only because they had expired"""
+        replaced = await self.layout.replace_expired(client, entries)
+        if replaced:
+            now = time.time()
+            async with client.pipeline(transaction=False) as pipe:
+                for key, ttl in replaced:
+                    pipe.zadd(self.created_index, {key: now})
+                    pipe.zadd(self.expires_index, {key: now + ttl})
+                await pipe.execute()
+    
+    async def scan_entries(self, chunk_size: int = 500) -> AsyncIterator[List[Tuple[str, Dict[str, Any]]]]:
+        """
+        Stream every cached entry in chunks, across all active layouts
+        
+        Args:
+            chunk_size: Keys per SCAN batch
+            
+        Yields:
+            Lists of (key, value) pairs; values that cannot be decoded are skipped
+        """
+        client = await self._get_client()
+        for layout in self.layouts:
+            async for entries in layout.scan(client, chunk_size, with_values=True):
+                entries = [(key, value) for key, value in entries if value is not None]
+                if entries:
+                    yield entries
+    
     async def delete(self, key: str) -> bool:
         """
         Delete cached value
@@ -187,45 +660,269 @@ class CacheService:
         Returns:
             Success status
         """
+        # Never let a deleted entry be synced back from the fallback store
+        store = get_fallback_store(create=False)
+        local = bool(store and await asyncio.to_thread(store.delete, key))
+        if self.circuit.is_open:
+            return local
+        
         try:
             client = await self._get_client()
-            full_key = f"{self.prefix}{key}"
             
-            result = await client.delete(full_key)
+            async with client.pipeline(transaction=False) as pipe:
+                for layout in self.layouts:
+                    layout.queue_delete(pipe, [key])
+                pipe.delete(f"{self.negative_prefix}{key}")
+                pipe.zrem(self.created_index, key)
+                pipe.zrem(self.expires_index, key)
+                result = await pipe.execute()
             logger.debug(f"Deleted cache key: {key}")
-            return bool(result)
+            return any(result) or local
             
         except Exception as e:
             logger.error(f"Cache delete error: {e}")
-            return False
+            self._redis_failed(e)
+            return local
     
-    async def clear_all(self) -> int:
+    async def get_failure(self, key: str) -> Optional[Dict[str, Any]]:
         """
-        Clear all cached logos
+        Get the failure record for an image, if recognition failed recently
         
+        Args:
+            key: Cache key (usually image hash)
+            
         Returns:
-            Number of keys deleted
+            Dict with attempts, failed_at and last_error, or None
         """
+        if self.circuit.is_open:
+            return None
+        
+        try:
+            client = await self._get_read_client()
+            data = await client.hgetall(f"{self.negative_prefix}{key}")
+            if not data:
+                return None
+            
+            return {
+                "attempts": int(data.get("attempts", 0)),
+                "failed_at": float(data.get("failed_at", 0)),
+                "last_error": data.get("last_error")
+            }
+            
+        except Exception as e:
+            logger.error(f"Cache failure lookup error: {e}")
+            self._redis_failed(e)
+            return None
+    
+    async def record_failure(self, key: str, error: str) -> Optional[Dict[str, Any]]:
+        """
+        Record a failed recognition attempt for an image
+        
+        Args:
+            key: Cache key (usually image hash)
+            error: Short description of what went wrong
+            
+        Returns:
+            Updated failure record, or None if Redis is unavailable
+        """
+        if self.circuit.is_open:
+            return None
+        
         try:
             client = await self._get_client()
-            pattern = f"{self.prefix}*"
+            neg_key = f"{self.negative_prefix}{key}"
+            failed_at = time.time()
             
-            # Find all keys matching pattern
-            keys = []
-            async for key in client.scan_iter(match=pattern):
-                keys.append(key)
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.hincrby(neg_key, "attempts", 1)
+                pipe.hset(neg_key, mapping={"failed_at": failed_at, "last_error": error[:200]})
+                pipe.expire(neg_key, self.settings.negative_cache_ttl)
+                attempts = (await pipe.execute())[0]
             
-            # Delete all keys
-            if keys:
-                deleted = await client.delete(*keys)
-                logger.info(f"Cleared {deleted} cached logos")
-                return deleted
+            if attempts >= self.settings.quarantine_after:
+                await client.expire(neg_key, self.settings.quarantine_ttl)
+                logger.warning(f"Image {key} quarantined after {attempts} failed attempts")
             
-            return 0
+            return {"attempts": attempts, "failed_at": failed_at, "last_error": error[:200]}
+            
+        except Exception as e:
+            logger.error(f"Cache failure record error: {e}")
+            self._redis_failed(e)
+            return None
+    
+    async def clear_failure(self, key: str) -> bool:
+        """
+        Forget the failure record for an image after a successful recognition
+        
+        Args:
+            key: Cache key (usually image hash)
+            
+        Returns:
+            Success status
+        """
+        if self.circuit.is_open:
+            return False
+        
+        try:
+            client = await self._get_client()
+            return bool(await client.delete(f"{self.negative_prefix}{key}"))
+        except Exception as e:
+            logger.error(f"Cache failure clear error: {e}")
+            self._redis_failed(e)
+            return False
+    
+    def is_quarantined(self, failure: Dict[str, Any]) -> bool:
+        """Check whether a failure record has reached the quarantine threshold"""
+        return failure["attempts"] >= self.settings.quarantine_after
+    
+    def failure_retry_after(self, failure: Dict[str, Any]) -> int:
+        """
+        Seconds until the next attempt is allowed under exponential backoff
+        
+        Args:
+            failure: Failure record from get_failure
             
+        Returns:
+            Seconds to wait, 0 if a retry is allowed now
+        """
+        backoff = min(
+            self.settings.failure_backoff_max,
+            self.settings.failure_backoff_base * 2 ** max(0, failure["attempts"] - 1)
+        )
+        return max(0, int(failure["failed_at"] + backoff - time.time()))
+    
+    async def clear_all(self) -> int:
+        """
+        Clear all cached logos
+        
+        Returns:
+            Number of keys deleted
+        """
+        deleted = 0
+        try:
+            async for progress in self.invalidate():
+                deleted = progress["deleted"]
         except Exception as e:
             logger.error(f"Cache clear error: {e}")
-            return 0
+            self._redis_failed(e)
+        
+        if deleted:
+            logger.info(f"Cleared {deleted} cached logos")
+        return deleted
+    
+    async def invalidate(
+        self,
+        model_version: Optional[str] = None,
+        older_than: Optional[int] = None,
+        min_confidence: Optional[float] = None,
+        max_confidence: Optional[float] = None,
+        band_name: Optional[str] = None,
+        chunk_size: int = 500,
+        pause: float = 0.0
+    ) -> AsyncIterator[Dict[str, int]]:
+        """
+        Delete cached logos in chunks, optionally only those matching filters
+        
+        Keys are streamed with SCAN and removed with UNLINK in one pipeline per
+        chunk, so memory use stays flat and Redis is never blocked for long.
+        With no filters every entry is removed. An entry's negative-cache
+        record and refresh lock go with it. Values that cannot be decoded
+        never match a filter.
+        
+        Args:
+            model_version: Only entries produced with this model/prompt version
+            older_than: Only entries cached more than this many seconds ago
+            min_confidence: Only entries with at least this confidence
+            max_confidence: Only entries with at most this confidence
+            band_name: Only entries for this band (case-insensitive)
+            chunk_size: Keys per SCAN/UNLINK batch
+            pause: Seconds to sleep between batches to leave room for traffic
+            
+        Yields:
+            Running totals: scanned, matched and deleted keys
+        """
+        client = await self._get_client()
+        filtered = any(f is not None for f in (model_version, older_than, min_confidence, max_confidence, band_name))
+        cutoff = datetime.utcnow() - timedelta(seconds=older_than) if older_than is not None else None
+        progress = {"scanned": 0, "matched": 0, "deleted": 0}
+        
+        for layout in self.layouts:
+            first = True
+            async for entries in layout.scan(client, chunk_size, with_values=filtered):
+                if not first and pause:
+                    await asyncio.sleep(pause)
+                first = False
+                
+                progress["scanned"] += len(entries)
+                keys = [
+                    key for key, value in entries
+                    if not filtered or value is not None and self._matches(
+                        value, model_version, cutoff, min_confidence, max_confidence, band_name
+                    )
+                ]
+                
+                if keys:
+                    progress["matched"] += len(keys)
+                    siblings = [f"{prefix}{key}" for key in keys for prefix in (self.negative_prefix, self.refresh_prefix)]
+                    async with client.pipeline(transaction=False) as pipe:
+                        deletes = layout.queue_delete(pipe, keys)
+                        pipe.zrem(self.created_index, *keys)
+                        pipe.zrem(self.expires_index, *keys)
+                        if self.settings.redis_cluster:
+                            # The sibling keys sit in different slots
+                            for sibling in siblings:
+                                pipe.unlink(sibling)
+                        else:
+                            pipe.unlink(*siblings)
+                        results = await pipe.execute()
+                    # Entries that expired or were removed since the scan are not counted
+                    progress["deleted"] += sum(results[:deletes])
+                
+                yield dict(progress)
+        
+        if not filtered:
+            store = get_fallback_store(create=False)
+            if store:
+                await asyncio.to_thread(store.clear)
+            # Separate commands, as the two indexes may sit in different cluster slots
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.unlink(self.created_index)
+                pipe.unlink(self.expires_index)
+                await pipe.execute()
+    
+    @staticmethod
+    def _matches(
+        value: Dict[str, Any],
+        model_version: Optional[str],
+        cutoff: Optional[datetime],
+        min_confidence: Optional[float],
+        max_confidence: Optional[float],
+        band_name: Optional[str]
+    ) -> bool:
+        """Check a cached value against invalidation filters"""
+        metadata = value.get("_cache_metadata", {})
+        
+        # The bucketed layout stores a short tag instead of the full version
+        if model_version is not None and metadata.get("version") not in (model_version, version_tag(model_version)):
+            return False
+        
+        if cutoff is not None:
+            try:
+                if datetime.fromisoformat(metadata["cached_at"]) >= cutoff:
+                    return False
+            except (KeyError, TypeError, ValueError):
+                pass  # Entries without a timestamp are as old as it gets
+        
+        confidence = value.get("confidence", 0)
+        if min_confidence is not None and confidence < min_confidence:
+            return False
+        if max_confidence is not None and confidence > max_confidence:
+            return False
+        
+        if band_name is not None and str(value.get("band_name", "")).casefold() != band_name.casefold():
+            return False
+        
+        return True
     
     async def health_check(self) -> bool:
         """
@@ -234,63 +931,158 @@ class CacheService:
         Returns:
             Health status
         """
+        if self.circuit.is_open:
+            return False
+        
         try:
             client = await self._get_client()
             await client.ping()
+            self._redis_ok()
             return True
         except Exception as e:
             logger.error(f"Redis health check failed: {e}")
+            self._redis_failed(e)
             return False
     
+    async def prune_expired(self, limit: int = 1000) -> int:
+        """
+        Remove expired entries from the index and from bucketed storage
+        
+        Args:
+            limit: Maximum number of entries to prune in this call
+            
+        Returns:
+            Number of entries pruned
+        """
+        client = await self._get_client()
+        expired = await client.zrangebyscore(self.expires_index, "-inf", time.time(), start=0, num=limit)
+        
+        if expired:
+            async with client.pipeline(transaction=False) as pipe:
+                # Bucketed fields do not expire on their own
+                self.layout.queue_delete(pipe, expired)
+                pipe.zrem(self.created_index, *expired)
+                pipe.zrem(self.expires_index, *expired)
+                await pipe.execute()
+        
+        return len(expired)
+    
     async def get_stats(self) -> Dict[str, Any]:
         """
         Get cache statistics
         
+        Counts come from the stats hash and the entry index, so this costs a
+        couple of round trips regardless of cache size. Expired and evicted
+        entries stay in the index until the periodic prune removes them, so
+        key counts are approximate.
+        
         Returns:
             Cache statistics
         """
+        if self.circuit.is_open:
+            store = get_fallback_store()
+            return {
+                "error": "Redis unavailable",
+                "circuit": self.circuit.state,
+                "fallback_entries": await asyncio.to_thread(store.count) if store else None,
+            }
+        
         try:
             client = await self._get_client()
-            pattern = f"{self.prefix}*"
+            now = time.time()
             
-            # Count keys
-            key_count = 0
-            total_memory = 0
-            oldest_key = None
-            newest_key = None
+            # Counters go first so the stats include them; results are read from the end
+            async with client.pipeline(transaction=False) as pipe:
+                batch = self._queue_counters(pipe)
+                pipe.zcard(self.created_index)
+                pipe.zrange(self.created_index, 0, 0, withscores=True)
+                pipe.zrange(self.created_index, -1, -1, withscores=True)
+                pipe.hgetall(self.stats_key)
+                if not self.settings.redis_cluster:
+                    pipe.info("memory")
+                    pipe.info("clients")
+                try:
+                    results = await pipe.execute()
+                except BaseException:
+                    self._restore_counters(batch)
+                    raise
             
-            async for key in client.scan_iter(match=pattern):
-                key_count += 1
-                
-                # Get TTL for age calculation
-                ttl = await client.ttl(key)
-                if ttl > 0:
-                    # Calculate age based on TTL
-                    age = self.settings.cache_ttl - ttl
-                    if oldest_key is None or age > oldest_key[1]:
-                        oldest_key = (key, age)
-                    if newest_key is None or age < newest_key[1]:
-                        newest_key = (key, age)
-            
-            # Get Redis info
-            info = await client.info()
+            if self.settings.redis_cluster:
+                # INFO has no key, so it cannot ride in a cluster pipeline
+                key_count, oldest, newest, counters = results[-4:]
+                memory = self._merge_node_info(await client.info("memory", target_nodes=RedisCluster.PRIMARIES))
+                clients = self._merge_node_info(await client.info("clients", target_nodes=RedisCluster.ALL_NODES))
+            else:
+                key_count, oldest, newest, counters, memory, clients = results[-6:]
+            
+            counters = {name: int(value) for name, value in counters.items()}
+            hits = counters.get("hits", 0)
+            misses = counters.get("misses", 0)
+            lookups = hits + misses
             
             return {
                 "total_keys": key_count,
-                "redis_memory_used": info.get("used_memory_human", "unknown"),
-                "redis_connected_clients": info.get("connected_clients", 0),
-                "oldest_entry_age_seconds": oldest_key[1] if oldest_key else None,
-                "newest_entry_age_seconds": newest_key[1] if newest_key else None,
+                "redis_memory_used": memory.get("used_memory_human", "unknown"),
+                "redis_connected_clients": clients.get("connected_clients", 0),
+                "oldest_entry_age_seconds": int(now - oldest[0][1]) if oldest else None,
+                "newest_entry_age_seconds": int(now - newest[0][1]) if newest else None,
                 "cache_ttl_seconds": self.settings.cache_ttl,
-                "hit_rate": "Not implemented",  # Would need separate tracking
+                "hits": hits,
+                "misses": misses,
+                "sets": counters.get("sets", 0),
+                "errors": counters.get("errors", 0),
+                "hit_rate": f"{hits / lookups * 100:.1f}%" if lookups else None,
+                "circuit": self.circuit.state,
             }
             
         except Exception as e:
             logger.error(f"Cache stats error: {e}")
+            self._redis_failed(e)
             return {"error": str(e)}
     
+    @staticmethod
+    def _merge_node_info(info: Dict[str, Any]) -> Dict[str, Any]:
+        """Sum INFO fields across cluster nodes"""
+        if not info or not all(isinstance(value, dict) for value in info.values()):
+            return info
+        
+        merged: Dict[str, Any] = {}
+        for node_info in info.values():
+            for field, value in node_info.items():
+                if isinstance(value, (int, float)):
+                    merged[field] = merged.get(field, 0) + value
+        merged["used_memory_human"] = f"{merged.get('used_memory', 0) / 1024 / 1024:.2f}M"
+        return merged
+    
     async def close(self):
-        """Close Redis connection"""
-        if self.redis_client:
+        """Close Redis connections, including the worker's shared clients"""
+        if self.redis_client and self.redis_client not in _clients.values():
             await self.redis_client.close()
-            self.redis_client = None
\ No newline at end of file
+        self.redis_client = None
+        await close_redis_clients()
+
+async def prune_periodically(interval: int, limit: int = 1000) -> None:
+    """
+    Remove expired entries every interval seconds, until cancelled
+    
+    A lock lets one worker prune per interval. Each run keeps pruning in
+    batches of limit until the expiry index has nothing left to remove.
+    """
+    cache = CacheService()
+    while True:
+        await asyncio.sleep(interval)
+        if cache.circuit.is_open:
+            continue
+        try:
+            if await cache.acquire_lock("prune", interval):
+                pruned = 0
+                while True:
+                    count = await cache.prune_expired(limit)
+                    pruned += count
+                    if count < limit:
+                        break
+                if pruned:
+                    logger.debug(f"Pruned {pruned} expired cache entries")
+        except Exception as e:
+            logger.warning(f"Cache prune failed: {e}")
+            cache._redis_failed(e)
@@ -0,0 +1,406 @@
+"""
+Storage layouts for cached recognition results
+
+A layout decides how entries are laid out in Redis. CacheService queues a
+layout's commands into its own pipelines, so switching layouts never adds
+round trips.
+"""
+import hashlib
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+
+def version_tag(version: Optional[str]) -> Optional[str]:
+    """Short, stable stand-in for a model/prompt version string"""
+    if version is None:
+        return None
+    return hashlib.sha256(version.encode()).hexdigest()[:8]
+
+
+def loads_or_none(raw: str) -> Optional[Any]:
+    """Decode a JSON value, or None if it is not valid JSON"""
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+
+async def scan_chunks(client, match: str, count: int) -> AsyncIterator[List[str]]:
+    """
+    Stream keys matching a pattern in chunks of about count keys
+
+    Uses scan_iter, which a cluster client runs against every primary.
+    """
+    chunk: List[str] = []
+    async for key in client.scan_iter(match=match, count=count):
+        chunk.append(key)
+        if len(chunk) >= count:
+            yield chunk
+            chunk = []
+    yield chunk
+
+
+class StringLayout:
+    """
+    One top-level string key per entry holding its JSON value
+
+    Popularity is counted per hit in a sidecar counter key. In cluster mode
+    the image hash is wrapped in a hash tag, so an entry and its counter
+    live in the same slot.
+    """
+
+    name = "string"
+
+    def __init__(
+        self,
+        prefix: str = "logodeth:logo:",
+        hits_prefix: str = "logodeth:hits:",
+        cluster: bool = False
+    ):
+        self.prefix = prefix
+        self.hits_prefix = hits_prefix
+        self.cluster = cluster
+
+    def value_key(self, key: str) -> str:
+        """Redis key holding an entry"""
+        return f"{self.prefix}{{{key}}}" if self.cluster else f"{self.prefix}{key}"
+
+    def hits_key(self, key: str) -> str:
+        """Redis key holding an entry's hit counter"""
+        return f"{self.hits_prefix}{{{key}}}" if self.cluster else f"{self.hits_prefix}{key}"
+
+    def _strip(self, full_key: str) -> str:
+        """Get the cache key back from a value key"""
+        key = full_key[len(self.prefix):]
+        return key[1:-1] if key.startswith("{") else key
+
+    def queue_get(self, pipe, key: str) -> None:
+        """Queue the read-only commands that fetch an entry and its hit count"""
+        pipe.get(self.value_key(key))
+        pipe.ttl(self.value_key(key))
+        pipe.get(self.hits_key(key))
+
+    def queue_count_hit(self, pipe, key: str, hits: int, window: int) -> None:
+        """
+        Queue the commands that count hits on an entry (must go to the primary)
+
+        Only called for entries that were found, so lookups of unknown images
+        leave no counters behind.
+        """
+        pipe.incrby(self.hits_key(key), hits)
+        # Popularity is counted over a sliding window of one base TTL
+        pipe.expire(self.hits_key(key), window)
+
+    def decode_get(self, key: str, results: List[Any]) -> Tuple[Optional[Dict[str, Any]], int, int]:
+        """
+        Decode the results of queue_get
+
+        Returns:
+            (value or None, remaining TTL in seconds or -1 if unknown,
+            hits including this one)
+        """
+        value, remaining_ttl, hits = results[:3]
+        if not value:
+            return None, remaining_ttl, 0
+        return json.loads(value), remaining_ttl, int(hits or 0) + 1
+
+    def queue_set(self, pipe, key: str, value: Dict[str, Any], ttl: int, only_if_missing: bool) -> None:
+        """Queue the commands that write an entry"""
+        pipe.set(self.value_key(key), json.dumps(value, default=str), ex=ttl, nx=only_if_missing)
+        # Start a fresh popularity window, replacing any counter left by a miss
+        pipe.set(self.hits_key(key), 0, ex=ttl, nx=only_if_missing)
+
+    async def replace_expired(self, client, entries: List[Tuple[str, Dict[str, Any], int]]) -> List[Tuple[str, int]]:
+        """Redis expires string keys itself, so SET NX is never blocked by an expired entry"""
+        return []
+
+    def queue_extend(self, pipe, key: str, value: Dict[str, Any], ttl: int, hits: int) -> None:
+        """Queue the commands that extend an entry's lifetime"""
+        pipe.expire(self.value_key(key), ttl)
+        pipe.expire(self.hits_key(key), ttl)
+
+    def queue_delete(self, pipe, keys: List[str]) -> int:
+        """
+        Queue the commands that remove entries
+
+        Returns:
+            Number of leading commands whose results add up to the entries removed
+        """
+        # Value keys go first, so their replies count entries and not counters
+        if self.cluster:
+            # One UNLINK per slot
+            for key in keys:
+                pipe.unlink(self.value_key(key))
+            for key in keys:
+                pipe.unlink(self.hits_key(key))
+            return len(keys)
+        pipe.unlink(*(self.value_key(key) for key in keys))
+        pipe.unlink(*(self.hits_key(key) for key in keys))
+        return 1
+
+    async def scan(
+        self,
+        client,
+        chunk_size: int,
+        with_values: bool
+    ) -> AsyncIterator[List[Tuple[str, Optional[Dict[str, Any]]]]]:
+        """
+        Stream entries in chunks
+
+        Yields:
+            Lists of (key, value) pairs; values are None unless with_values,
+            and for values that cannot be decoded
+        """
+        async for full_keys in scan_chunks(client, f"{self.prefix}*", chunk_size):
+            keys = [self._strip(full_key) for full_key in full_keys]
+
+            if keys and with_values:
+                if self.cluster:
+                    # Keys span slots, so MGET has to be split per node
+                    values = await client.mget_nonatomic(full_keys)
+                else:
+                    values = await client.mget(full_keys)
+                # Keys that expired since the SCAN are left out; undecodable values come back as None
+                yield [(key, loads_or_none(value)) for key, value in zip(keys, values) if value]
+            else:
+                yield [(key, None) for key in keys]
+
+
+class BucketedLayout:
+    """
+    Entries grouped into small Redis hashes keyed by a hash prefix
+
+    With a few hundred fields per bucket, Redis keeps each bucket in its
+    compact listpack encoding (hash-max-ziplist-* in redis.conf), which
+    removes the per-key overhead of the string layout. Values are encoded
+    as positional JSON arrays without the repeated metadata block.
+
+    Redis cannot expire single hash fields before 7.4, so each value carries
+    its own expiry time and is treated as missing once it has passed. The
+    bucket itself expires cache_max_ttl after its last write. An expired
+    field is removed when a read finds it, and otherwise by the periodic
+    CacheService.prune_expired via the expiry index.
+
+    Popularity is counted per TTL extension rather than per hit, which
+    avoids a counter per entry and needs no extra writes.
+    """
+
+    name = "bucketed"
+    FORMAT = 1
+
+    def __init__(
+        self,
+        prefix: str = "logodeth:b:",
+        prefix_length: int = 2,
+        bucket_ttl: int = 2592000,
+        legacy: Optional[StringLayout] = None
+    ):
+        self.prefix = prefix
+        self.prefix_length = prefix_length
+        self.bucket_ttl = bucket_ttl
+        # Entries written before switching layouts stay readable until they expire
+        self.legacy = legacy
+
+    def _locate(self, key: str) -> Tuple[str, str]:
+        """Get (bucket key, field) for a cache key"""
+        return f"{self.prefix}{key[:self.prefix_length]}", key[self.prefix_length:]
+
+    def encode(self, key: str, value: Dict[str, Any], expires_at: float, hits: int = 0) -> str:
+        """Encode a value as a compact positional array"""
+        metadata = value.get("_cache_metadata", {})
+        try:
+            # cached_at is naive UTC (datetime.utcnow)
+            cached_at = datetime.fromisoformat(metadata["cached_at"]).replace(tzinfo=timezone.utc).timestamp()
+        except (KeyError, TypeError, ValueError):
+            cached_at = time.time()
+
+        # Values decoded from this layout already carry the short tag
+        version = metadata.get("version")
+        return json.dumps(
+            [
+                self.FORMAT,
+                value.get("band_name"),
+                value.get("confidence"),
+                value.get("genre"),
+                value.get("description"),
+                value.get("ai_model"),
+                int(cached_at),
+                int(expires_at),
+                version if version is None or len(version) <= 8 else version_tag(version),
+                hits
+            ],
+            separators=(",", ":"),
+            ensure_ascii=False
+        )
+
+    def decode(self, key: str, raw: str) -> Tuple[Dict[str, Any], float, int]:
+        """
+        Decode a compact value back into the string layout's shape
+
+        Returns:
+            (value, expires_at, hits)
+        """
+        (_, band_name, confidence, genre, description, ai_model,
+         cached_at, expires_at, version, hits) = json.loads(raw)
+        cached_at_iso = datetime.fromtimestamp(cached_at, timezone.utc).replace(tzinfo=None).isoformat()
+
+        value = {
+            "band_name": band_name,
+            "confidence": confidence,
+            "genre": genre,
+            "description": description,
+            "ai_model": ai_model,
+            "cached": False,
+            "processing_time": 0,
+            "timestamp": cached_at_iso,
+            "_cache_metadata": {
+                "cached_at": cached_at_iso,
+                "cache_key": key,
+                "ttl_seconds": expires_at - cached_at,
+                "version": version
+            }
+        }
+        return value, expires_at, hits
+
+    def queue_get(self, pipe, key: str) -> None:
+        """Queue the read-only commands that fetch an entry"""
+        bucket, field = self._locate(key)
+        pipe.hget(bucket, field)
+        if self.legacy:
+            pipe.get(self.legacy.value_key(key))
+
+    def queue_count_hit(self, pipe, key: str, hits: int, window: int) -> None:
+        """Hits are counted when the entry is extended, so nothing to queue"""
+
+    def decode_get(self, key: str, results: List[Any]) -> Tuple[Optional[Dict[str, Any]], int, int]:
+        """
+        Decode the results of queue_get
+
+        Returns:
+            (value or None, remaining TTL in seconds, 0 if the value has
+            expired but is still stored, or -1 if unknown, hits including
+            this one)
+        """
+        raw = results[0]
+        if raw:
+            value, expires_at, hits = self.decode(key, raw)
+            remaining_ttl = int(expires_at - time.time())
+            if remaining_ttl > 0:
+                return value, remaining_ttl, hits + 1
+            return None, 0, 0
+
+        if self.legacy and results[1]:
+            return json.loads(results[1]), -1, 0
+
+        return None, -2, 0
+
+    def queue_set(self, pipe, key: str, value: Dict[str, Any], ttl: int, only_if_missing: bool) -> None:
+        """
+        Queue the commands that write an entry
+
+        HSETNX also keeps a field whose value has expired, so writes with
+        only_if_missing are followed by replace_expired.
+        """
+        bucket, field = self._locate(key)
+        encoded = self.encode(key, value, time.time() + ttl)
+        if only_if_missing:
+            pipe.hsetnx(bucket, field, encoded)
+        else:
+            pipe.hset(bucket, field, encoded)
+        pipe.expire(bucket, self.bucket_ttl)
+
+    async def replace_expired(self, client, entries: List[Tuple[str, Dict[str, Any], int]]) -> List[Tuple[str, int]]:
+        """
+        Overwrite entries that a write with only_if_missing left in place only
+        because their value had expired, or cannot be decoded
+
+        Costs one round trip to read the fields back, and a second one only
+        when some of them have expired.
+
+        Args:
+            entries: (key, value, ttl) triples that were just written
+
+        Returns:
+            (key, ttl) pairs of the entries that were overwritten
+        """
+        async with client.pipeline(transaction=False) as pipe:
+            for key, _, _ in entries:
+                pipe.hget(*self._locate(key))
+            stored = await pipe.execute()
+
+        now = time.time()
+        expired = []
+        for (key, value, ttl), raw in zip(entries, stored):
+            try:
+                live = raw is None or self.decode(key, raw)[1] > now
+            except (ValueError, TypeError):
+                live = False
+            if not live:
+                expired.append((key, value, ttl))
+
+        if expired:
+            async with client.pipeline(transaction=False) as pipe:
+                for key, value, ttl in expired:
+                    self.queue_set(pipe, key, value, ttl, False)
+                await pipe.execute()
+        return [(key, ttl) for key, _, ttl in expired]
+
+    def queue_extend(self, pipe, key: str, value: Dict[str, Any], ttl: int, hits: int) -> None:
+        """Queue the commands that extend an entry's lifetime"""
+        bucket, field = self._locate(key)
+        pipe.hset(bucket, field, self.encode(key, value, time.time() + ttl, hits))
+        pipe.expire(bucket, self.bucket_ttl)
+
+    def queue_delete(self, pipe, keys: List[str]) -> int:
+        """
+        Queue the commands that remove entries
+
+        Returns:
+            Number of leading commands whose results add up to the entries removed
+        """
+        by_bucket: Dict[str, List[str]] = {}
+        for key in keys:
+            bucket, field = self._locate(key)
+            by_bucket.setdefault(bucket, []).append(field)
+        for bucket, fields in by_bucket.items():
+            pipe.hdel(bucket, *fields)
+        return len(by_bucket)
+
+    async def scan(
+        self,
+        client,
+        chunk_size: int,
+        with_values: bool
+    ) -> AsyncIterator[List[Tuple[str, Optional[Dict[str, Any]]]]]:
+        """
+        Stream entries in chunks of whole buckets
+
+        Yields:
+            Lists of (key, value) pairs; values are always decoded (None if
+            they cannot be)
+        """
+        # Buckets hold many entries each, so scan fewer keys per step
+        count = max(1, chunk_size // 100)
+        async for buckets in scan_chunks(client, f"{self.prefix}*", count):
+            if not buckets:
+                yield []
+                continue
+
+            async with client.pipeline(transaction=False) as pipe:
+                for bucket in buckets:
+                    pipe.hgetall(bucket)
+                contents = await pipe.execute()
+
+            entries = []
+            for bucket, fields in zip(buckets, contents):
+                key_prefix = bucket[len(self.prefix):]
+                for field, raw in fields.items():
+                    key = f"{key_prefix}{field}"
+                    try:
+                        value = self.decode(key, raw)[0]
+                    except (ValueError, TypeError):
+                        value = None
+                    entries.append((key, value))
+            yield entries
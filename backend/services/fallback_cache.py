@@ -0,0 +1,109 @@
+"""
+Local on-disk cache used while Redis is unavailable
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+
+class FallbackStore:
+    """
+    SQLite-backed key/value store for recognition results
+
+    Entries written here while Redis is down are pending; CacheService
+    copies them back to Redis once it recovers and then removes them. The
+    file survives restarts, so pending entries from a previous process are
+    synced too. Calls are blocking; run them in a thread from async code.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        # WAL lets several workers share the file without blocking readers
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._db.commit()
+        logger.debug(f"Fallback cache opened at {path}")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get an unexpired value by key"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM entries WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        """Store a value, evicting the entries closest to expiry when full"""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, default=str), time.time() + ttl)
+            )
+            self._db.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+            self._db.execute(
+                "DELETE FROM entries WHERE key IN ("
+                "SELECT key FROM entries ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._db.commit()
+
+    def delete(self, key: str) -> bool:
+        """Remove a value"""
+        with self._lock:
+            deleted = self._db.execute("DELETE FROM entries WHERE key = ?", (key,)).rowcount
+            self._db.commit()
+        return bool(deleted)
+
+    def pending(self, limit: int = 500) -> List[Tuple[str, Dict[str, Any], int]]:
+        """
+        Get entries waiting to be copied to Redis
+
+        Returns:
+            (key, value, remaining TTL in seconds) for up to limit entries
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, value, expires_at FROM entries WHERE expires_at > ? LIMIT ?",
+                (now, limit)
+            ).fetchall()
+        return [(key, json.loads(value), max(1, int(expires_at - now))) for key, value, expires_at in rows]
+
+    def remove(self, keys: List[str]) -> None:
+        """Remove entries that have been copied to Redis"""
+        with self._lock:
+            self._db.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in keys])
+            self._db.commit()
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+            self._db.commit()
+
+    def count(self) -> int:
+        """Number of stored entries, including expired ones not yet removed"""
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the database"""
+        with self._lock:
+            self._db.close()
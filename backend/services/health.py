@@ -0,0 +1,159 @@
+"""
+Service health for /health, kept up to date in the background
+
+Each worker refreshes the state of Redis, the providers and the job queue
+every health_refresh_interval seconds and keeps the encoded report, so
+/health answers from memory in well under a millisecond however often a
+load balancer asks, and never calls anything itself.
+
+Provider health comes from the worker's real provider calls. A provider
+that has had none for health_probe_interval seconds is probed by listing
+its models, which costs no tokens; nothing is probed while traffic flows.
+"""
+import asyncio
+import json
+import time
+from typing import Any, Dict, Optional, Set
+
+from loguru import logger
+
+from backend.services.cache import CacheService
+from backend.services.jobs import JobQueue
+from backend.services.llm_client import get_llm_client
+from backend.utils.provider_health import provider_health
+
+# Longest a refresh waits for Redis before reporting it down
+CHECK_TIMEOUT = 1.0
+
+
+def overall_status(redis_ok: bool, providers: Dict[str, Dict[str, Any]]) -> str:
+    """
+    Summarize the checks
+
+    Returns:
+        unhealthy if no provider can serve recognitions, degraded if Redis
+        (the cache falls back to local storage) or some provider is failing,
+        otherwise healthy
+    """
+    statuses = [provider["status"] for provider in providers.values()]
+    if statuses and all(status == "down" for status in statuses):
+        return "unhealthy"
+    if not redis_ok or any(status in ("down", "degraded") for status in statuses):
+        return "degraded"
+    return "healthy"
+
+
+class HealthMonitor:
+    """Refreshes this worker's health report and probes idle providers"""
+
+    def __init__(self, refresh_interval: float = 5, probe_interval: float = 900):
+        """
+        Args:
+            refresh_interval: Seconds between refreshes
+            probe_interval: Seconds without provider calls before a probe (0 disables probes)
+        """
+        self.refresh_interval = refresh_interval
+        self.probe_interval = probe_interval
+        self.cache = CacheService()
+        self.report: Dict[str, Any] = {"status": "starting", "checks": {"api": "ok"}}
+        self.body = json.dumps(self.report).encode()
+        self._last_probe: Dict[str, float] = {}
+        self._probes: Set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start refreshing on the running loop"""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop refreshing and cancel probes in flight"""
+        tasks = [task for task in (self._task, *self._probes) if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+                self._probe_idle_providers()
+            except Exception as e:
+                logger.warning(f"Health refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def refresh(self) -> Dict[str, Any]:
+        """
+        Check Redis and the job queue and collect provider health
+
+        Returns:
+            The new report
+        """
+        redis_ok, queue = await asyncio.gather(self._check_redis(), self._queue_depth())
+        providers = {name: provider_health(name).snapshot() for name in get_llm_client().configured_providers()}
+        self.report = {
+            "status": overall_status(redis_ok, providers),
+            "checked_at": round(time.time(), 3),
+            "checks": {
+                "api": "ok",
+                "redis": {"status": "ok" if redis_ok else "down", "circuit": self.cache.circuit.state},
+                "providers": providers,
+                "queue": queue,
+            },
+        }
+        self.body = json.dumps(self.report).encode()
+        return self.report
+
+    async def _check_redis(self) -> bool:
+        try:
+            return await asyncio.wait_for(self.cache.health_check(), timeout=CHECK_TIMEOUT)
+        except asyncio.TimeoutError:
+            return False
+
+    async def _queue_depth(self) -> Optional[Dict[str, int]]:
+        """Job queue depth, or None while Redis cannot be read"""
+        if self.cache.circuit.is_open:
+            return None
+        try:
+            return await asyncio.wait_for(JobQueue().depth(), timeout=CHECK_TIMEOUT)
+        except Exception as e:
+            logger.debug(f"Could not read job queue depth: {e}")
+            return None
+
+    def _probe_idle_providers(self) -> None:
+        if not self.probe_interval:
+            return
+        now = time.monotonic()
+        client = get_llm_client()
+        for name in client.configured_providers():
+            if provider_health(name).idle_for() < self.probe_interval:
+                continue
+            if now - self._last_probe.get(name, float("-inf")) < self.probe_interval:
+                continue
+            self._last_probe[name] = now
+            task = asyncio.create_task(client.probe_provider(name))
+            self._probes.add(task)
+            task.add_done_callback(self._probes.discard)
+
+
+_monitor: Optional[HealthMonitor] = None
+
+
+def start_health_monitor(refresh_interval: float, probe_interval: float) -> HealthMonitor:
+    """Start the per-process health monitor on the running loop"""
+    global _monitor
+    _monitor = HealthMonitor(refresh_interval, probe_interval)
+    _monitor.start()
+    return _monitor
+
+
+def get_health_monitor() -> Optional[HealthMonitor]:
+    """The running health monitor, if any"""
+    return _monitor
+
+
+async def stop_health_monitor() -> None:
+    """Stop the health monitor"""
+    global _monitor
+    if _monitor:
+        monitor, _monitor = _monitor, None
+        await monitor.stop()
@@ -0,0 +1,323 @@
+"""
+Offline bulk recognition of image directories and tarballs
+"""
+import asyncio
+import csv
+import json
+import os
+import tarfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from loguru import logger
+
+from backend.config import get_settings
+from backend.services.cache import ImageHasher
+from backend.services.recognition import RecognitionService
+
+
+RESULT_FIELDS = ["name", "image_hash", "status", "band_name", "confidence", "genre", "ai_model", "error"]
+
+
+def _hash_path(path: str) -> Tuple[str, int]:
+    """Hash a file (runs in a worker process)"""
+    data = Path(path).read_bytes()
+    return ImageHasher.hash_image(data), len(data)
+
+
+def _hash_bytes(data: bytes) -> Tuple[str, int]:
+    """Hash file contents (runs in a worker process)"""
+    return ImageHasher.hash_image(data), len(data)
+
+
+class ImageSource:
+    """Image files in a directory tree or a (compressed) tarball"""
+
+    def __init__(self, path: str, extensions: List[str], max_size: int):
+        self.path = Path(path)
+        self.extensions = {ext.lower() for ext in extensions}
+        self.max_size = max_size
+        self.is_tar = self.path.is_file() and tarfile.is_tarfile(self.path)
+        if not self.is_tar and not self.path.is_dir():
+            raise ValueError(f"{path} is neither a directory nor a tarball")
+
+    def _wanted(self, name: str, size: int) -> bool:
+        return Path(name).suffix.lower() in self.extensions and 0 < size <= self.max_size
+
+    def _files(self) -> List[Tuple[str, Path]]:
+        files = []
+        for file in sorted(self.path.rglob("*")):
+            if file.is_file() and self._wanted(file.name, file.stat().st_size):
+                files.append((file.relative_to(self.path).as_posix(), file))
+        return files
+
+    async def hash_all(self, pool: ProcessPoolExecutor, workers: int) -> Dict[str, Tuple[str, int]]:
+        """
+        Hash every image in the source
+
+        Returns:
+            {name: (image hash, size in bytes)}
+        """
+        loop = asyncio.get_running_loop()
+        hashes: Dict[str, Tuple[str, int]] = {}
+
+        if not self.is_tar:
+            files = self._files()
+            results = await asyncio.gather(*(loop.run_in_executor(pool, _hash_path, str(file)) for _, file in files))
+            return {name: result for (name, _), result in zip(files, results)}
+
+        # Members are read in order (cheap for compressed tarballs too) and
+        # hashed by the pool, with a bounded number of files in flight
+        in_flight: Dict[asyncio.Future, str] = {}
+        async for name, data in self.read():
+            in_flight[loop.run_in_executor(pool, _hash_bytes, data)] = name
+            if len(in_flight) >= workers * 2:
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    hashes[in_flight.pop(future)] = future.result()
+        for future, name in in_flight.items():
+            hashes[name] = await future
+        return hashes
+
+    async def read(self, names: Optional[Set[str]] = None) -> AsyncIterator[Tuple[str, bytes]]:
+        """
+        Stream (name, contents) for images in the source
+
+        Args:
+            names: Only these images; all if None
+        """
+        if not self.is_tar:
+            for name, file in self._files():
+                if names is None or name in names:
+                    yield name, await asyncio.to_thread(file.read_bytes)
+            return
+
+        with tarfile.open(self.path, "r:*") as tar:
+            members = iter(tar)
+            while True:
+                member = await asyncio.to_thread(next, members, None)
+                if member is None:
+                    break
+                if not member.isfile() or not self._wanted(member.name, member.size):
+                    continue
+                if names is not None and member.name not in names:
+                    continue
+                yield member.name, await asyncio.to_thread(tar.extractfile(member).read)
+
+
+class ResultWriter:
+    """Append-only CSV or JSONL results file, flushed per row"""
+
+    def __init__(self, path: str, fmt: str):
+        self.fmt = fmt
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "a", newline="", encoding="utf-8")
+        if fmt == "csv":
+            self.writer = csv.DictWriter(self.file, fieldnames=RESULT_FIELDS, extrasaction="ignore")
+            if is_new:
+                self.writer.writeheader()
+
+    def write(self, row: Dict) -> None:
+        if self.fmt == "csv":
+            self.writer.writerow(row)
+        else:
+            self.file.write(json.dumps({field: row.get(field) for field in RESULT_FIELDS}) + "\n")
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+    @staticmethod
+    def read(path: str, fmt: str) -> List[Dict]:
+        """Read back the rows of an existing results file"""
+        if not os.path.exists(path):
+            return []
+        with open(path, newline="", encoding="utf-8") as f:
+            if fmt == "csv":
+                return list(csv.DictReader(f))
+            return [json.loads(line) for line in f if line.strip()]
+
+
+@dataclass
+class IngestReport:
+    """Counts and timings of an ingest run"""
+    files: int = 0
+    unique_images: int = 0
+    resumed: int = 0
+    cached: int = 0
+    recognized: int = 0
+    failed: int = 0
+    cost: float = 0.0
+    hash_seconds: float = 0.0
+    total_seconds: float = 0.0
+
+    @property
+    def processed(self) -> int:
+        return self.cached + self.recognized + self.failed
+
+    @property
+    def hit_ratio(self) -> float:
+        return self.cached / self.processed if self.processed else 0.0
+
+    @property
+    def throughput(self) -> float:
+        return self.processed / self.total_seconds if self.total_seconds else 0.0
+
+
+class BulkIngest:
+    """
+    Recognize every image in a directory or tarball through RecognitionService
+
+    Files are hashed in a process pool. Images already in the cache are
+    answered from it. The rest are recognized with at most concurrency
+    provider calls in flight, once per unique image. Every result row is
+    appended and flushed straight away. The hashes are saved to a
+    checkpoint file, so an interrupted run resumes where it stopped.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        output: str,
+        fmt: Optional[str] = None,
+        concurrency: int = 4,
+        workers: Optional[int] = None,
+        resume: bool = True,
+        retry_failed: bool = False,
+        progress: Optional[Callable[[IngestReport], None]] = None
+    ):
+        self.settings = get_settings()
+        self.source = ImageSource(source, self.settings.allowed_extensions, self.settings.max_file_size)
+        self.output = output
+        self.fmt = fmt or ("csv" if output.endswith(".csv") else "jsonl")
+        self.checkpoint = f"{output}.checkpoint.json"
+        self.concurrency = concurrency
+        self.workers = workers or os.cpu_count() or 1
+        self.resume = resume
+        self.retry_failed = retry_failed
+        self.progress = progress
+        self.service = RecognitionService()
+        self.report = IngestReport()
+        self.writer: Optional[ResultWriter] = None
+
+    def _load_hashes(self) -> Optional[Dict[str, Tuple[str, int]]]:
+        """Hashes saved by an earlier run over the same source"""
+        try:
+            with open(self.checkpoint, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get("source") != str(self.source.path.resolve()):
+            return None
+        return {name: tuple(value) for name, value in state["hashes"].items()}
+
+    def _save_hashes(self, hashes: Dict[str, Tuple[str, int]]) -> None:
+        tmp_path = f"{self.checkpoint}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"source": str(self.source.path.resolve()), "hashes": hashes}, f)
+        os.replace(tmp_path, self.checkpoint)
+
+    def _done(self) -> Set[str]:
+        """Names already present in the results file"""
+        return {
+            row["name"] for row in ResultWriter.read(self.output, self.fmt)
+            if not (self.retry_failed and row.get("status") == "failed")
+        }
+
+    def _write(self, names: List[str], image_hash: str, status: str, result=None, error: str = None) -> None:
+        for name in names:
+            row = {"name": name, "image_hash": image_hash, "status": status, "error": error}
+            if result is not None:
+                row.update(band_name=result.band_name, confidence=result.confidence,
+                           genre=result.genre, ai_model=result.ai_model)
+            self.writer.write(row)
+            setattr(self.report, status, getattr(self.report, status) + 1)
+        if self.progress:
+            self.progress(self.report)
+
+    async def run(self) -> IngestReport:
+        """Run the ingest and return its report"""
+        started = time.perf_counter()
+
+        hashes = self._load_hashes() if self.resume else None
+        if hashes is None:
+            with ProcessPoolExecutor(self.workers) as pool:
+                hashes = await self.source.hash_all(pool, self.workers)
+            self._save_hashes(hashes)
+        self.report.hash_seconds = time.perf_counter() - started
+
+        done = self._done() if self.resume else set()
+        if not self.resume and os.path.exists(self.output):
+            os.remove(self.output)
+
+        by_hash: Dict[str, List[str]] = {}
+        for name, (image_hash, _) in hashes.items():
+            if name not in done:
+                by_hash.setdefault(image_hash, []).append(name)
+        self.report.files = len(hashes)
+        self.report.resumed = len(hashes) - sum(len(names) for names in by_hash.values())
+        self.report.unique_images = len(by_hash)
+        logger.info(f"Ingesting {self.report.files} files, {self.report.unique_images} unique images to process")
+
+        self.writer = ResultWriter(self.output, self.fmt)
+        try:
+            misses = await self._answer_from_cache(by_hash)
+            await self._recognize_all(misses)
+        finally:
+            self.writer.close()
+
+        self.report.total_seconds = time.perf_counter() - started
+        return self.report
+
+    async def _answer_from_cache(self, by_hash: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """Write rows for cached images and return the ones still to recognize"""
+        semaphore = asyncio.Semaphore(50)
+
+        async def lookup(image_hash: str):
+            async with semaphore:
+                return image_hash, await self.service.get_cached_entry(image_hash)
+
+        misses = {}
+        for image_hash, entry in await asyncio.gather(*(lookup(image_hash) for image_hash in by_hash)):
+            if entry:
+                self._write(by_hash[image_hash], image_hash, "cached", self.service.result_from_entry(entry))
+            else:
+                misses[image_hash] = by_hash[image_hash]
+        return misses
+
+    async def _recognize_all(self, misses: Dict[str, List[str]]) -> None:
+        """Recognize each missing image once, at most concurrency at a time"""
+        from backend.utils.rate_limiter import cost_tracker
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        first_names = {names[0]: image_hash for image_hash, names in misses.items()}
+        tasks = set()
+
+        async def recognize(name: str, data: bytes) -> None:
+            image_hash = first_names[name]
+            try:
+                result = await self.service.recognize_logo(data, name, priority="bulk", tenant="ingest")
+                if not result.cached:
+                    self.report.cost += cost_tracker.costs.get(result.ai_model, 0.02)
+                self._write(misses[image_hash], image_hash, "cached" if result.cached else "recognized", result)
+            except HTTPException as e:
+                message = e.detail.get("message") if isinstance(e.detail, dict) else str(e.detail)
+                self._write(misses[image_hash], image_hash, "failed", error=message)
+            except Exception as e:
+                self._write(misses[image_hash], image_hash, "failed", error=str(e))
+            finally:
+                semaphore.release()
+
+        # Waiting for a free slot before reading the next file bounds memory use
+        async for name, data in self.source.read(set(first_names)):
+            await semaphore.acquire()
+            task = asyncio.create_task(recognize(name, data))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks)
@@ -0,0 +1,338 @@
+"""
+Durable recognition job queue on Redis Streams
+"""
+import asyncio
+import base64
+import json
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+from redis.exceptions import ResponseError
+
+from backend.config import get_settings
+from backend.models.recognition import RecognitionResult
+from backend.services.cache import ImageHasher, get_redis_client
+
+
+class JobQueue:
+    """
+    Recognition jobs on Redis streams, consumed by a consumer group
+
+    Each job is a hash with its status and result, plus a short-lived key
+    holding the image. API and bulk jobs go on separate streams that only
+    carry job ids, and workers take API jobs first, so bulk jobs wait
+    behind them however the queue was filled. Workers acknowledge
+    a message once the job reached a final state, so a job held by a worker
+    that died is claimed by another one after job_visibility_timeout, and
+    then delete it. The stream is never trimmed by length, which could drop
+    jobs no worker has read yet; it only holds unfinished jobs.
+    Failed attempts are re-queued through a sorted set of due times with
+    exponential backoff; after job_max_attempts the job is failed and
+    copied to the dead-letter stream.
+    """
+
+    QUEUED = "queued"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    FINAL = (COMPLETED, FAILED)
+
+    def __init__(self):
+        self.settings = get_settings()
+        self.stream = "logodeth:jobs"
+        self.bulk_stream = "logodeth:jobs:bulk"
+        # Read in this order, so API jobs are taken before bulk ones
+        self.streams = (self.stream, self.bulk_stream)
+        self.group = "recognizers"
+        self.delayed = "logodeth:jobs:delayed"
+        self.dead_letter = "logodeth:jobs:dead"
+        self.job_prefix = "logodeth:job:"
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.job_prefix}{job_id}"
+
+    def _image_key(self, job_id: str) -> str:
+        return f"{self.job_prefix}{job_id}:image"
+
+    def _stream_for(self, priority: Optional[str]) -> str:
+        return self.bulk_stream if priority == "bulk" else self.stream
+
+    async def submit(
+        self,
+        image_data: bytes,
+        filename: Optional[str],
+        original_hash: Optional[str] = None,
+        result: Optional[RecognitionResult] = None,
+        priority: str = "api",
+        tenant: str = "default"
+    ) -> str:
+        """
+        Create a job
+
+        Args:
+            image_data: Raw image bytes
+            filename: Original filename
+            original_hash: Hash of the original file if the client downscaled it
+            result: Known result (e.g. from the cache); the job is then
+                created as completed and never queued
+            priority: Scheduling class of the provider call (api or bulk)
+            tenant: Caller the provider call is accounted to
+
+        Returns:
+            Job id
+        """
+        client = get_redis_client()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        job = {
+            "status": self.QUEUED,
+            "filename": filename or "",
+            "original_hash": original_hash or "",
+            "priority": priority,
+            "tenant": tenant,
+            "image_hash": ImageHasher.hash_image(image_data),
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+        if result is not None:
+            job.update(status=self.COMPLETED, result=result.model_dump_json())
+
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.hset(self._job_key(job_id), mapping=job)
+            pipe.expire(self._job_key(job_id), self.settings.job_ttl)
+            if result is None:
+                pipe.set(self._image_key(job_id), base64.b64encode(image_data).decode(), ex=self.settings.job_ttl)
+                pipe.xadd(self._stream_for(priority), {"job_id": job_id})
+            await pipe.execute()
+
+        logger.info(f"Job {job_id} {job['status']} for image hash {job['image_hash']}")
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a job's status
+
+        Returns:
+            Dict matching JobStatus, or None for unknown or expired jobs
+        """
+        client = get_redis_client()
+        job = await client.hgetall(self._job_key(job_id))
+        if not job:
+            return None
+
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "attempts": int(job.get("attempts", 0)),
+            "created_at": float(job["created_at"]),
+            "updated_at": float(job["updated_at"]),
+            "result": json.loads(job["result"]) if job.get("result") else None,
+            "error": job.get("error") or None,
+        }
+
+    async def wait(self, job_id: str, timeout: float, interval: float = 0.5) -> Optional[Dict[str, Any]]:
+        """
+        Get a job's status, waiting up to timeout seconds for it to finish
+
+        Polls the job hash rather than blocking on Redis, so waiting clients
+        never hold a pooled connection.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await self.get(job_id)
+            if job is None or job["status"] in self.FINAL or time.monotonic() >= deadline:
+                return job
+            await asyncio.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+
+    async def depth(self) -> Dict[str, int]:
+        """
+        Count jobs by where they are in the queue
+        
+        Returns:
+            Dict with waiting (not yet read by any worker), processing
+            (read but unacknowledged) and delayed (waiting for a retry)
+        """
+        client = get_redis_client()
+        depth = {"waiting": 0, "processing": 0}
+        for stream in self.streams:
+            try:
+                groups = await client.xinfo_groups(stream)
+            except ResponseError:
+                groups = []  # Stream not created yet
+            group = next((g for g in groups if g["name"] == self.group), {})
+            depth["waiting"] += group.get("lag") or 0
+            depth["processing"] += group.get("pending", 0)
+        depth["delayed"] = await client.zcard(self.delayed)
+        return depth
+    
+    # Worker side
+
+    async def ensure_group(self) -> None:
+        """Create the streams and consumer group if missing"""
+        for stream in self.streams:
+            try:
+                await get_redis_client().xgroup_create(stream, self.group, id="0", mkstream=True)
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+    async def claim(self, consumer: str, count: int, block_ms: int = 2000) -> List[Tuple[str, str, str]]:
+        """
+        Take up to count messages for a consumer, API jobs before bulk ones
+
+        Due retries are moved onto their stream first, then messages
+        abandoned by dead workers are reclaimed, and only then new messages
+        are read. When both streams are empty the read blocks on them
+        together, one message per stream, or on the API stream alone when
+        only one message fits.
+
+        Returns:
+            (stream, message id, job id) triples
+        """
+        client = get_redis_client()
+        await self._release_due_retries(client)
+
+        messages = []
+        for stream in self.streams:
+            _, reclaimed, *_ = await client.xautoclaim(
+                stream, self.group, consumer,
+                min_idle_time=self.settings.job_visibility_timeout * 1000,
+                start_id="0-0",
+                count=count - len(messages)
+            )
+            messages += [(stream, message_id, fields) for message_id, fields in reclaimed if fields]
+            if len(messages) >= count:
+                break
+        if messages:
+            logger.warning(f"Reclaimed {len(messages)} jobs from unresponsive workers")
+            return [(stream, message_id, fields["job_id"]) for stream, message_id, fields in messages]
+
+        for stream in self.streams:
+            read = await client.xreadgroup(self.group, consumer, {stream: ">"}, count=count - len(messages))
+            messages += [(stream, message_id, fields) for _, entries in read for message_id, fields in entries]
+            if len(messages) >= count:
+                break
+        if not messages:
+            streams = self.streams if count > 1 else self.streams[:1]
+            read = await client.xreadgroup(self.group, consumer, {s: ">" for s in streams}, count=1, block=block_ms)
+            messages = [(stream, message_id, fields) for stream, entries in read for message_id, fields in entries]
+            messages.sort(key=lambda message: self.streams.index(message[0]))
+
+        return [(stream, message_id, fields["job_id"]) for stream, message_id, fields in messages]
+
+    async def _release_due_retries(self, client) -> None:
+        """Move retries whose backoff has passed back onto their stream"""
+        due = await client.zrangebyscore(self.delayed, "-inf", time.time(), start=0, num=100)
+        for job_id in due:
+            # Only the worker whose ZREM succeeds re-queues the job
+            if await client.zrem(self.delayed, job_id):
+                priority = await client.hget(self._job_key(job_id), "priority")
+                await client.xadd(self._stream_for(priority), {"job_id": job_id})
+
+    async def start(self, job_id: str) -> Tuple[Optional[Dict[str, str]], Optional[bytes]]:
+        """
+        Mark a job as processing and count the attempt
+
+        Returns:
+            (job hash, image bytes); either is None if the job expired
+        """
+        client = get_redis_client()
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.hgetall(self._job_key(job_id))
+            pipe.get(self._image_key(job_id))
+            job, image = await pipe.execute()
+
+        if not job:
+            return None, None
+
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.hincrby(self._job_key(job_id), "attempts", 1)
+            pipe.hset(self._job_key(job_id), mapping={"status": self.PROCESSING, "updated_at": time.time()})
+            job["attempts"] = (await pipe.execute())[0]
+
+        return job, base64.b64decode(image) if image else None
+
+    async def complete(self, stream: str, message_id: str, job_id: str, result: RecognitionResult) -> None:
+        """Store a job's result and acknowledge it"""
+        client = get_redis_client()
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.hset(self._job_key(job_id), mapping={
+                "status": self.COMPLETED,
+                "result": result.model_dump_json(),
+                "error": "",
+                "updated_at": time.time(),
+            })
+            pipe.delete(self._image_key(job_id))
+            self._queue_ack(pipe, stream, message_id)
+            await pipe.execute()
+
+    async def retry_or_fail(
+        self,
+        stream: str,
+        message_id: str,
+        job_id: str,
+        error: str,
+        attempts: int,
+        retry_after: Optional[int] = None
+    ) -> bool:
+        """
+        Re-queue a failed attempt with backoff, or fail the job for good
+
+        Args:
+            stream: Stream the message was read from
+            message_id: Stream message of this attempt
+            job_id: Job id
+            error: What went wrong
+            attempts: Attempts made so far
+            retry_after: Minimum delay requested by the failure, in seconds
+
+        Returns:
+            True if the job will be retried
+        """
+        if attempts >= self.settings.job_max_attempts:
+            await self.fail(stream, message_id, job_id, error, attempts)
+            return False
+
+        delay = max(retry_after or 0, self.settings.job_retry_delay * 2 ** (attempts - 1))
+        client = get_redis_client()
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.hset(self._job_key(job_id), mapping={"status": self.QUEUED, "error": error[:500], "updated_at": time.time()})
+            pipe.zadd(self.delayed, {job_id: time.time() + delay})
+            self._queue_ack(pipe, stream, message_id)
+            await pipe.execute()
+
+        logger.info(f"Job {job_id} attempt {attempts} failed, retrying in {delay}s: {error}")
+        return True
+
+    async def fail(self, stream: str, message_id: str, job_id: str, error: str, attempts: int = 0) -> None:
+        """Fail a job for good and copy it to the dead-letter stream"""
+        client = get_redis_client()
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.hset(self._job_key(job_id), mapping={"status": self.FAILED, "error": error[:500], "updated_at": time.time()})
+            pipe.delete(self._image_key(job_id))
+            pipe.xadd(
+                self.dead_letter,
+                {"job_id": job_id, "error": error[:500], "attempts": attempts, "failed_at": time.time()},
+                maxlen=self.settings.job_stream_maxlen,
+                approximate=True
+            )
+            self._queue_ack(pipe, stream, message_id)
+            await pipe.execute()
+
+        logger.error(f"Job {job_id} failed after {attempts} attempts: {error}")
+
+    async def discard(self, stream: str, message_id: str, job_id: str) -> None:
+        """Drop the message of a job whose hash has expired, without recreating it"""
+        async with get_redis_client().pipeline(transaction=False) as pipe:
+            self._queue_ack(pipe, stream, message_id)
+            await pipe.execute()
+
+        logger.warning(f"Job {job_id} expired before it could be processed")
+
+    def _queue_ack(self, pipe, stream: str, message_id: str) -> None:
+        """Queue acknowledging a message and removing it from its stream"""
+        pipe.xack(stream, self.group, message_id)
+        pipe.xdel(stream, message_id)
@@ -1,13 +1,47 @@
 """
 LLM client for multimodal AI services
 """
+import asyncio
 import json
-from typing import Dict, Any
-from openai import AsyncOpenAI
-from anthropic import AsyncAnthropic
+import threading
+import time
+from typing import Dict, Any, List, Optional
 from loguru import logger
 
 from backend.config import get_settings
+from backend.utils.metrics import track_provider, track_stage
+from backend.utils.provider_health import record_provider_call
+
+
+# Bump PROMPT_VERSION whenever RECOGNITION_PROMPT changes in a way that affects
+# results; cached entries from older versions are then refreshed in the background
+PROMPT_VERSION = "1"
+
+RECOGNITION_PROMPT = """You are an expert in metal music and band logos. Analyze this metal band logo and provide:
+
+1. The band name (be as accurate as possible)
+2. The music genre/subgenre (e.g., Black Metal, Death Metal, Doom Metal, etc.)
+3. Your confidence level (0-100)
+4. A brief description of the logo style
+
+Respond in JSON format:
+{
+    "band_name": "Band Name",
+    "genre": "Genre",
+    "confidence": 85,
+    "description": "Brief description of the logo"
+}
+
+If you cannot identify the band, still provide your best guess with low confidence."""
+
+
+def get_result_version(settings) -> str:
+    """
+    Version tag for recognition results produced with the current configuration
+    
+    Changes whenever a provider model or the prompt changes.
+    """
+    return f"{settings.openai_model}|{settings.anthropic_model}|prompt-{PROMPT_VERSION}"
 
 
 class LLMClient:
@@ -15,10 +49,37 @@ class LLMClient:
     
     def __init__(self):
         self.settings = get_settings()
+        # The provider SDKs take over a second to import, so they are loaded
+        # and their clients created on first use (or by preload())
+        self._openai_client = None
+        self._anthropic_client = None
+        self._lock = threading.Lock()
+    
+    @property
+    def openai_client(self):
+        """OpenAI SDK client, created on first use"""
+        if self._openai_client is None:
+            with self._lock:
+                if self._openai_client is None:
+                    self._openai_client = self._create_openai_client()
+        return self._openai_client
+    
+    @property
+    def anthropic_client(self):
+        """Anthropic SDK client, created on first use; None if no API key is configured"""
+        if self._anthropic_client is None and self.settings.anthropic_api_key:
+            with self._lock:
+                if self._anthropic_client is None:
+                    self._anthropic_client = self._create_anthropic_client()
+        return self._anthropic_client
+    
+    def _create_openai_client(self):
+        from openai import AsyncOpenAI
         
         # Configure OpenAI client with optional custom base URL
         openai_kwargs = {
-            "api_key": self.settings.openai_api_key
+            "api_key": self.settings.openai_api_key,
+            "timeout": self.settings.ai_timeout
         }
         
         # Support for OpenRouter or other OpenAI-compatible APIs
@@ -37,20 +98,42 @@ class LLMClient:
                 "X-Title": self.settings.openrouter_app_name or "LOGODETH"
             }
         
-        self.openai_client = AsyncOpenAI(**openai_kwargs)
+        return AsyncOpenAI(**openai_kwargs)
+    
+    def _create_anthropic_client(self):
+        from anthropic import AsyncAnthropic
         
         # Configure Anthropic client with optional custom base URL
-        if self.settings.anthropic_api_key:
-            anthropic_kwargs = {
-                "api_key": self.settings.anthropic_api_key
-            }
-            if self.settings.anthropic_base_url:
-                anthropic_kwargs["base_url"] = self.settings.anthropic_base_url
-                logger.info(f"Using custom Anthropic base URL: {self.settings.anthropic_base_url}")
-            
-            self.anthropic_client = AsyncAnthropic(**anthropic_kwargs)
-        else:
-            self.anthropic_client = None
+        anthropic_kwargs = {
+            "api_key": self.settings.anthropic_api_key,
+            "timeout": self.settings.ai_timeout
+        }
+        if self.settings.anthropic_base_url:
+            anthropic_kwargs["base_url"] = self.settings.anthropic_base_url
+            logger.info(f"Using custom Anthropic base URL: {self.settings.anthropic_base_url}")
+        
+        return AsyncAnthropic(**anthropic_kwargs)
+    
+    async def preload(self) -> None:
+        """Import the SDKs and create the provider clients in a thread, off the event loop"""
+        try:
+            await asyncio.to_thread(lambda: (self.openai_client, self.anthropic_client))
+            logger.debug("Provider SDKs loaded")
+        except Exception as e:
+            # Left to the first request, which reports the error properly
+            logger.warning(f"Could not preload provider clients: {e}")
+    
+    async def close(self) -> None:
+        """Close the provider clients' connection pools"""
+        for client in (self._openai_client, self._anthropic_client):
+            if client is not None:
+                await client.close()
+        self._openai_client = self._anthropic_client = None
+    
+    @property
+    def result_version(self) -> str:
+        """Version tag for results produced by this client"""
+        return get_result_version(self.settings)
     
     async def recognize_with_openai(self, base64_image: str) -> Dict[str, Any]:
         """
@@ -62,22 +145,7 @@ class LLMClient:
         Returns:
             Dict with recognition results
         """
-        prompt = """You are an expert in metal music and band logos. Analyze this metal band logo and provide:
-
-1. The band name (be as accurate as possible)
-2. The music genre/subgenre (e.g., Black Metal, Death Metal, Doom Metal, etc.)
-3. Your confidence level (0-100)
-4. A brief description of the logo style
-
-Respond in JSON format:
-{
-    "band_name": "Band Name",
-    "genre": "Genre",
-    "confidence": 85,
-    "description": "Brief description of the logo"
-}
-
-If you cannot identify the band, still provide your best guess with low confidence."""
+        prompt = RECOGNITION_PROMPT
 
         try:
             # Use configured model (supports OpenRouter model names)
@@ -99,45 +167,33 @@ If you cannot identify the band, still provide your best guess with low confiden
             
             logger.debug(f"Using model: {model}")
             
-            response = await self.openai_client.chat.completions.create(
-                model=model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}",
-                                    "detail": "high"
+            with track_provider("openai", model):
+                response = await self.openai_client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": [
+                                {"type": "text", "text": prompt},
+                                {
+                                    "type": "image_url",
+                                    "image_url": {
+                                        "url": f"data:image/jpeg;base64,{base64_image}",
+                                        "detail": "high"
+                                    }
                                 }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=300,
-                temperature=0.1
-            )
+                            ]
+                        }
+                    ],
+                    max_tokens=300,
+                    temperature=0.1
+                )
             
             # Parse response
             content = response.choices[0].message.content
             logger.debug(f"OpenAI response: {content}")
             
-            # Try to parse JSON
-            try:
-                # Find JSON in the response
-                start = content.find('{')
-                end = content.rfind('}') + 1
-                if start >= 0 and end > start:
-                    json_str = content[start:end]
-                    return json.loads(json_str)
-                else:
-                    # Fallback parsing
-                    return self._parse_text_response(content)
-            except json.JSONDecodeError:
-                logger.warning("Failed to parse JSON response, using fallback parser")
-                return self._parse_text_response(content)
+            return self._parse_response(content)
                 
         except Exception as e:
             logger.error(f"OpenAI API error: {e}")
@@ -156,66 +212,40 @@ If you cannot identify the band, still provide your best guess with low confiden
         if not self.anthropic_client:
             raise Exception("Anthropic API key not configured")
         
-        prompt = """You are an expert in metal music and band logos. Analyze this metal band logo and provide:
-
-1. The band name (be as accurate as possible)
-2. The music genre/subgenre (e.g., Black Metal, Death Metal, Doom Metal, etc.)
-3. Your confidence level (0-100)
-4. A brief description of the logo style
-
-Respond in JSON format:
-{
-    "band_name": "Band Name",
-    "genre": "Genre",
-    "confidence": 85,
-    "description": "Brief description of the logo"
-}
-
-If you cannot identify the band, still provide your best guess with low confidence."""
+        prompt = RECOGNITION_PROMPT
 
         try:
-            response = await self.anthropic_client.messages.create(
-                model=self.settings.anthropic_model,
-                max_tokens=300,
-                temperature=0.1,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": prompt
-                            },
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": "image/jpeg",
-                                    "data": base64_image
+            with track_provider("anthropic", self.settings.anthropic_model):
+                response = await self.anthropic_client.messages.create(
+                    model=self.settings.anthropic_model,
+                    max_tokens=300,
+                    temperature=0.1,
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": [
+                                {
+                                    "type": "text",
+                                    "text": prompt
+                                },
+                                {
+                                    "type": "image",
+                                    "source": {
+                                        "type": "base64",
+                                        "media_type": "image/jpeg",
+                                        "data": base64_image
+                                    }
                                 }
-                            }
-                        ]
-                    }
-                ]
-            )
+                            ]
+                        }
+                    ]
+                )
             
             # Parse response
             content = response.content[0].text
             logger.debug(f"Anthropic response: {content}")
             
-            # Try to parse JSON
-            try:
-                # Find JSON in the response
-                start = content.find('{')
-                end = content.rfind('}') + 1
-                if start >= 0 and end > start:
-                    json_str = content[start:end]
-                    return json.loads(json_str)
-                else:
-                    return self._parse_text_response(content)
-            except json.JSONDecodeError:
-                logger.warning("Failed to parse JSON response, using fallback parser")
-                return self._parse_text_response(content)
+            return self._parse_response(content)
                 
         except Exception as e:
             logger.error(f"Anthropic API error: {e}")
@@ -260,6 +290,29 @@ If you cannot identify the band, still provide your best guess with low confiden
         else:
             raise Exception("No available providers configured")
     
+    def _parse_response(self, content: str) -> Dict[str, Any]:
+        """
+        Parse a provider response, preferring the JSON object in it
+        
+        Args:
+            content: Raw text response
+            
+        Returns:
+            Dict with recognition results
+        """
+        with track_stage("parsing"):
+            try:
+                # Find JSON in the response
+                start = content.find('{')
+                end = content.rfind('}') + 1
+                if start >= 0 and end > start:
+                    return json.loads(content[start:end])
+                # Fallback parsing
+                return self._parse_text_response(content)
+            except json.JSONDecodeError:
+                logger.warning("Failed to parse JSON response, using fallback parser")
+                return self._parse_text_response(content)
+    
     def _parse_text_response(self, text: str) -> Dict[str, Any]:
         """
         Fallback parser for non-JSON responses
@@ -269,6 +322,9 @@ If you cannot identify the band, still provide your best guess with low confiden
             
         Returns:
             Dict with parsed results
+            
+        Raises:
+            ValueError: If not even a band name could be extracted
         """
         # Basic fallback parsing
         result = {
@@ -295,6 +351,10 @@ If you cannot identify the band, still provide your best guess with low confiden
                 except:
                     pass
         
+        # Treat output without a band name as a failure rather than caching a guess
+        if result["band_name"] in ("", "Unknown"):
+            raise ValueError("Could not parse provider response")
+        
         return result
     
     def get_provider_info(self) -> Dict[str, Any]:
@@ -328,47 +388,53 @@ If you cannot identify the band, still provide your best guess with low confiden
             
         return info
     
-    async def get_provider_health(self) -> Dict[str, bool]:
+    def configured_providers(self) -> List[str]:
+        """Providers with an API key"""
+        return [name for name, key in (("openai", self.settings.openai_api_key), ("anthropic", self.settings.anthropic_api_key)) if key]
+    
+    async def probe_provider(self, provider: str) -> bool:
         """
-        Check health status of available providers
+        Check that a provider is reachable and accepts our key, without spending tokens
+        
+        Lists the provider's models, which is free. Health normally comes from
+        real calls (see backend/utils/provider_health.py); this is only for
+        providers that have had no traffic for a while.
         
+        Args:
+            provider: 'openai' or 'anthropic'
+            
         Returns:
-            Dict with provider health status
+            Whether the provider answered
         """
-        health = {}
+        client = self.openai_client if provider == "openai" else self.anthropic_client
+        if client is None or not hasattr(client, "models"):
+            return False
         
-        # Test OpenAI
+        start = time.perf_counter()
         try:
-            # Simple test call with minimal token usage
-            # Use a basic model for health check to minimize cost
-            test_model = self.settings.openai_model
-            if self.settings.use_openrouter:
-                # Use a cheap model for health check on OpenRouter
-                test_model = "openai/gpt-3.5-turbo" if "gpt" in self.settings.openai_model.lower() else self.settings.openai_model
-            
-            await self.openai_client.chat.completions.create(
-                model=test_model,
-                messages=[{"role": "user", "content": "test"}],
-                max_tokens=1
-            )
-            health['openai'] = True
+            await client.models.list()
         except Exception as e:
-            logger.warning(f"OpenAI health check failed: {e}")
-            health['openai'] = False
-        
-        # Test Anthropic if available
-        if self.anthropic_client:
-            try:
-                await self.anthropic_client.messages.create(
-                    model=self.settings.anthropic_model,
-                    max_tokens=1,
-                    messages=[{"role": "user", "content": "test"}]
-                )
-                health['anthropic'] = True
-            except Exception as e:
-                logger.warning(f"Anthropic health check failed: {e}")
-                health['anthropic'] = False
-        else:
-            health['anthropic'] = False
-        
-        return health
\ No newline at end of file
+            logger.warning(f"{provider} health probe failed: {e}")
+            record_provider_call(provider, False, time.perf_counter() - start, type(e).__name__)
+            return False
+        record_provider_call(provider, True, time.perf_counter() - start)
+        return True
+
+
+_client: Optional[LLMClient] = None
+
+
+def get_llm_client() -> LLMClient:
+    """The LLM client shared by this worker, so provider connections are pooled"""
+    global _client
+    if _client is None:
+        _client = LLMClient()
+    return _client
+
+
+async def close_llm_client() -> None:
+    """Close the shared client; the next get_llm_client() creates a new one"""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.close()
@@ -1,18 +1,42 @@
 """
 Logo recognition service using multimodal AI
 """
+import asyncio
 import base64
 import hashlib
 import json
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Set, Tuple
 from datetime import datetime
-import httpx
+from fastapi import HTTPException
 from loguru import logger
 
 from backend.config import get_settings
 from backend.models.recognition import RecognitionResult
-from backend.services.cache import CacheService
-from backend.services.llm_client import LLMClient
+from backend.services.cache import CacheService, ImageHasher
+from backend.services.llm_client import get_llm_client
+from backend.services.scheduler import get_scheduler
+from backend.utils.metrics import PROVIDER_FALLBACKS, REJECTIONS, track_stage
+from backend.utils.timing import detach_timings
+
+
+# Background refreshes of stale entries, shared by all requests in this worker
+_refresh_tasks: Set[asyncio.Task] = set()
+# Refresh slots in use, including refreshes still waiting for their Redis lock
+_refreshes_running = 0
+
+
+def _try_claim_refresh_slot(limit: int) -> bool:
+    """Claim one of limit refresh slots without waiting; False if all are taken"""
+    global _refreshes_running
+    if _refreshes_running >= limit:
+        return False
+    _refreshes_running += 1
+    return True
+
+
+def _release_refresh_slot(*_) -> None:
+    global _refreshes_running
+    _refreshes_running -= 1
 
 
 class RecognitionService:
@@ -21,58 +45,93 @@ class RecognitionService:
     def __init__(self):
         self.settings = get_settings()
         self.cache = CacheService()
-        self.llm_client = LLMClient()
+        self.llm_client = get_llm_client()
     
-    async def recognize_logo(self, image_data: bytes, filename: str) -> RecognitionResult:
+    async def recognize_logo(
+        self,
+        image_data: bytes,
+        filename: str,
+        original_hash: Optional[str] = None,
+        priority: str = "interactive",
+        tenant: str = "default",
+        image_hash: Optional[str] = None
+    ) -> RecognitionResult:
         """
         Recognize a metal band logo from image data
         
         Args:
             image_data: Raw image bytes
             filename: Original filename
+            original_hash: Hash of the original file if the client downscaled it
+            priority: Scheduling class of the provider call (interactive, api or bulk)
+            tenant: Caller the provider call is accounted to
+            image_hash: hash_image(image_data), if the caller already has it
             
         Returns:
             RecognitionResult with band information
         """
         # Calculate image hash for caching
-        image_hash = self._calculate_image_hash(image_data)
+        if image_hash is None:
+            image_hash = self.hash_image(image_data)
+        if original_hash == image_hash:
+            original_hash = None
         
-        # Check cache first
-        cached_result = await self.cache.get(image_hash)
+        # Check cache first, preferring the key the client will probe with
+        cached_result = None
+        for key in (original_hash, image_hash):
+            if key:
+                cached_result = await self.cache.get(key)
+                if cached_result:
+                    break
         if cached_result:
             logger.info(f"Cache hit for image hash: {image_hash}")
+            if not self.cache.is_current(cached_result, self.llm_client.result_version):
+                # Serve the old result now and re-recognize under the new version.
+                # Only the server-computed hash is refreshed: the client-supplied
+                # hash cannot be verified, so its entry is never overwritten
+                await self._schedule_refresh(image_hash, image_data)
             cached_result["cached"] = True
             return RecognitionResult(**cached_result)
         
         logger.info(f"Cache miss for image hash: {image_hash}, calling AI API")
         
+        # Images that keep failing get a fast answer instead of another paid call
+        failure = await self.cache.get_failure(image_hash)
+        if failure:
+            self._check_failure(image_hash, failure)
+        
         # Prepare image for API
         base64_image = base64.b64encode(image_data).decode('utf-8')
         
-        # Try primary AI service (OpenAI)
-        try:
-            result = await self.llm_client.recognize_with_openai(base64_image)
-            ai_model = "gpt-4-vision-preview"
-        except Exception as e:
-            logger.warning(f"OpenAI API failed: {e}, trying Anthropic")
-            
-            # Fallback to Anthropic if available
-            if self.settings.anthropic_api_key:
-                try:
-                    result = await self.llm_client.recognize_with_anthropic(base64_image)
-                    ai_model = "claude-3-opus-20240229"
-                except Exception as e2:
-                    logger.error(f"Both AI services failed: OpenAI: {e}, Anthropic: {e2}")
-                    raise Exception("All AI services failed to process the image")
-            else:
-                raise e
+        async with get_scheduler().slot(priority, tenant):
+            result, ai_model = await self._call_providers(base64_image, image_hash)
+        
+        if failure:
+            await self.cache.clear_failure(image_hash)
         
         # Track API usage cost
         from backend.utils.rate_limiter import cost_tracker
         await cost_tracker.add_usage(ai_model)
         
-        # Create recognition result
-        recognition_result = RecognitionResult(
+        recognition_result = self._build_result(result, ai_model)
+        
+        # Cache the result
+        version = self.llm_client.result_version
+        await self.cache.set(image_hash, recognition_result.model_dump(), version=version)
+        if original_hash:
+            # The client-supplied hash cannot be verified, so never overwrite with it
+            await self.cache.set(
+                original_hash,
+                recognition_result.model_dump(),
+                only_if_missing=True,
+                version=version
+            )
+        
+        return recognition_result
+    
+    def _build_result(self, result: Dict[str, Any], ai_model: str) -> RecognitionResult:
+        """Create a recognition result from a provider response"""
+        return RecognitionResult(
             band_name=result.get("band_name", "Unknown"),
             confidence=result.get("confidence", 0),
             genre=result.get("genre"),
@@ -81,20 +140,160 @@ class RecognitionService:
             cached=False,
             processing_time=0  # Will be set by the router
         )
+    
+    async def _schedule_refresh(self, key: str, image_data: bytes) -> None:
+        """
+        Re-recognize a stale entry in the background, throttled
         
-        # Cache the result
-        await self.cache.set(image_hash, recognition_result.model_dump())
+        At most refresh_concurrency refreshes run per worker (further stale
+        hits are skipped and retried on a later hit), and a Redis lock keeps
+        other workers from refreshing the same image at the same time.
+        """
+        if not _try_claim_refresh_slot(self.settings.refresh_concurrency):
+            logger.debug(f"Refresh capacity exhausted, skipping refresh of {key}")
+            return
         
-        return recognition_result
+        try:
+            locked = await self.cache.acquire_refresh_lock(key, self.settings.refresh_lock_ttl)
+        except BaseException:
+            _release_refresh_slot()
+            raise
+        if not locked:
+            _release_refresh_slot()
+            return
+        
+        task = asyncio.create_task(self._refresh_entry(key, image_data))
+        _refresh_tasks.add(task)
+        task.add_done_callback(_refresh_tasks.discard)
+        task.add_done_callback(_release_refresh_slot)
+    
+    async def _refresh_entry(self, key: str, image_data: bytes) -> None:
+        """Re-recognize an image and overwrite its cache entry"""
+        detach_timings()
+        try:
+            logger.info(f"Refreshing stale cache entry: {key}")
+            base64_image = base64.b64encode(image_data).decode('utf-8')
+            async with get_scheduler().slot("bulk", "refresh"):
+                result, ai_model = await self._call_providers(base64_image, key)
+            
+            from backend.utils.rate_limiter import cost_tracker
+            await cost_tracker.add_usage(ai_model)
+            
+            recognition_result = self._build_result(result, ai_model)
+            await self.cache.set(key, recognition_result.model_dump(), version=self.llm_client.result_version)
+        except Exception as e:
+            logger.warning(f"Background refresh failed for {key}: {e}")
+    
+    async def _call_providers(self, base64_image: str, image_hash: str) -> Tuple[Dict[str, Any], str]:
+        """
+        Run the provider fallback chain, recording a failure if it is exhausted
+        
+        Args:
+            base64_image: Base64 encoded image
+            image_hash: Cache key of the image
+            
+        Returns:
+            (provider result, model name)
+        """
+        errors = []
+        
+        # Try primary AI service (OpenAI)
+        try:
+            result = await self.llm_client.recognize_with_openai(base64_image)
+            return result, "gpt-4-vision-preview"
+        except Exception as e:
+            logger.warning(f"OpenAI API failed: {e}, trying Anthropic")
+            errors.append(e)
+        
+        # Fallback to Anthropic if available
+        if self.settings.anthropic_api_key:
+            PROVIDER_FALLBACKS.labels("openai", "anthropic").inc()
+            try:
+                result = await self.llm_client.recognize_with_anthropic(base64_image)
+                return result, "claude-3-opus-20240229"
+            except Exception as e2:
+                logger.error(f"Both AI services failed: OpenAI: {errors[0]}, Anthropic: {e2}")
+                errors.append(e2)
+        
+        # Outages, rate limits and auth problems say nothing about the image itself
+        if any(self._is_image_error(error) for error in errors):
+            await self.cache.record_failure(image_hash, "; ".join(str(error) for error in errors))
+        
+        if len(errors) > 1:
+            raise Exception("All AI services failed to process the image")
+        raise errors[0]
+    
+    def _check_failure(self, image_hash: str, failure: Dict[str, Any]) -> None:
+        """Reject quarantined images and retries that arrive during backoff"""
+        if self.cache.is_quarantined(failure):
+            logger.info(f"Rejecting quarantined image hash: {image_hash}")
+            REJECTIONS.labels("quarantined").inc()
+            raise HTTPException(
+                status_code=422,
+                detail={
+                    "error": "image_quarantined",
+                    "message": f"This image failed recognition {failure['attempts']} times in a row "
+                               "and is temporarily rejected",
+                    "detail": failure.get("last_error")
+                }
+            )
+        
+        retry_after = self.cache.failure_retry_after(failure)
+        if retry_after > 0:
+            REJECTIONS.labels("backoff").inc()
+            raise HTTPException(
+                status_code=503,
+                detail={
+                    "error": "recognition_backoff",
+                    "message": f"Recognition of this image failed recently. Please retry in {retry_after} seconds.",
+                    "retry_after": retry_after
+                },
+                headers={"Retry-After": str(retry_after)}
+            )
+    
+    @staticmethod
+    def _is_image_error(error: Exception) -> bool:
+        """
+        Whether an error points at the image rather than the provider
+        
+        Only answers that could not be parsed and requests the provider
+        rejected (4xx: unreadable image, content policy) count. Server errors,
+        timeouts, lost connections, rate limits and auth problems would fail
+        any image, so they must not quarantine this one.
+        """
+        if isinstance(error, ValueError):
+            return True
+        status = getattr(error, "status_code", None)
+        return status is not None and 400 <= status < 500 and status not in (401, 403, 408, 409, 429)
     
     async def get_cached_result(self, image_hash: str) -> Optional[RecognitionResult]:
         """Get a cached recognition result by image hash"""
-        cached_data = await self.cache.get(image_hash)
+        cached_data = await self.get_cached_entry(image_hash)
         if cached_data:
-            cached_data["cached"] = True
-            return RecognitionResult(**cached_data)
+            return self.result_from_entry(cached_data)
         return None
     
-    def _calculate_image_hash(self, image_data: bytes) -> str:
-        """Calculate SHA-256 hash of image data"""
-        return hashlib.sha256(image_data).hexdigest()
\ No newline at end of file
+    async def get_cached_entry(self, image_hash: str) -> Optional[Dict[str, Any]]:
+        """Get the raw cache entry (including metadata) by image hash"""
+        return await self.cache.get(image_hash)
+    
+    def is_current(self, entry: Dict[str, Any]) -> bool:
+        """Whether a cache entry was produced by the current model and prompt"""
+        return self.cache.is_current(entry, self.llm_client.result_version)
+    
+    @staticmethod
+    def result_from_entry(entry: Dict[str, Any]) -> RecognitionResult:
+        """Build a cached RecognitionResult from a raw cache entry"""
+        return RecognitionResult(**{**entry, "cached": True})
+    
+    def hash_image(self, image_data: bytes) -> str:
+        """
+        Calculate SHA-256 hash of image data
+        
+        This is the lowercase hex digest of the raw upload bytes, exactly what
+        the web frontend computes with WebCrypto to probe the cache before
+        uploading. Do not add parameters or normalisation here without
+        updating frontend/script.js as well.
+        """
+        with track_stage("hashing"):
+            return ImageHasher.hash_image(image_data)
\ No newline at end of file
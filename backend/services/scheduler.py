@@ -0,0 +1,168 @@
+"""
+Scheduling of provider calls between priority classes and tenants
+"""
+import asyncio
+import heapq
+import itertools
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from backend.config import get_settings
+from backend.utils.metrics import PROVIDER_CALLS, track_stage
+
+
+PRIORITIES = ("interactive", "api", "bulk")
+
+
+class LLMScheduler:
+    """
+    Admission control for provider calls in one worker process
+
+    At most `capacity` calls run at once, and the last `reserved` slots are
+    only handed to interactive requests, so bulk and API traffic can never
+    occupy all capacity. Waiting requests are served by two-level start-time
+    fair queuing. First the class to serve is picked: each class advances
+    its own virtual clock by 1/weight per request it starts, and the waiting
+    class that is furthest behind goes next, so a class gets capacity in
+    proportion to its weight however many tenants it has. Then, within that
+    class, each tenant advances a clock by 1 per request and the earliest
+    virtual start runs, so every tenant gets an equal share of the class,
+    however many requests a single tenant has queued.
+    """
+
+    def __init__(self, capacity: int, reserved: int, weights: Dict[str, int]):
+        self.capacity = capacity
+        self.reserved = min(reserved, capacity - 1)
+        self.weights = weights
+        self.in_flight: Counter = Counter()
+        self.queued: Counter = Counter()
+        self._queues: Dict[str, List[Tuple[float, int, asyncio.Future]]] = {p: [] for p in PRIORITIES}
+        # Class level: virtual time and each class's finish tag
+        self._virtual_time = 0.0
+        self._class_finish: Dict[str, float] = {}
+        # Tenant level, per class: virtual time and each (class, tenant) flow's finish tag
+        self._tenant_time: Dict[str, float] = {p: 0.0 for p in PRIORITIES}
+        self._finish: Dict[Tuple[str, str], float] = {}
+        self._seq = itertools.count()
+
+    @asynccontextmanager
+    async def slot(self, priority: str = "interactive", tenant: str = "default") -> AsyncIterator[None]:
+        """Hold a provider slot for the duration of the block"""
+        with track_stage("provider_queue"):
+            await self.acquire(priority, tenant)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    async def acquire(self, priority: str, tenant: str) -> None:
+        """
+        Wait for a provider slot
+
+        Args:
+            priority: interactive, api or bulk
+            tenant: Caller identity that shares are balanced across
+        """
+        if priority not in self._queues:
+            raise ValueError(f"Unknown priority: {priority}")
+
+        flow = (priority, tenant)
+        start = max(self._tenant_time[priority], self._finish.get(flow, 0.0))
+        self._finish[flow] = start + 1.0
+        if len(self._finish) > 10000:
+            self._forget_idle_flows()
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queues[priority], (start, next(self._seq), future))
+        self.queued[priority] += 1
+        PROVIDER_CALLS.labels(priority, "queued").inc()
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                self.queued[priority] -= 1
+                PROVIDER_CALLS.labels(priority, "queued").dec()
+            else:
+                # Granted just before the caller went away: hand the slot on
+                self.release(priority)
+            raise
+
+    def release(self, priority: str) -> None:
+        """Give a slot back and start the next waiting request"""
+        self.in_flight[priority] -= 1
+        PROVIDER_CALLS.labels(priority, "running").dec()
+        self._dispatch()
+
+    def _can_start(self, priority: str) -> bool:
+        limit = self.capacity if priority == "interactive" else self.capacity - self.reserved
+        return sum(self.in_flight.values()) < limit
+
+    def _class_start(self, priority: str) -> float:
+        """Virtual start of a class's next request; an idle class restarts from the clock"""
+        return max(self._virtual_time, self._class_finish.get(priority, 0.0))
+
+    def _dispatch(self) -> None:
+        """Start waiting requests, the class furthest behind first, while capacity allows"""
+        while True:
+            best: Optional[str] = None
+            for priority, queue in self._queues.items():
+                # Requests whose callers went away are dropped lazily
+                while queue and queue[0][2].done():
+                    heapq.heappop(queue)
+                # Ties go to the more urgent class (PRIORITIES order)
+                if queue and self._can_start(priority):
+                    if best is None or self._class_start(priority) < self._class_start(best):
+                        best = priority
+            if best is None:
+                return
+
+            class_start = self._class_start(best)
+            self._virtual_time = class_start
+            self._class_finish[best] = class_start + 1.0 / self.weights[best]
+
+            start, _, future = heapq.heappop(self._queues[best])
+            self._tenant_time[best] = max(self._tenant_time[best], start)
+            self.in_flight[best] += 1
+            self.queued[best] -= 1
+            PROVIDER_CALLS.labels(best, "queued").dec()
+            PROVIDER_CALLS.labels(best, "running").inc()
+            future.set_result(None)
+
+    def _forget_idle_flows(self) -> None:
+        """Drop flows that are behind their class's clock; they would restart from it anyway"""
+        self._finish = {
+            flow: finish for flow, finish in self._finish.items() if finish > self._tenant_time[flow[0]]
+        }
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """In-flight and queued requests per priority class"""
+        return {
+            priority: {"in_flight": self.in_flight[priority], "queued": self.queued[priority]}
+            for priority in PRIORITIES
+        }
+
+
+_scheduler: Optional[LLMScheduler] = None
+
+
+def get_scheduler() -> LLMScheduler:
+    """Get the per-worker provider call scheduler"""
+    global _scheduler
+    if _scheduler is None:
+        settings = get_settings()
+        _scheduler = LLMScheduler(
+            capacity=settings.llm_max_concurrency,
+            reserved=settings.llm_reserved_interactive,
+            weights={
+                "interactive": settings.llm_weight_interactive,
+                "api": settings.llm_weight_api,
+                "bulk": settings.llm_weight_bulk,
+            }
+        )
+        logger.debug(f"Provider scheduler: {_scheduler.capacity} slots, {_scheduler.reserved} reserved for interactive")
+    return _scheduler
@@ -0,0 +1,131 @@
+"""
+Cache snapshots: cached results as a gzipped JSON-lines file
+
+The first line is a header; every other line is one entry:
+
+    {"format": "logodeth-cache-snapshot", "version": 1, "exported_at": "..."}
+    {"k": "<image hash>", "v": {...cached result with _cache_metadata...}}
+
+Files are written and read as streams, so snapshots of any size use
+constant memory.
+"""
+import gzip
+import json
+import os
+from datetime import datetime
+from typing import AsyncIterator
+
+from loguru import logger
+
+from backend.services.cache import CacheService
+
+
+SNAPSHOT_FORMAT = "logodeth-cache-snapshot"
+SNAPSHOT_VERSION = 1
+
+
+async def export_snapshot(cache: CacheService, path: str, chunk_size: int = 500) -> AsyncIterator[int]:
+    """
+    Write every cached result to a snapshot file
+
+    Args:
+        cache: Cache to read from
+        path: Snapshot file to create (gzip)
+        chunk_size: Keys per SCAN batch
+
+    Yields:
+        Running number of entries written
+    """
+    exported = 0
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+        header = {"format": SNAPSHOT_FORMAT, "version": SNAPSHOT_VERSION, "exported_at": datetime.utcnow().isoformat()}
+        f.write(json.dumps(header) + "\n")
+
+        async for entries in cache.scan_entries(chunk_size):
+            for key, value in entries:
+                f.write(json.dumps({"k": key, "v": value}, separators=(",", ":"), default=str) + "\n")
+            exported += len(entries)
+            yield exported
+
+    # Never leave a half-written snapshot under the real name
+    os.replace(tmp_path, path)
+
+
+async def import_snapshot(
+    cache: CacheService,
+    path: str,
+    batch_size: int = 500,
+    overwrite: bool = False
+) -> AsyncIterator[int]:
+    """
+    Load a snapshot file into the cache with pipelined bulk writes
+
+    Entries get a fresh TTL from CacheService.ttl_for and keep their
+    original metadata (cached_at, model/prompt version).
+
+    Args:
+        cache: Cache to write to
+        path: Snapshot file to read
+        batch_size: Entries per pipeline
+        overwrite: Replace entries that already exist
+
+    Yields:
+        Running number of entries read
+    """
+    imported = 0
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("format") != SNAPSHOT_FORMAT or header.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"{path} is not a version {SNAPSHOT_VERSION} LOGODETH cache snapshot")
+
+        batch = []
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            batch.append((entry["k"], entry["v"]))
+
+            if len(batch) >= batch_size:
+                await cache.set_many(batch, only_if_missing=not overwrite)
+                imported += len(batch)
+                batch = []
+                yield imported
+
+        if batch:
+            await cache.set_many(batch, only_if_missing=not overwrite)
+            imported += len(batch)
+        yield imported
+
+
+async def warm_cache(path: str, lock_ttl: int = 600) -> int:
+    """
+    Import a snapshot at startup, once across all workers
+
+    Failures are logged rather than raised, as an unwarmed cache only costs
+    extra recognitions.
+
+    Args:
+        path: Snapshot file to import
+        lock_ttl: Seconds other workers skip warming after one has started
+
+    Returns:
+        Number of entries imported
+    """
+    if not os.path.exists(path):
+        logger.warning(f"Cache warm snapshot not found: {path}")
+        return 0
+
+    cache = CacheService()
+    imported = 0
+    try:
+        if not await cache.acquire_lock(f"warm:{os.path.basename(path)}", lock_ttl):
+            logger.info("Cache warm-up already done by another worker")
+            return 0
+
+        async for imported in import_snapshot(cache, path):
+            pass
+        logger.info(f"Warmed cache with {imported} entries from {path}")
+    except Exception as e:
+        logger.error(f"Cache warm-up from {path} failed after {imported} entries: {e}")
+    return imported
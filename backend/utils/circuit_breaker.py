@@ -0,0 +1,85 @@
+"""
+Circuit breaker for failing backends
+"""
+import time
+from loguru import logger
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    Closed: calls go through. After failure_threshold consecutive failures
+    the circuit opens and calls fail fast. Once reset_timeout has passed a
+    single probe call is let through (half-open); its outcome closes the
+    circuit or opens it for another reset_timeout.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self._state = self.CLOSED
+
+    @property
+    def state(self) -> str:
+        """Current state; half-open while a probe is due or in flight"""
+        if self._state == self.CLOSED:
+            return self.CLOSED
+        if self._state == self.HALF_OPEN or self._probe_available():
+            return self.HALF_OPEN
+        return self.OPEN
+
+    @property
+    def is_open(self) -> bool:
+        """Whether calls should fail fast without trying the backend"""
+        return self._state != self.CLOSED and not self._probe_available()
+
+    def _probe_available(self) -> bool:
+        # A probe that never reported back is replaced after another timeout
+        return time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may go to the backend
+
+        In half-open state this hands out the single probe, so every caller
+        that gets True must report back with record_success or record_failure.
+        """
+        if self._state == self.CLOSED:
+            return True
+        if self._probe_available():
+            self._state = self.HALF_OPEN
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+    def record_success(self) -> bool:
+        """
+        Record a successful call
+
+        Returns:
+            True if this call closed a previously open circuit
+        """
+        recovered = self._state != self.CLOSED
+        self.failures = 0
+        self._state = self.CLOSED
+        if recovered:
+            logger.info(f"{self.name} recovered, closing circuit")
+        return recovered
+
+    def record_failure(self) -> None:
+        """Record a failed call, opening the circuit at the threshold"""
+        self.failures += 1
+        if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                logger.warning(f"{self.name} unavailable after {self.failures} failures, failing fast "
+                               f"for {self.reset_timeout:.0f}s")
+            self._state = self.OPEN
+            self.opened_at = time.monotonic()
@@ -0,0 +1,87 @@
+"""
+HTTP caching helpers for cached recognition results
+"""
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Any, Dict, Optional
+
+
+def make_etag(entry: Dict[str, Any]) -> str:
+    """
+    Build a strong ETag from a stored cache entry
+
+    Args:
+        entry: Cache entry as stored in Redis
+
+    Returns:
+        Quoted ETag value
+    """
+    canonical = json.dumps(entry, sort_keys=True, separators=(",", ":"), default=str)
+    return f'"{hashlib.sha256(canonical.encode()).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag
+
+    Uses the weak comparison required for If-None-Match (RFC 9110 13.1.2).
+    """
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+
+    return False
+
+
+def last_modified(entry: Dict[str, Any]) -> Optional[str]:
+    """Get an HTTP date for when the entry was cached, if known"""
+    cached_at = entry.get("_cache_metadata", {}).get("cached_at")
+    if not cached_at:
+        return None
+
+    try:
+        dt = datetime.fromisoformat(cached_at)
+    except (TypeError, ValueError):
+        return None
+
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return format_datetime(dt.astimezone(timezone.utc), usegmt=True)
+
+
+def cache_headers(entry: Dict[str, Any], settings) -> Dict[str, str]:
+    """
+    Build validator and freshness headers for a cached result
+
+    Args:
+        entry: Cache entry as stored in Redis
+        settings: Application settings
+
+    Returns:
+        Dict of response headers
+    """
+    headers = {
+        "ETag": make_etag(entry),
+        "Cache-Control": (
+            f"public, max-age={settings.http_cache_max_age}, "
+            f"s-maxage={settings.http_cache_s_maxage}"
+        ),
+    }
+
+    modified = last_modified(entry)
+    if modified:
+        headers["Last-Modified"] = modified
+
+    return headers
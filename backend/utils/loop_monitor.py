@@ -0,0 +1,115 @@
+"""
+Event loop lag monitoring
+
+A task on the loop sleeps for a fixed interval and records how late it
+wakes up; the lateness is time the loop spent on something else without
+yielding. A watchdog thread notices when the task's heartbeat stalls for
+longer than the threshold and logs the loop thread's stack while the
+culprit is still running.
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from loguru import logger
+
+from backend.utils.metrics import LOOP_LAG, LOOP_LAG_MAX, LOOP_LAG_P99
+
+
+class LoopLagMonitor:
+    """Samples event loop lag and reports stalls with the blocking stack"""
+
+    def __init__(self, interval: float = 0.1, threshold: float = 0.25, window: int = 600):
+        """
+        Args:
+            interval: Seconds between samples
+            threshold: Lag in seconds that counts as a stall and is logged
+            window: Samples kept for max and p99 (600 x 0.1s = the last minute)
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.stalls = 0
+        self._heartbeat = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+
+    def start(self) -> None:
+        """Start sampling on the running loop"""
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop sampling"""
+        self._stopping.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _sample(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+
+            lag = max(0.0, now - expected)
+            self.samples.append(lag)
+            LOOP_LAG.observe(lag)
+            stats = self.stats()
+            LOOP_LAG_MAX.set(stats["max"])
+            LOOP_LAG_P99.set(stats["p99"])
+
+    def _watch(self) -> None:
+        """Log the loop thread's stack once per stall"""
+        reported = False
+        while not self._stopping.wait(self.threshold / 2):
+            stalled_for = time.monotonic() - self._heartbeat - self.interval
+            if stalled_for < self.threshold:
+                reported = False
+                continue
+            if reported:
+                continue
+
+            reported = True
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "(stack unavailable)"
+            logger.warning(f"Event loop blocked for {stalled_for * 1000:.0f}ms, loop thread is at:\n{stack}")
+
+    def stats(self) -> Dict[str, float]:
+        """Max and p99 lag over the window, in seconds"""
+        if not self.samples:
+            return {"max": 0.0, "p99": 0.0}
+        ordered = sorted(self.samples)
+        return {"max": ordered[-1], "p99": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]}
+
+
+_monitor: Optional[LoopLagMonitor] = None
+
+
+def start_loop_monitor(interval: float, threshold: float) -> LoopLagMonitor:
+    """Start the per-process loop lag monitor on the running loop"""
+    global _monitor
+    _monitor = LoopLagMonitor(interval=interval, threshold=threshold)
+    _monitor.start()
+    logger.debug(f"Loop lag monitor started (stalls over {threshold * 1000:.0f}ms are logged)")
+    return _monitor
+
+
+def get_loop_monitor() -> Optional[LoopLagMonitor]:
+    """The running loop lag monitor, if any"""
+    return _monitor
@@ -0,0 +1,199 @@
+"""
+Prometheus metrics
+
+prometheus_client is optional: without it every metric here is a no-op and
+/metrics is not served. Under gunicorn, point PROMETHEUS_MULTIPROC_DIR at an
+empty directory before the workers start so /metrics aggregates all of them.
+"""
+import functools
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Tuple
+
+from backend.utils.provider_health import is_provider_failure, record_provider_call
+from backend.utils.timing import record_stage
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:  # pragma: no cover - optional dependency
+    prometheus_client = None
+
+
+METRICS_AVAILABLE = prometheus_client is not None
+
+if METRICS_AVAILABLE and os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+
+class _NoopMetric:
+    """Accepts every metric call and does nothing"""
+
+    def labels(self, *args, **kwargs) -> "_NoopMetric":
+        return self
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def _metric(kind: str, name: str, documentation: str, labels: Tuple[str, ...] = (), **kwargs):
+    if not METRICS_AVAILABLE:
+        return _NoopMetric()
+    return getattr(prometheus_client, kind)(name, documentation, labels, **kwargs)
+
+
+STAGE_SECONDS = _metric(
+    "Histogram", "logodeth_stage_duration_seconds",
+    "Time spent in each stage of a recognition request",
+    ("stage",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+PROVIDER_SECONDS = _metric(
+    "Histogram", "logodeth_provider_request_duration_seconds",
+    "Duration of provider API calls",
+    ("provider", "model", "outcome"),
+    buckets=(0.5, 1.0, 2.0, 3.0, 5.0, 7.5, 10.0, 15.0, 20.0, 30.0, 45.0, 60.0, 120.0)
+)
+CACHE_EVENTS = _metric(
+    "Counter", "logodeth_cache_events_total",
+    "Cache lookups and writes by outcome (hits, misses, sets, errors)",
+    ("event",)
+)
+PROVIDER_ERRORS = _metric(
+    "Counter", "logodeth_provider_errors_total",
+    "Failed provider API calls",
+    ("provider", "model")
+)
+PROVIDER_FALLBACKS = _metric(
+    "Counter", "logodeth_provider_fallbacks_total",
+    "Recognitions handed to the next provider after a failure",
+    ("from_provider", "to_provider")
+)
+REJECTIONS = _metric(
+    "Counter", "logodeth_rejections_total",
+    "Requests rejected before recognition",
+    ("reason",)
+)
+REQUESTS_IN_FLIGHT = _metric(
+    "Gauge", "logodeth_requests_in_flight",
+    "HTTP requests being handled",
+    multiprocess_mode="livesum"
+)
+PROVIDER_CALLS = _metric(
+    "Gauge", "logodeth_provider_calls",
+    "Provider calls running or waiting for a slot, by priority class",
+    ("priority", "state"),
+    multiprocess_mode="livesum"
+)
+JOB_QUEUE_DEPTH = _metric(
+    "Gauge", "logodeth_job_queue_depth",
+    "Recognition jobs waiting, being processed or waiting for a retry",
+    ("state",),
+    multiprocess_mode="livemostrecent"
+)
+LOOP_LAG = _metric(
+    "Histogram", "logodeth_event_loop_lag_seconds",
+    "How late the event loop ran a task scheduled on time",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+LOOP_LAG_MAX = _metric(
+    "Gauge", "logodeth_event_loop_lag_max_seconds",
+    "Maximum event loop lag over the last minute, worst worker",
+    multiprocess_mode="livemax"
+)
+LOOP_LAG_P99 = _metric(
+    "Gauge", "logodeth_event_loop_lag_p99_seconds",
+    "99th percentile event loop lag over the last minute, worst worker",
+    multiprocess_mode="livemax"
+)
+
+
+@contextmanager
+def track_stage(stage: str) -> Iterator[None]:
+    """Time a block as one stage of the current request"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        record_stage(stage, elapsed)
+
+
+def timed(stage: str):
+    """Decorator timing a coroutine function as a stage"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with track_stage(stage):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def track_provider(provider: str, model: str) -> Iterator[None]:
+    """
+    Time a provider API call, counting it as an error if it raises
+
+    Successes and errors that mean the provider is failing (see
+    is_provider_failure) are also recorded as provider health. Rejections of
+    a single request and cancellations (the client went away) say nothing
+    about the provider and are not.
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    error = None
+    try:
+        yield
+        outcome = "ok"
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        PROVIDER_SECONDS.labels(provider, model, outcome).observe(elapsed)
+        record_stage(provider, elapsed)
+        if outcome == "error":
+            PROVIDER_ERRORS.labels(provider, model).inc()
+        if outcome == "ok":
+            record_provider_call(provider, True, elapsed)
+        elif error is not None and is_provider_failure(error):
+            record_provider_call(provider, False, elapsed, type(error).__name__)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Render all metrics in the Prometheus text format
+
+    Returns:
+        (body, content type)
+    """
+    registry = prometheus_client.REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop a dead worker's live gauges; call from gunicorn's child_exit hook"""
+    if METRICS_AVAILABLE and os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
+
+
+class InFlightMiddleware:
+    """ASGI middleware counting HTTP requests in progress, streaming responses included"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
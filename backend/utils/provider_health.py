@@ -0,0 +1,128 @@
+"""
+Provider health from real traffic
+
+Every provider call this worker makes is recorded here (see track_provider):
+when it finished, whether it succeeded and how long it took. Only errors
+that would fail any request count as failures; a provider rejecting one
+image is working as intended. Health is
+judged from the calls of the last few minutes, so checking it is free and
+never spends tokens. A provider without recent calls is "unknown" until
+traffic, or the idle probe in backend/services/health.py, says otherwise.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from backend.config import get_settings
+
+# Share of recent calls that must succeed for a provider to count as "ok"
+HEALTHY_SUCCESS_RATE = 0.9
+
+# Failed calls, without a success, before a provider counts as "down"
+MIN_CALLS_FOR_DOWN = 3
+
+# HTTP statuses that mean the provider, or our account with it, is failing
+FAILURE_STATUSES = (401, 403, 408, 429)
+
+# SDK and HTTP client errors for lost connections and timeouts
+CONNECTION_ERRORS = {"APIConnectionError", "APITimeoutError", "TransportError"}
+
+
+def is_provider_failure(error: BaseException) -> bool:
+    """
+    Whether an error from a provider call says the provider is failing
+
+    Server errors, timeouts, lost connections, rate limits and auth problems
+    count. Other client errors (an unreadable image, a content refusal) and
+    anything else that is not about the provider do not.
+    """
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status >= 500 or status in FAILURE_STATUSES
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in CONNECTION_ERRORS for cls in type(error).__mro__)
+
+
+class ProviderHealth:
+    """Recent calls to one provider"""
+
+    def __init__(self, name: str, window: float = 300, max_calls: int = 1000):
+        """
+        Args:
+            name: Provider name
+            window: Seconds of calls that health is judged on
+            max_calls: Most recent calls kept, whatever the window
+        """
+        self.name = name
+        self.window = window
+        # (monotonic finish time, succeeded, seconds)
+        self.calls: Deque[Tuple[float, bool, float]] = deque(maxlen=max_calls)
+        self.last_call = time.monotonic()
+        self.last_success: Optional[float] = None
+        self.last_failure: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def record(self, ok: bool, seconds: float, error: Optional[str] = None) -> None:
+        """Record a finished call"""
+        self.last_call = time.monotonic()
+        self.calls.append((self.last_call, ok, seconds))
+        if ok:
+            self.last_success = time.time()
+        else:
+            self.last_failure = time.time()
+            self.last_error = error
+
+    def idle_for(self) -> float:
+        """Seconds since the last call, or since tracking started"""
+        return time.monotonic() - self.last_call
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Health over the window
+
+        Returns:
+            Dict with status (ok, degraded, down or unknown; down needs
+            MIN_CALLS_FOR_DOWN failures and no success), calls,
+            success_rate, latency_ms of successful calls, and the unix times
+            of the last success and failure
+        """
+        cutoff = time.monotonic() - self.window
+        while self.calls and self.calls[0][0] < cutoff:
+            self.calls.popleft()
+
+        latencies = sorted(seconds for _, ok, seconds in self.calls if ok)
+        success_rate = len(latencies) / len(self.calls) if self.calls else None
+        if success_rate is None:
+            status = "unknown"
+        elif success_rate >= HEALTHY_SUCCESS_RATE:
+            status = "ok"
+        else:
+            status = "degraded" if latencies or len(self.calls) < MIN_CALLS_FOR_DOWN else "down"
+
+        pick = lambda q: round(latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000, 1)
+        return {
+            "status": status,
+            "calls": len(self.calls),
+            "success_rate": None if success_rate is None else round(success_rate, 3),
+            "latency_ms": {"p50": pick(0.5), "p95": pick(0.95)} if latencies else None,
+            "last_success": self.last_success and round(self.last_success, 3),
+            "last_failure": self.last_failure and round(self.last_failure, 3),
+            "last_error": self.last_error,
+        }
+
+
+_providers: Dict[str, ProviderHealth] = {}
+
+
+def provider_health(provider: str) -> ProviderHealth:
+    """This worker's health record for a provider"""
+    if provider not in _providers:
+        _providers[provider] = ProviderHealth(provider, window=get_settings().health_window)
+    return _providers[provider]
+
+
+def record_provider_call(provider: str, ok: bool, seconds: float, error: Optional[str] = None) -> None:
+    """Record a finished provider call"""
+    provider_health(provider).record(ok, seconds, error)
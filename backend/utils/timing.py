@@ -0,0 +1,86 @@
+"""
+Per-request stage timings, reported in the Server-Timing header
+"""
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+
+class RequestTimings:
+    """Milliseconds spent per stage of one request"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        """Add time to a stage; a stage entered more than once accumulates"""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds * 1000
+
+    def mark(self, stage: str) -> None:
+        """Record the time since the request started as a stage (e.g. the upload)"""
+        self.add(stage, time.perf_counter() - self.start)
+
+    @property
+    def total(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def as_dict(self) -> Dict[str, float]:
+        """Stages and the total so far, in milliseconds"""
+        return {**{stage: round(ms, 1) for stage, ms in self.stages.items()}, "total": round(self.total, 1)}
+
+    def header(self) -> str:
+        """Server-Timing header value"""
+        return ", ".join(f"{stage};dur={ms}" for stage, ms in self.as_dict().items())
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    """Timings of the request being handled, if any"""
+    return _current.get()
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Add time to a stage of the current request; a no-op outside requests"""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware collecting stage timings and sending them as a Server-Timing header"""
+
+    def __init__(self, app, send_header: bool = True):
+        self.app = app
+        self.send_header = send_header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        if not self.send_header:
+            try:
+                return await self.app(scope, receive, send)
+            finally:
+                _current.reset(token)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.header().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+
+
+def detach_timings() -> None:
+    """Stop recording into the request's timings, e.g. in a background task it started"""
+    _current.set(None)
@@ -0,0 +1,139 @@
+"""
+Opt-in capture of production traffic for replay
+
+Each recognition request adds one JSON line to a per-worker trace file:
+when it arrived, what it asked for, how big the image was, whether the
+cache answered and how long each stage took. Images are identified only by
+an HMAC of their hash, keyed with the secret key, so a trace shows which
+requests repeat an image without revealing which image it was. No
+addresses, filenames or results are recorded.
+
+tests/load/replay.py replays traces against a candidate build.
+"""
+import hashlib
+import hmac
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from fastapi import HTTPException
+from loguru import logger
+
+from backend.utils.logging import QueuedSink, dated_file_writer
+from backend.utils.timing import current_timings
+
+
+class TrafficRecorder:
+    """Writes privacy-safe request records to a trace file"""
+
+    def __init__(self, path: str, key: str, sample_rate: float = 1.0):
+        """
+        Args:
+            path: Trace file, dated per day (see dated_file_writer)
+            key: HMAC key for image ids; workers must share it for ids to match
+            sample_rate: Share of images traced. Sampling is per image, so every
+                request for a traced image is kept and repeat patterns survive
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+        self._key = key.encode()
+        self._sink = QueuedSink(dated_file_writer(path))
+
+    def image_id(self, image_hash: str) -> str:
+        """Stable, non-reversible id for an image hash"""
+        return hmac.new(self._key, image_hash.encode(), hashlib.sha256).hexdigest()[:16]
+
+    def sampled(self, image_id: Optional[str]) -> bool:
+        if self.sample_rate >= 1 or image_id is None:
+            return True
+        return int(image_id[:8], 16) < self.sample_rate * 0x100000000
+
+    def record(self, event: "TrafficEvent") -> None:
+        image_id = self.image_id(event.image_hash) if event.image_hash else None
+        if not self.sampled(image_id):
+            return
+
+        timings = current_timings()
+        stages = timings.as_dict() if timings else {"total": round((time.perf_counter() - event.started) * 1000, 1)}
+        self._sink.write(json.dumps({
+            "at": round(time.time() - stages["total"] / 1000, 3),
+            "kind": event.kind,
+            "image": image_id,
+            "bytes": event.size,
+            "outcome": event.outcome,
+            "status": event.status,
+            "ms": stages,
+        }) + "\n")
+
+    def close(self) -> None:
+        self._sink.stop()
+
+
+class TrafficEvent:
+    """What is known about a request by the time it is recorded"""
+
+    def __init__(self, recorder: Optional[TrafficRecorder], kind: str, size: Optional[int] = None):
+        self.recorder = recorder
+        self.kind = kind
+        self.size = size
+        self.image_hash: Optional[str] = None
+        self.outcome = "error"
+        self.status = 500
+        self.started = time.perf_counter()
+
+    def set_image(self, size: int, image_hash: str) -> None:
+        """Identify the uploaded image by the hash recognition computed anyway"""
+        self.size = size
+        self.image_hash = image_hash
+
+
+_recorder: Optional[TrafficRecorder] = None
+
+
+@contextmanager
+def capture_traffic(kind: str, size: Optional[int] = None) -> Iterator[TrafficEvent]:
+    """
+    Record the request handled inside the block, if capture is enabled
+
+    Set event.outcome and event.status on success; HTTPExceptions leaving
+    the block are recorded with their status and error code.
+    """
+    event = TrafficEvent(_recorder, kind, size)
+    try:
+        yield event
+    except HTTPException as e:
+        event.status = e.status_code
+        event.outcome = e.detail.get("error", "error") if isinstance(e.detail, dict) else "error"
+        raise
+    finally:
+        if event.recorder:
+            try:
+                event.recorder.record(event)
+            except Exception as e:
+                logger.warning(f"Failed to record traffic: {e}")
+
+
+def start_traffic_capture(directory: str, key: Optional[str], sample_rate: float = 1.0) -> Optional[TrafficRecorder]:
+    """
+    Start tracing this worker's requests to traffic-<pid>_<date>.jsonl in directory
+
+    Refuses without an explicitly configured key: a generated one differs
+    per worker and per restart, so traces could not be matched up.
+    """
+    global _recorder
+    if not key:
+        logger.warning("Traffic capture needs LOGODETH_SECRET_KEY to be set; not capturing traffic")
+        return None
+    _recorder = TrafficRecorder(os.path.join(directory, f"traffic-{os.getpid()}.jsonl"), key, sample_rate)
+    logger.info(f"Capturing traffic to {_recorder.path} (sample rate {sample_rate})")
+    return _recorder
+
+
+def stop_traffic_capture() -> None:
+    """Flush and close the trace file"""
+    global _recorder
+    if _recorder:
+        _recorder.close()
+        _recorder = None
@@ -2,11 +2,13 @@
 File validation utilities
 """
 from fastapi import UploadFile, HTTPException
-import magic
 from pathlib import Path
 from loguru import logger
 
+from backend.utils.metrics import timed
 
+
+@timed("validation")
 async def validate_image_file(file: UploadFile, settings) -> None:
     """
     Validate uploaded image file
@@ -43,6 +45,8 @@ async def validate_image_file(file: UploadFile, settings) -> None:
     
     # Check MIME type
     try:
+        import magic  # Loads libmagic; deferred so importing the app stays fast
+        
         mime_type = magic.from_buffer(content, mime=True)
         allowed_mimes = ["image/jpeg", "image/png", "image/gif", "image/webp"]
         
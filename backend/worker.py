@@ -0,0 +1,143 @@
+"""
+Recognition job worker
+
+Consumes jobs submitted through POST /api/v1/jobs. Run one or more of
+these next to the web workers:
+
+    python worker.py
+"""
+import asyncio
+import os
+import signal
+import socket
+import time
+from typing import Set
+
+from fastapi import HTTPException
+from loguru import logger
+
+from backend.config import get_settings
+from backend.services.cache import close_redis_clients
+from backend.services.jobs import JobQueue
+from backend.services.llm_client import close_llm_client
+from backend.services.recognition import RecognitionService
+from backend.utils.logging import setup_logging
+from backend.utils.loop_monitor import start_loop_monitor
+
+
+class JobWorker:
+    """Processes recognition jobs from the queue, job_worker_concurrency at a time"""
+
+    def __init__(self):
+        self.settings = get_settings()
+        self.queue = JobQueue()
+        self.service = RecognitionService()
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self.concurrency = self.settings.job_worker_concurrency
+        self.tasks: Set[asyncio.Task] = set()
+        self.stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        """Stop taking new jobs; jobs in progress are finished"""
+        if not self.stopping.is_set():
+            logger.info("Worker stopping, finishing jobs in progress...")
+            self.stopping.set()
+
+    async def run(self) -> None:
+        """Claim and process jobs until stopped"""
+        await self.queue.ensure_group()
+        logger.info(f"Worker {self.consumer} processing up to {self.concurrency} jobs at a time")
+
+        while not self.stopping.is_set():
+            free = self.concurrency - len(self.tasks)
+            if free <= 0:
+                await asyncio.wait(self.tasks, return_when=asyncio.FIRST_COMPLETED)
+                continue
+
+            try:
+                messages = await self.queue.claim(self.consumer, free)
+            except Exception as e:
+                logger.error(f"Could not read jobs: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            for stream, message_id, job_id in messages:
+                # The task copies the context, so its log lines carry the job id
+                with logger.contextualize(request_id=job_id):
+                    task = asyncio.create_task(self.process(stream, message_id, job_id))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+
+        if self.tasks:
+            await asyncio.gather(*self.tasks)
+
+    async def process(self, stream: str, message_id: str, job_id: str) -> None:
+        """Run one job attempt and record its outcome"""
+        started = time.time()
+        attempts = 0
+        try:
+            job, image = await self.queue.start(job_id)
+            if job is None:
+                # Writing a status would recreate the hash without a TTL
+                await self.queue.discard(stream, message_id, job_id)
+                return
+            if image is None:
+                await self.queue.fail(stream, message_id, job_id, "Job expired before it could be processed")
+                return
+            attempts = job["attempts"]
+
+            result = await self.service.recognize_logo(
+                image,
+                job["filename"],
+                original_hash=job["original_hash"] or None,
+                priority=job.get("priority", "api"),
+                tenant=job.get("tenant", "default")
+            )
+            result.processing_time = time.time() - started
+            await self.queue.complete(stream, message_id, job_id, result)
+            logger.info(f"Job {job_id} completed in {result.processing_time:.2f}s (attempt {attempts})")
+
+        except HTTPException as e:
+            detail = e.detail if isinstance(e.detail, dict) else {"message": str(e.detail)}
+            if e.status_code == 503:
+                # Recognition of this image is backing off; come back after it
+                await self.queue.retry_or_fail(
+                    stream, message_id, job_id, detail["message"], attempts, retry_after=detail.get("retry_after")
+                )
+            else:
+                await self.queue.fail(stream, message_id, job_id, detail["message"], attempts)
+        except Exception as e:
+            try:
+                await self.queue.retry_or_fail(stream, message_id, job_id, str(e), attempts)
+            except Exception as redis_error:
+                # Left unacknowledged, the job is reclaimed after the visibility timeout
+                logger.error(f"Could not record failure of job {job_id}: {redis_error}")
+
+
+async def run_worker() -> None:
+    """Run a worker until SIGINT/SIGTERM"""
+    worker = JobWorker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    settings = get_settings()
+    loop_monitor = None
+    if settings.loop_lag_threshold:
+        loop_monitor = start_loop_monitor(settings.loop_lag_interval, settings.loop_lag_threshold)
+
+    try:
+        await worker.run()
+    finally:
+        if loop_monitor:
+            await loop_monitor.stop()
+        await close_redis_clients()
+        await close_llm_client()
+        await logger.complete()
+
+
+def main() -> None:
+    """Worker entry point"""
+    settings = get_settings()
+    setup_logging(settings.log_level, settings.log_format)
+    asyncio.run(run_worker())
@@ -88,6 +88,23 @@ print('Configuration is valid')
     log "WARNING: Configuration validation failed, but continuing anyway..."
 }
 
+# Warm the cache from a snapshot so a fresh Redis does not pay for common logos again
+if [ ! -z "$LOGODETH_CACHE_WARM_SNAPSHOT" ]; then
+    SNAPSHOT="$LOGODETH_CACHE_WARM_SNAPSHOT"
+    # Handled here, so the application must not import it again
+    unset LOGODETH_CACHE_WARM_SNAPSHOT
+
+    if [ ! -f "$SNAPSHOT" ]; then
+        log "WARNING: Cache snapshot $SNAPSHOT not found, starting cold"
+    elif [ "$LOGODETH_CACHE_WARM_BACKGROUND" = "true" ]; then
+        log "Warming cache from $SNAPSHOT in the background..."
+        python3 -m backend.cli import "$SNAPSHOT" > /app/logs/cache-warm.log 2>&1 &
+    else
+        log "Warming cache from $SNAPSHOT..."
+        python3 -m backend.cli import "$SNAPSHOT" || log "WARNING: Cache warm-up failed, starting cold"
+    fi
+fi
+
 log "🚀 Starting application with command: $@"
 
 # Execute the main command
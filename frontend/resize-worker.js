@@ -0,0 +1,55 @@
+// LOGODETH - Image downscaling worker
+//
+// Resizes and re-encodes an image off the main thread so large photos do not
+// have to travel over slow links at full size. Receives
+// { id, file, maxDimension, maxBytes, quality } and replies with
+// { id, blob, width, height } or { id, error }.
+
+const MIN_QUALITY = 0.5;
+const MAX_ATTEMPTS = 5;
+
+self.onmessage = async (event) => {
+    const { id, file, maxDimension, maxBytes, quality } = event.data;
+
+    try {
+        if (typeof OffscreenCanvas === 'undefined') {
+            throw new Error('OffscreenCanvas not supported');
+        }
+
+        const bitmap = await createImageBitmap(file);
+        let scale = Math.min(1, maxDimension / Math.max(bitmap.width, bitmap.height));
+        let currentQuality = quality;
+        // Keep transparency for non-JPEG logos; WebP falls back to PNG where unsupported
+        const type = file.type === 'image/jpeg' ? 'image/jpeg' : 'image/webp';
+        let blob = null;
+        let width = bitmap.width;
+        let height = bitmap.height;
+
+        for (let attempt = 0; attempt < MAX_ATTEMPTS; attempt++) {
+            width = Math.max(1, Math.round(bitmap.width * scale));
+            height = Math.max(1, Math.round(bitmap.height * scale));
+
+            const canvas = new OffscreenCanvas(width, height);
+            const context = canvas.getContext('2d');
+            context.imageSmoothingQuality = 'high';
+            context.drawImage(bitmap, 0, 0, width, height);
+
+            blob = await canvas.convertToBlob({ type, quality: currentQuality });
+            if (blob.size <= maxBytes) {
+                break;
+            }
+
+            // Trade quality first, then dimensions
+            if (currentQuality > MIN_QUALITY) {
+                currentQuality = Math.max(MIN_QUALITY, currentQuality - 0.15);
+            } else {
+                scale *= 0.75;
+            }
+        }
+
+        bitmap.close();
+        self.postMessage({ id, blob, width, height });
+    } catch (error) {
+        self.postMessage({ id, error: error.message });
+    }
+};
@@ -22,6 +22,17 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     })();
     
+    // Optional client-side downscaling before upload. The cache key stays the
+    // hash of the original file, which is sent along as original_hash.
+    const RESIZE_OPTIONS = {
+        enabled: true,
+        maxDimension: 2048,
+        maxBytes: 1.5 * 1024 * 1024,
+        quality: 0.85,
+        // Upload the original if the worker has not answered by then
+        timeoutMs: 15000
+    };
+    
     // Logo recognition API client
     class LogoRecognitionAPI {
         constructor(baseUrl) {
@@ -39,6 +50,9 @@ document.addEventListener('DOMContentLoaded', function() {
             if (options.force_refresh) {
                 formData.append('force_refresh', 'true');
             }
+            if (options.original_hash) {
+                formData.append('original_hash', options.original_hash);
+            }
             
             const controller = new AbortController();
             const timeoutId = setTimeout(() => controller.abort(), 60000); // 60 second timeout
@@ -66,7 +80,9 @@ document.addEventListener('DOMContentLoaded', function() {
                     throw new Error(errorMessage);
                 }
                 
-                return await response.json();
+                const result = await response.json();
+                result.timings = result.timings || parseServerTiming(response.headers.get('Server-Timing'));
+                return result;
                 
             } catch (error) {
                 clearTimeout(timeoutId);
@@ -77,6 +93,41 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         }
         
+        async hashFile(file) {
+            // WebCrypto is only available in secure contexts (HTTPS or localhost)
+            if (!window.crypto?.subtle) {
+                return null;
+            }
+            
+            const digest = await window.crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+            return Array.from(new Uint8Array(digest))
+                .map(byte => byte.toString(16).padStart(2, '0'))
+                .join('');
+        }
+        
+        async getCachedResult(imageHash) {
+            // Same SHA-256 of the raw file bytes the server uses as its cache key
+            try {
+                const response = await fetch(`${this.baseUrl}/recognize/${imageHash}`, {
+                    method: 'GET',
+                    headers: {
+                        'Accept': 'application/json'
+                    }
+                });
+                
+                // 404 means unknown image; anything else unexpected falls back to upload
+                if (!response.ok) {
+                    return null;
+                }
+                
+                const result = await response.json();
+                result.timings = parseServerTiming(response.headers.get('Server-Timing'));
+                return result;
+            } catch {
+                return null;
+            }
+        }
+        
         async getHealth() {
             try {
                 const response = await fetch(`${this.baseUrl.replace('/api/v1', '')}/health`, {
@@ -110,6 +161,108 @@ document.addEventListener('DOMContentLoaded', function() {
     // Initialize API client
     const logoAPI = new LogoRecognitionAPI(API_BASE_URL);
     
+    // Image downscaler backed by a Web Worker
+    class ImageDownscaler {
+        constructor(options) {
+            this.options = options;
+            this.worker = null;
+            this.nextId = 0;
+            this.pending = new Map();
+        }
+        
+        getWorker() {
+            if (!this.worker) {
+                this.worker = new Worker('resize-worker.js');
+                this.worker.onmessage = (event) => {
+                    const { id, ...reply } = event.data;
+                    this.settle(id, reply);
+                };
+                // The worker failed to load or crashed: answer everything still
+                // waiting and start a fresh worker on the next upload
+                this.worker.onerror = (event) => {
+                    event.preventDefault();
+                    this.reset(event.message || 'Resize worker failed');
+                };
+                this.worker.onmessageerror = () => this.reset('Resize worker reply could not be read');
+            }
+            return this.worker;
+        }
+        
+        settle(id, reply) {
+            const resolve = this.pending.get(id);
+            if (resolve) {
+                this.pending.delete(id);
+                resolve(reply);
+            }
+        }
+        
+        reset(error) {
+            if (this.worker) {
+                this.worker.terminate();
+                this.worker = null;
+            }
+            for (const id of [...this.pending.keys()]) {
+                this.settle(id, { error });
+            }
+        }
+        
+        async needsResize(file) {
+            if (file.size > this.options.maxBytes) {
+                return true;
+            }
+            try {
+                const bitmap = await createImageBitmap(file);
+                const tooLarge = Math.max(bitmap.width, bitmap.height) > this.options.maxDimension;
+                bitmap.close();
+                return tooLarge;
+            } catch {
+                return false;
+            }
+        }
+        
+        async prepare(file) {
+            // GIFs may be animated, and re-encoding would keep only the first frame
+            if (!this.options.enabled || typeof Worker === 'undefined' ||
+                typeof createImageBitmap === 'undefined' || file.type === 'image/gif') {
+                return file;
+            }
+            
+            if (!(await this.needsResize(file))) {
+                return file;
+            }
+            
+            const id = this.nextId++;
+            let timer = null;
+            const reply = await new Promise((resolve) => {
+                this.pending.set(id, resolve);
+                timer = setTimeout(() => this.reset('Resize timed out'), this.options.timeoutMs);
+                try {
+                    this.getWorker().postMessage({
+                        id,
+                        file,
+                        maxDimension: this.options.maxDimension,
+                        maxBytes: this.options.maxBytes,
+                        quality: this.options.quality
+                    });
+                } catch (error) {
+                    this.reset(error.message);
+                }
+            });
+            clearTimeout(timer);
+            
+            // Fall back to the original file if the browser cannot resize or it did not help
+            if (reply.error || !reply.blob || reply.blob.size >= file.size) {
+                return file;
+            }
+            
+            const extension = { 'image/jpeg': '.jpg', 'image/webp': '.webp', 'image/png': '.png' }[reply.blob.type] || '.jpg';
+            const baseName = file.name.replace(/\.[^.]+$/, '');
+            return new File([reply.blob], `${baseName}${extension}`, { type: reply.blob.type });
+        }
+    }
+    
+    const downscaler = new ImageDownscaler(RESIZE_OPTIONS);
+    
     // Store current file for analysis
     let currentFile = null;
 
@@ -222,9 +375,25 @@ document.addEventListener('DOMContentLoaded', function() {
                 force_refresh: false  // Could add "Refresh Cache" button later
             };
             
-            updateProgress('Analyzing with AI...');
+            // Skip the upload entirely if the server already knows this image
+            updateProgress('Checking known logos...');
             
-            const result = await logoAPI.recognizeLogo(currentFile, options);
+            let result = null;
+            const imageHash = await logoAPI.hashFile(currentFile).catch(() => null);
+            if (imageHash && !options.force_refresh) {
+                result = await logoAPI.getCachedResult(imageHash);
+            }
+            
+            if (!result) {
+                updateProgress('Preparing image...');
+                const uploadFile = await downscaler.prepare(currentFile).catch(() => currentFile);
+                if (imageHash && uploadFile !== currentFile) {
+                    options.original_hash = imageHash;
+                }
+                
+                updateProgress('Analyzing with AI...');
+                result = await logoAPI.recognizeLogo(uploadFile, options);
+            }
             
             updateProgress('Processing results...');
             
@@ -235,6 +404,8 @@ document.addEventListener('DOMContentLoaded', function() {
             if (result._cache_metadata?.cached_at) {
                 const cacheAge = getCacheAge(result._cache_metadata.cached_at);
                 showSuccess(`✨ Result retrieved from cache (${cacheAge})!`);
+            } else if (result.cached) {
+                showSuccess('✨ Result retrieved from cache!');
             } else {
                 showSuccess(`🤖 Analyzed using ${result.ai_model || 'AI'}!`);
             }
@@ -295,8 +466,9 @@ document.addEventListener('DOMContentLoaded', function() {
                         ${result.description ? `<div class="result-description">${escapeHtml(result.description)}</div>` : ''}
                         <div class="result-metadata">
                             ${result.ai_model ? `<span class="result-model">Model: ${escapeHtml(result.ai_model)}</span>` : ''}
-                            ${result.processing_time_ms ? `<span class="result-timing">• ${result.processing_time_ms}ms</span>` : ''}
+                            ${result.timings?.total ? `<span class="result-timing">• ${Math.round(result.timings.total)}ms</span>` : ''}
                         </div>
+                        ${formatTimings(result.timings)}
                     </div>
                 </div>
                 <div class="confidence-bar">
@@ -465,6 +637,12 @@ document.addEventListener('DOMContentLoaded', function() {
         .result-model, .result-timing {
             margin-right: 10px;
         }
+        
+        .result-timings {
+            color: #666;
+            font-size: 0.75em;
+            margin-top: 2px;
+        }
     `;
     document.head.appendChild(style);
 
@@ -481,6 +659,36 @@ function getPreferredProviders() {
     return ['openai', 'anthropic'];
 }
 
+function parseServerTiming(header) {
+    // "cache_get;dur=0.9, openai;dur=1187.5" -> {cache_get: 0.9, openai: 1187.5}
+    if (!header) {
+        return null;
+    }
+    
+    const timings = {};
+    header.split(',').forEach(entry => {
+        const [name, ...params] = entry.trim().split(';');
+        const duration = params.find(param => param.trim().startsWith('dur='));
+        if (name && duration) {
+            timings[name] = parseFloat(duration.trim().slice(4));
+        }
+    });
+    return Object.keys(timings).length ? timings : null;
+}
+
+function formatTimings(timings) {
+    // One line with where the time went, slowest stages first
+    if (!timings) {
+        return '';
+    }
+    
+    const stages = Object.entries(timings)
+        .filter(([name, ms]) => name !== 'total' && ms >= 1)
+        .sort((a, b) => b[1] - a[1])
+        .map(([name, ms]) => `${escapeHtml(name)} ${Math.round(ms)}ms`);
+    return stages.length ? `<div class="result-timings">${stages.join(' · ')}</div>` : '';
+}
+
 function getCacheAge(cachedAt) {
     try {
         const cached = new Date(cachedAt);
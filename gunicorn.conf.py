@@ -0,0 +1,52 @@
+"""
+Gunicorn configuration, loaded automatically from the working directory
+
+Production settings come from LOGODETH_* settings (see backend/server.py,
+the entry point). The hooks also keep Prometheus multiprocess metrics
+consistent: stale files from a previous run are removed before workers
+start, and a dead worker's live gauges are dropped when it exits.
+"""
+import glob
+import os
+
+from backend.config import get_settings
+from backend.server import APP, bind_address, preload_shared_state, start_memory_watchdog, worker_count
+
+_settings = get_settings()
+
+wsgi_app = APP
+bind = bind_address(_settings)
+workers = worker_count(_settings)
+# Picks uvloop and httptools when they are installed
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = _settings.worker_timeout
+graceful_timeout = _settings.worker_timeout
+keepalive = 5
+max_requests = _settings.worker_max_requests
+# Keeps workers from all restarting at the same moment
+max_requests_jitter = _settings.worker_max_requests // 10
+preload_app = _settings.worker_preload
+
+
+def on_starting(server):
+    metrics_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+        for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+            os.remove(path)
+
+
+def when_ready(server):
+    if preload_app:
+        preload_shared_state()
+    server.log.info(f"{workers} workers, timeout {timeout}s, recycled after ~{max_requests} requests")
+
+
+def post_worker_init(worker):
+    if _settings.worker_max_memory_mb:
+        start_memory_watchdog(_settings.worker_max_memory_mb)
+
+
+def child_exit(server, worker):
+    from backend.utils.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
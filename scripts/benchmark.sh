@@ -0,0 +1,36 @@
+#!/bin/bash
+
+# LOGODETH hot path micro-benchmarks
+#
+#   scripts/benchmark.sh save       Record a baseline on this machine (e.g. on main)
+#   scripts/benchmark.sh compare    Run again and fail if any benchmark's median
+#                                   is more than BENCH_THRESHOLD slower (default 15%)
+#   scripts/benchmark.sh            Just run and print the table
+#
+# Baselines are stored in .benchmarks/ and only mean something on the
+# machine that recorded them.
+
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+SUITE="tests/benchmarks/test_hot_path.py"
+THRESHOLD="${BENCH_THRESHOLD:-15%}"
+ARGS=(--benchmark-only --benchmark-storage=.benchmarks --benchmark-sort=name -p no:warnings)
+
+case "${1:-run}" in
+    save)
+        python -m pytest "$SUITE" "${ARGS[@]}" --benchmark-save=baseline
+        ;;
+    compare)
+        python -m pytest "$SUITE" "${ARGS[@]}" \
+            --benchmark-compare \
+            --benchmark-compare-fail="median:${THRESHOLD}"
+        ;;
+    run)
+        python -m pytest "$SUITE" "${ARGS[@]}"
+        ;;
+    *)
+        echo "Usage: $0 [save|compare]" >&2
+        exit 2
+        ;;
+esac
@@ -0,0 +1,90 @@
+#!/bin/bash
+
+# LOGODETH end-to-end load test
+#
+# Starts the mock LLM provider and the API (pointed at it, with rate and
+# budget limits lifted) and runs the Locust scenarios headless against them.
+# Needs a Redis at REDIS_URL; no real provider is called.
+#
+#   scripts/load_test.sh                      # defaults below
+#   LOAD_HIT_RATIO=0.5 LOAD_USERS=200 scripts/load_test.sh UploadUser
+#   MOCK_LATENCY=fixed:0.2 MOCK_RATE_LIMIT_RATE=0.1 scripts/load_test.sh
+#   scripts/load_test.sh replay logs/traffic/*.jsonl --prime --speed 2
+#
+# With "replay", captured traffic is replayed with tests/load/replay.py
+# instead of running Locust, and the remaining arguments go to the replayer.
+# Otherwise extra arguments are passed to locust. Anything in tests/load/locustfile.py
+# (LOAD_*) and tests/load/mock_provider.py (MOCK_LLM_*) can be set as well.
+
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+REDIS_URL="${REDIS_URL:-redis://localhost:6379}"
+APP_PORT="${APP_PORT:-8001}"
+MOCK_PORT="${MOCK_PORT:-8900}"
+LOAD_USERS="${LOAD_USERS:-50}"
+LOAD_SPAWN_RATE="${LOAD_SPAWN_RATE:-10}"
+LOAD_DURATION="${LOAD_DURATION:-2m}"
+
+export MOCK_LLM_LATENCY="${MOCK_LATENCY:-${MOCK_LLM_LATENCY:-lognormal:1.5,0.4}}"
+export MOCK_LLM_ERROR_RATE="${MOCK_ERROR_RATE:-${MOCK_LLM_ERROR_RATE:-0}}"
+export MOCK_LLM_RATE_LIMIT_RATE="${MOCK_RATE_LIMIT_RATE:-${MOCK_LLM_RATE_LIMIT_RATE:-0}}"
+export MOCK_LLM_MALFORMED_RATE="${MOCK_MALFORMED_RATE:-${MOCK_LLM_MALFORMED_RATE:-0}}"
+export LOAD_MOCK_URL="http://127.0.0.1:${MOCK_PORT}"
+
+if ! redis-cli -u "$REDIS_URL" ping > /dev/null 2>&1; then
+    echo "⚠️  No Redis at $REDIS_URL; the app will run on its fallback cache"
+fi
+
+PIDS=()
+cleanup() {
+    kill "${PIDS[@]}" 2> /dev/null || true
+    wait 2> /dev/null || true
+}
+trap cleanup EXIT
+
+wait_for() {
+    for _ in $(seq 1 50); do
+        curl -sf "$1" > /dev/null && return 0
+        sleep 0.2
+    done
+    echo "❌ $1 did not come up" >&2
+    exit 1
+}
+
+for port in "$MOCK_PORT" "$APP_PORT"; do
+    if curl -s "http://127.0.0.1:$port" > /dev/null 2>&1; then
+        echo "❌ Port $port is already in use" >&2
+        exit 1
+    fi
+done
+
+echo "🎭 Mock provider on :$MOCK_PORT ($MOCK_LLM_LATENCY)"
+python tests/load/mock_provider.py --port "$MOCK_PORT" &
+PIDS+=($!)
+wait_for "$LOAD_MOCK_URL/_mock/stats"
+
+echo "🤘 API on :$APP_PORT"
+LOGODETH_REDIS_URL="$REDIS_URL" \
+LOGODETH_OPENAI_API_KEY=mock \
+LOGODETH_OPENAI_BASE_URL="$LOAD_MOCK_URL/v1" \
+LOGODETH_ANTHROPIC_API_KEY=mock \
+LOGODETH_ANTHROPIC_BASE_URL="$LOAD_MOCK_URL" \
+LOGODETH_API_RATE_LIMIT=100000 \
+LOGODETH_DAILY_BUDGET=1000000 \
+LOGODETH_MONTHLY_BUDGET=1000000 \
+LOGODETH_LOG_LEVEL="${LOGODETH_LOG_LEVEL:-WARNING}" \
+python -m uvicorn backend.app:app --port "$APP_PORT" --log-level warning &
+PIDS+=($!)
+wait_for "http://127.0.0.1:$APP_PORT/health"
+
+if [ "${1:-}" = "replay" ]; then
+    shift
+    echo "🔁 Replaying captured traffic"
+    python tests/load/replay.py --target "http://127.0.0.1:$APP_PORT" --mock-url "$LOAD_MOCK_URL" "$@"
+    exit
+fi
+
+echo "🔥 $LOAD_USERS users for $LOAD_DURATION"
+locust -f tests/load/locustfile.py --host "http://127.0.0.1:$APP_PORT" \
+    --headless -u "$LOAD_USERS" -r "$LOAD_SPAWN_RATE" -t "$LOAD_DURATION" --only-summary "$@"
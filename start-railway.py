@@ -4,7 +4,6 @@ Railway-optimized startup script for LOGODETH
 """
 import os
 import sys
-import uvicorn
 from pathlib import Path
 
 # Add backend to path
@@ -29,13 +28,9 @@ if __name__ == "__main__":
     print(f"   Environment: {os.getenv('LOGODETH_ENVIRONMENT', 'unknown')}")
     
     try:
-        uvicorn.run(
-            "backend.app:app",
-            host="0.0.0.0",
-            port=port,
-            log_level="info",
-            access_log=True
-        )
+        # Gunicorn with uvicorn workers, sized from LOGODETH_WORKER_*
+        from backend.server import main
+        main()
     except Exception as e:
         print(f"❌ Failed to start: {e}")
         sys.exit(1)
\ No newline at end of file
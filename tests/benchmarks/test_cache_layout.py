@@ -0,0 +1,93 @@
+"""
+Memory footprint of the cache storage layouts
+
+Needs a real Redis; uses LOGODETH_BENCH_REDIS_URL (default database 15 on
+localhost), which is flushed. Run with -s to see the report:
+
+    pytest -s tests/benchmarks/test_cache_layout.py
+"""
+import asyncio
+import hashlib
+import os
+from datetime import datetime
+
+import pytest
+import redis.asyncio as redis
+
+from backend.config import get_settings
+from backend.services.cache import CacheService
+
+REDIS_URL = os.getenv("LOGODETH_BENCH_REDIS_URL", "redis://localhost:6379/15")
+ENTRIES = int(os.getenv("LOGODETH_BENCH_ENTRIES", "20000"))
+
+
+def make_entry(i: int) -> dict:
+    """Realistic recognition result as produced by RecognitionService"""
+    return {
+        "band_name": f"Band {i}",
+        "confidence": 40 + i % 60,
+        "genre": "Black Metal",
+        "description": "Jagged, symmetrical lettering with inverted crosses and thorned terminals",
+        "ai_model": "gpt-4-vision-preview",
+        "cached": False,
+        "processing_time": 0,
+        "timestamp": datetime.now().isoformat(),
+    }
+
+
+async def bytes_per_entry(layout: str) -> dict:
+    """Fill an empty database with ENTRIES entries and measure memory growth"""
+    os.environ["LOGODETH_CACHE_LAYOUT"] = layout
+    get_settings.cache_clear()
+
+    client = redis.from_url(REDIS_URL, decode_responses=True)
+    cache = CacheService()
+    cache.redis_client = client
+    try:
+        await client.flushdb()
+        before = (await client.info("memory"))["used_memory"]
+
+        for start in range(0, ENTRIES, 500):
+            await asyncio.gather(*(
+                cache.set(hashlib.sha256(str(i).encode()).hexdigest(), make_entry(i), version="bench")
+                for i in range(start, min(start + 500, ENTRIES))
+            ))
+
+        total = (await client.info("memory"))["used_memory"] - before
+        index = sum([
+            await client.memory_usage(cache.created_index) or 0,
+            await client.memory_usage(cache.expires_index) or 0,
+        ])
+        return {"total": total / ENTRIES, "excluding_index": (total - index) / ENTRIES}
+    finally:
+        await client.flushdb()
+        await client.close()
+        os.environ.pop("LOGODETH_CACHE_LAYOUT", None)
+        get_settings.cache_clear()
+
+
+def redis_available() -> bool:
+    async def ping():
+        client = redis.from_url(REDIS_URL, socket_connect_timeout=1)
+        try:
+            return await client.ping()
+        finally:
+            await client.close()
+
+    try:
+        return asyncio.run(ping())
+    except Exception:
+        return False
+
+
+@pytest.mark.skipif(not redis_available(), reason=f"Redis not reachable at {REDIS_URL}")
+def test_bucketed_layout_uses_less_memory_per_entry():
+    string = asyncio.run(bytes_per_entry("string"))
+    bucketed = asyncio.run(bytes_per_entry("bucketed"))
+
+    print(f"\nBytes per entry over {ENTRIES:,} entries")
+    print(f"  {'layout':<10}{'total':>10}{'without index':>16}")
+    for name, result in (("string", string), ("bucketed", bucketed)):
+        print(f"  {name:<10}{result['total']:>10.0f}{result['excluding_index']:>16.0f}")
+
+    assert bucketed["excluding_index"] < string["excluding_index"]
@@ -0,0 +1,176 @@
+"""
+Micro-benchmarks for the per-request hot path
+
+Covers everything a recognition request does on the event loop apart from
+network I/O, over realistic upload sizes. Baselines are kept per machine;
+compare before and after a change with:
+
+    scripts/benchmark.sh save      # on the base revision
+    scripts/benchmark.sh compare   # on the change; fails on regressions
+"""
+import asyncio
+import base64
+import io
+import json
+import random
+import struct
+import zlib
+from datetime import datetime
+
+import pytest
+from starlette.datastructures import UploadFile
+
+pytest.importorskip("pytest_benchmark")
+
+from backend.config import get_settings
+from backend.models.recognition import RecognitionResult
+from backend.services.cache import ImageHasher
+from backend.services.cache_layouts import BucketedLayout, StringLayout
+from backend.services.llm_client import LLMClient
+from backend.utils.rate_limiter import RateLimiter
+from backend.utils.validators import validate_image_file
+
+# Typical phone photo, a large screenshot, and just under the upload limit
+IMAGE_SIZES = {"50KB": 50 * 1024, "1MB": 1024 * 1024, "9.5MB": int(9.5 * 1024 * 1024)}
+
+PROVIDER_RESPONSE = """Here is my analysis of the logo:
+
+{
+    "band_name": "Darkthrone",
+    "genre": "Black Metal",
+    "confidence": 92,
+    "description": "Spiky, symmetrical letterforms with an inverted cross in the central T"
+}"""
+
+TEXT_RESPONSE = """Band: Darkthrone
+Genre: Black Metal
+Confidence: 92%
+Description: Spiky, symmetrical letterforms"""
+
+
+def make_png(size: int) -> bytes:
+    """PNG signature and header followed by incompressible payload, size bytes in total"""
+    header = b"\x89PNG\r\n\x1a\n"
+    ihdr = struct.pack(">IIBBBBB", 1024, 1024, 8, 6, 0, 0, 0)
+    header += struct.pack(">I", len(ihdr)) + b"IHDR" + ihdr + struct.pack(">I", zlib.crc32(b"IHDR" + ihdr))
+    return header + random.Random(size).randbytes(size - len(header))
+
+
+def make_entry() -> dict:
+    """Cache entry as written by RecognitionService"""
+    return {
+        "band_name": "Darkthrone",
+        "confidence": 92,
+        "genre": "Black Metal",
+        "description": "Spiky, symmetrical letterforms with an inverted cross in the central T",
+        "ai_model": "gpt-4o",
+        "cached": False,
+        "processing_time": 0,
+        "timestamp": datetime.now().isoformat(),
+        "_cache_metadata": {
+            "cached_at": datetime.utcnow().isoformat(),
+            "cache_key": "ab" * 32,
+            "ttl_seconds": 86400,
+            "version": "gpt-4o|claude-3-5-sonnet-20241022|prompt-1",
+        },
+    }
+
+
+class RecordingPipe:
+    """Pipeline stand-in that keeps the queued commands"""
+
+    def __init__(self):
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="module")
+def settings():
+    return get_settings()
+
+
+@pytest.fixture(params=list(IMAGE_SIZES), scope="module")
+def image(request) -> bytes:
+    return make_png(IMAGE_SIZES[request.param])
+
+
+def test_image_hashing(benchmark, image):
+    benchmark(ImageHasher.hash_image, image)
+
+
+def test_base64_encoding(benchmark, image):
+    benchmark(lambda: base64.b64encode(image).decode("utf-8"))
+
+
+def test_validate_image_file(benchmark, image, loop, settings):
+    def validate():
+        upload = UploadFile(file=io.BytesIO(image), filename="logo.png")
+        loop.run_until_complete(validate_image_file(upload, settings))
+
+    benchmark(validate)
+
+
+def test_parse_json_response(benchmark):
+    client = object.__new__(LLMClient)  # Parsing needs no provider clients
+    result = benchmark(client._parse_response, PROVIDER_RESPONSE)
+    assert result["band_name"] == "Darkthrone"
+
+
+def test_parse_text_response(benchmark):
+    client = object.__new__(LLMClient)
+    result = benchmark(client._parse_text_response, TEXT_RESPONSE)
+    assert result["band_name"] == "Darkthrone"
+
+
+def test_string_layout_round_trip(benchmark):
+    layout = StringLayout("logodeth:cache:", "logodeth:hits:")
+    entry = make_entry()
+
+    def round_trip():
+        pipe = RecordingPipe()
+        layout.queue_set(pipe, "ab" * 32, entry, 86400, False)
+        raw = pipe.commands[0][1][1]
+        return layout.decode_get("ab" * 32, [raw, 86400, "1"])
+
+    data, _, _ = benchmark(round_trip)
+    assert data["band_name"] == "Darkthrone"
+
+
+def test_bucketed_layout_round_trip(benchmark):
+    layout = BucketedLayout()
+    entry = make_entry()
+
+    def round_trip():
+        return layout.decode("ab" * 32, layout.encode("ab" * 32, entry, 1.9e9, 3))
+
+    data, _, _ = benchmark(round_trip)
+    assert data["band_name"] == "Darkthrone"
+
+
+def test_rate_limiter_with_many_clients(benchmark, loop):
+    limiter = RateLimiter()
+    clients = [f"10.0.{i // 256}.{i % 256}" for i in range(10000)]
+    for ip in clients:
+        loop.run_until_complete(limiter.check_rate_limit(ip))
+    ips = iter(clients * 1000)
+
+    benchmark(lambda: loop.run_until_complete(limiter.check_rate_limit(next(ips))))
+
+
+def test_result_from_provider(benchmark):
+    parsed = json.loads(PROVIDER_RESPONSE[PROVIDER_RESPONSE.index("{"):])
+    benchmark(lambda: RecognitionResult(**parsed, ai_model="gpt-4o", cached=False, processing_time=0))
+
+
+def test_result_from_cache_entry(benchmark):
+    entry = make_entry()
+    benchmark(lambda: RecognitionResult(**{**entry, "cached": True}))
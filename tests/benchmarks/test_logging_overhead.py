@@ -0,0 +1,71 @@
+"""
+Logging overhead per request, as seen by the event loop
+
+Simulates the INFO lines a cache-miss recognition emits against a sink
+that takes SINK_DELAY seconds per write (a busy disk or a slow log
+shipper), comparing:
+
+- before: the old synchronous text sink
+- queued: setup_logging's queued sinks, every request logged
+- sampled: queued sinks at REQUESTS/s with sampling above 50 requests/s
+
+Run with -s to see the report:
+
+    pytest -s tests/benchmarks/test_logging_overhead.py
+"""
+import os
+import time
+
+from loguru import logger
+
+from backend.utils import logging as logging_utils
+
+REQUESTS = int(os.getenv("LOGODETH_BENCH_REQUESTS", "300"))
+SINK_DELAY = float(os.getenv("LOGODETH_BENCH_SINK_DELAY", "0.0002"))
+
+
+def slow_write(message: str) -> None:
+    """A write that takes SINK_DELAY seconds"""
+    time.sleep(SINK_DELAY)
+
+
+def simulate_request(i: int) -> None:
+    """The log lines of one recognize_logo call that misses the cache"""
+    logger.info(f"Processing logo recognition for file: logo-{i}.png")
+    logger.info(f"Cache miss for image hash: {i:064x}, calling AI API")
+    logger.debug("Using model: gpt-4o")
+    logger.info("Recognition completed in 1.23s")
+
+
+def microseconds_per_request(sampler_threshold: int = 0) -> float:
+    """Time REQUESTS simulated requests on the calling thread"""
+    sampler = logging_utils.LogSampler(sampler_threshold)
+    start = time.perf_counter()
+    for i in range(REQUESTS):
+        with logger.contextualize(request_id=f"req-{i}", sampled=sampler.keep()):
+            simulate_request(i)
+    elapsed = time.perf_counter() - start
+    return elapsed / REQUESTS * 1e6
+
+
+def test_queued_sampled_logging_is_cheaper_per_request():
+    logger.remove()
+    logger.configure(extra={"request_id": "-"})
+    try:
+        logger.add(slow_write, format=logging_utils.FILE_FORMAT, level="INFO")
+        before = microseconds_per_request()
+        logger.remove()
+
+        logging_utils.add_sink(slow_write, "INFO", "json")
+        queued = microseconds_per_request()
+        sampled = microseconds_per_request(sampler_threshold=50)
+    finally:
+        # Waits for the queued lines to be written
+        logger.remove()
+
+    print(f"\nLogging overhead per request ({REQUESTS} requests, {SINK_DELAY * 1e6:.0f}us per write)")
+    for name, value in (("before", before), ("queued", queued), ("sampled", sampled)):
+        print(f"  {name:<10}{value:>10.1f} us")
+
+    assert queued < before
+    assert sampled < queued
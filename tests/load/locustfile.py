@@ -0,0 +1,188 @@
+"""
+Load test scenarios for the recognition API
+
+Run the app against a local Redis and the mock provider (see
+scripts/load_test.sh, which starts everything), then:
+
+    locust -f tests/load/locustfile.py --host http://localhost:8001 \\
+        --headless -u 50 -r 10 -t 2m
+
+Scenarios:
+
+- UploadUser: uploads images through POST /api/v1/recognize. A share of
+  LOAD_HIT_RATIO uploads reuse one of LOAD_HOT_IMAGES images cached during
+  warm-up; the rest are new images that go to the provider.
+- LookupUser: fetches cached results by hash, the cheapest read path.
+
+Pick one with its class name on the command line, otherwise both run
+(UploadUser three times as often). When the run stops a summary of
+throughput, latency percentiles, observed cache hits and upstream provider
+calls (read from the mock provider at LOAD_MOCK_URL) is printed, and
+written as JSON to LOAD_REPORT if set. Hit counts are tracked per locust
+process, so run it without --processes/workers for the summary.
+"""
+import hashlib
+import json
+import os
+import random
+import struct
+import time
+import zlib
+from collections import Counter
+
+import requests
+from locust import HttpUser, between, events, task
+from locust.runners import MasterRunner, WorkerRunner
+
+HIT_RATIO = float(os.getenv("LOAD_HIT_RATIO", "0.8"))
+HOT_IMAGES = int(os.getenv("LOAD_HOT_IMAGES", "50"))
+IMAGE_SIZE = int(os.getenv("LOAD_IMAGE_SIZE", str(200 * 1024)))
+WARM_UP = os.getenv("LOAD_WARM_UP", "1") != "0"
+MOCK_URL = os.getenv("LOAD_MOCK_URL", "http://localhost:8900")
+REPORT_PATH = os.getenv("LOAD_REPORT")
+WAIT_MIN = float(os.getenv("LOAD_WAIT_MIN", "0.5"))
+WAIT_MAX = float(os.getenv("LOAD_WAIT_MAX", "2"))
+
+RECOGNIZE = "/api/v1/recognize"
+
+outcomes: Counter = Counter()
+run = {"started": None, "mock_before": None}
+
+
+def make_png(size: int, seed) -> bytes:
+    """Bytes that pass upload validation as a PNG, unique per seed"""
+    header = b"\x89PNG\r\n\x1a\n"
+    ihdr = struct.pack(">IIBBBBB", 512, 512, 8, 6, 0, 0, 0)
+    header += struct.pack(">I", len(ihdr)) + b"IHDR" + ihdr + struct.pack(">I", zlib.crc32(b"IHDR" + ihdr))
+    return header + random.Random(seed).randbytes(max(0, size - len(header)))
+
+
+hot_images = [make_png(IMAGE_SIZE, f"hot-{i}") for i in range(HOT_IMAGES)]
+hot_hashes = [hashlib.sha256(image).hexdigest() for image in hot_images]
+
+
+def mock_stats():
+    """Call counts from the mock provider, or None if it is not reachable"""
+    try:
+        return requests.get(f"{MOCK_URL}/_mock/stats", timeout=5).json()
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def call_delta(before, after):
+    """Upstream calls per provider and outcome made between two mock_stats()"""
+    if not before or not after:
+        return None
+    delta = {}
+    for provider, counts in after["calls"].items():
+        previous = before["calls"].get(provider, {})
+        delta[provider] = {outcome: count - previous.get(outcome, 0) for outcome, count in counts.items()}
+    return delta
+
+
+@events.test_start.add_listener
+def warm_up(environment, **kwargs):
+    """Get the hot images into the cache so hits are hits from the first request"""
+    if isinstance(environment.runner, WorkerRunner):
+        return
+    if WARM_UP and HIT_RATIO > 0:
+        session = requests.Session()
+        # One request per image; the rate limit of the app applies to warm-up too
+        cached = sum(
+            session.post(
+                environment.host + RECOGNIZE,
+                files={"file": (f"hot-{i}.png", image, "image/png")},
+                timeout=120
+            ).ok
+            for i, image in enumerate(hot_images)
+        )
+        print(f"Warm-up: {cached}/{len(hot_images)} hot images cached")
+
+    outcomes.clear()
+    run["started"] = time.time()
+    run["mock_before"] = mock_stats()
+
+
+@events.test_stop.add_listener
+def report(environment, **kwargs):
+    """Print the run summary"""
+    if isinstance(environment.runner, WorkerRunner) or run["started"] is None:
+        return
+
+    elapsed = time.time() - run["started"]
+    total = environment.stats.total
+    upstream = call_delta(run["mock_before"], mock_stats())
+    misses = outcomes["miss"]
+    upstream_calls = sum(sum(counts.values()) for counts in upstream.values()) if upstream else None
+
+    summary = {
+        "duration_s": round(elapsed, 1),
+        "requests": total.num_requests,
+        "failures": total.num_failures,
+        "throughput_rps": round(total.num_requests / elapsed, 2) if elapsed else 0,
+        "latency_ms": {
+            "p50": total.get_response_time_percentile(0.5),
+            "p95": total.get_response_time_percentile(0.95),
+            "p99": total.get_response_time_percentile(0.99),
+            "max": total.max_response_time,
+        },
+        "target_hit_ratio": HIT_RATIO,
+        "uploads": dict(outcomes),
+        "observed_hit_ratio": round(outcomes["hit"] / (outcomes["hit"] + misses), 3) if outcomes["hit"] + misses else None,
+        "upstream_calls": upstream,
+        "upstream_calls_per_miss": round(upstream_calls / misses, 2) if upstream_calls is not None and misses else None,
+    }
+
+    if isinstance(environment.runner, MasterRunner):
+        summary.pop("uploads")
+        summary.pop("observed_hit_ratio")
+        summary.pop("upstream_calls_per_miss")
+
+    print("\nLoad test summary")
+    print(json.dumps(summary, indent=2))
+    if REPORT_PATH:
+        with open(REPORT_PATH, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+class UploadUser(HttpUser):
+    """Uploads logos the way the web frontend does"""
+    weight = 3
+    wait_time = between(WAIT_MIN, WAIT_MAX)
+
+    @task
+    def upload(self):
+        if hot_images and random.random() < HIT_RATIO:
+            image, name = random.choice(hot_images), RECOGNIZE + " [hot]"
+        else:
+            image, name = make_png(IMAGE_SIZE, random.getrandbits(64)), RECOGNIZE + " [new]"
+
+        with self.client.post(
+            RECOGNIZE,
+            files={"file": ("logo.png", image, "image/png")},
+            name=name,
+            catch_response=True
+        ) as response:
+            if response.status_code == 200:
+                outcomes["hit" if response.json().get("cached") else "miss"] += 1
+                response.success()
+            else:
+                error = "unknown"
+                try:
+                    error = response.json()["detail"]["error"]
+                except (ValueError, KeyError, TypeError):
+                    pass
+                outcomes[error] += 1
+                response.failure(f"{response.status_code} {error}")
+
+
+class LookupUser(HttpUser):
+    """Fetches cached results by image hash"""
+    weight = 1
+    wait_time = between(WAIT_MIN, WAIT_MAX)
+
+    @task
+    def lookup(self):
+        if not hot_hashes:
+            return
+        self.client.get(f"{RECOGNIZE}/{random.choice(hot_hashes)}", name=RECOGNIZE + "/{hash}")
@@ -0,0 +1,306 @@
+"""
+Stand-in for the OpenAI and Anthropic APIs, for load tests
+
+Serves the two endpoints LLMClient calls with answers derived from the
+image, after a latency drawn from a configurable distribution, and injects
+upstream errors, 429s and malformed output at configurable rates, plus the
+model list its health probes read. Point the app at it with:
+
+    LOGODETH_OPENAI_BASE_URL=http://localhost:8900/v1
+    LOGODETH_ANTHROPIC_BASE_URL=http://localhost:8900
+    LOGODETH_OPENAI_API_KEY=mock LOGODETH_ANTHROPIC_API_KEY=mock
+
+Run it with:
+
+    python tests/load/mock_provider.py --latency lognormal:1.5,0.4 --rate-limit-rate 0.05
+
+Latency specs are fixed:SECONDS, uniform:LOW,HIGH, lognormal:MEDIAN,SIGMA or
+exponential:MEAN. Every option can also be given as a MOCK_LLM_* environment
+variable and changed on a running server with PUT /_mock/config. Call counts
+per provider and outcome are at GET /_mock/stats.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, fields
+from typing import Callable, Dict, Optional, Tuple
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+BANDS = [
+    ("Darkthrone", "Black Metal"),
+    ("Emperor", "Symphonic Black Metal"),
+    ("Morbid Angel", "Death Metal"),
+    ("Bolt Thrower", "Death Metal"),
+    ("Electric Wizard", "Doom Metal"),
+    ("Candlemass", "Epic Doom Metal"),
+    ("Sodom", "Thrash Metal"),
+    ("Voivod", "Progressive Thrash Metal"),
+    ("Agalloch", "Atmospheric Black Metal"),
+    ("Autopsy", "Death/Doom Metal"),
+]
+
+MALFORMED_OUTPUTS = [
+    # No JSON and no band name: the client gives up on the response
+    "I'm sorry, I can't identify the band from this image.",
+    # Cut off mid-object, as with a hit token limit
+    '{\n    "band_name": "Darkthr',
+    # Valid JSON in the wrong shape
+    '{"name": "Darkthrone", "style": "black metal"}',
+]
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Turn a latency spec such as lognormal:1.5,0.4 into a sampler of seconds"""
+    kind, _, args = spec.partition(":")
+    try:
+        values = [float(value) for value in args.split(",")] if args else []
+        if kind == "fixed" and len(values) == 1:
+            return lambda rng: values[0]
+        if kind == "uniform" and len(values) == 2:
+            return lambda rng: rng.uniform(values[0], values[1])
+        if kind == "lognormal" and len(values) == 2:
+            mu = math.log(values[0])
+            return lambda rng: rng.lognormvariate(mu, values[1])
+        if kind == "exponential" and len(values) == 1:
+            return lambda rng: rng.expovariate(1 / values[0])
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid latency spec {spec!r}")
+
+
+@dataclass
+class MockConfig:
+    """Behaviour of the stand-in provider"""
+    latency: str = "lognormal:1.5,0.4"
+    error_rate: float = 0.0
+    error_status: int = 500
+    rate_limit_rate: float = 0.0
+    retry_after: int = 1
+    malformed_rate: float = 0.0
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "MockConfig":
+        config = cls()
+        for field in fields(cls):
+            value = os.getenv(f"MOCK_LLM_{field.name.upper()}")
+            if value is not None:
+                setattr(config, field.name, str(value) if field.name == "latency" else json.loads(value))
+        config.validate()
+        return config
+
+    def validate(self) -> None:
+        parse_latency(self.latency)
+        for rate in (self.error_rate, self.rate_limit_rate, self.malformed_rate):
+            if not 0 <= rate <= 1:
+                raise ValueError("Rates must be between 0 and 1")
+        if self.error_rate + self.rate_limit_rate + self.malformed_rate > 1:
+            raise ValueError("error_rate, rate_limit_rate and malformed_rate must add up to at most 1")
+
+
+class MockProvider:
+    """Decides the outcome and latency of each call and counts them"""
+
+    def __init__(self, config: MockConfig):
+        self.configure(config)
+        self.calls: Counter = Counter()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.started = time.time()
+
+    def configure(self, config: MockConfig) -> None:
+        config.validate()
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.sample_latency = parse_latency(config.latency)
+
+    def reset(self) -> None:
+        self.calls.clear()
+        self.peak_in_flight = self.in_flight
+        self.started = time.time()
+
+    def outcome(self) -> str:
+        roll = self.rng.random()
+        for outcome, rate in (
+            ("error", self.config.error_rate),
+            ("rate_limited", self.config.rate_limit_rate),
+            ("malformed", self.config.malformed_rate),
+        ):
+            if roll < rate:
+                return outcome
+            roll -= rate
+        return "ok"
+
+    async def call(self, provider: str, image: str) -> Tuple[str, str]:
+        """Wait out the latency and return (outcome, response text)"""
+        outcome = self.outcome()
+        self.calls[(provider, outcome)] += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            # Rejections come back quickly, like a real rate limiter's would
+            delay = 0.01 if outcome == "rate_limited" else self.sample_latency(self.rng)
+            await asyncio.sleep(max(0.0, delay))
+        finally:
+            self.in_flight -= 1
+
+        if outcome == "malformed":
+            return outcome, self.rng.choice(MALFORMED_OUTPUTS)
+        return outcome, answer_for(image)
+
+    def stats(self) -> Dict:
+        by_provider: Dict[str, Dict[str, int]] = {}
+        for (provider, outcome), count in sorted(self.calls.items()):
+            by_provider.setdefault(provider, {})[outcome] = count
+        return {
+            "since": self.started,
+            "total": sum(self.calls.values()),
+            "calls": by_provider,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "config": asdict(self.config),
+        }
+
+
+def answer_for(image: str) -> str:
+    """The same image always gets the same answer"""
+    digest = hashlib.sha256(image.encode()).digest()
+    band, genre = BANDS[digest[0] % len(BANDS)]
+    return json.dumps({
+        "band_name": band,
+        "genre": genre,
+        "confidence": 55 + digest[1] % 45,
+        "description": "Answer from the mock provider",
+    }, indent=4)
+
+
+def openai_image(body: Dict) -> str:
+    for part in body["messages"][-1]["content"]:
+        if part.get("type") == "image_url":
+            return part["image_url"]["url"]
+    return ""
+
+
+def anthropic_image(body: Dict) -> str:
+    for part in body["messages"][-1]["content"]:
+        if part.get("type") == "image":
+            return part["source"]["data"]
+    return ""
+
+
+def create_app(config: Optional[MockConfig] = None) -> FastAPI:
+    """Mock provider app; config defaults to MOCK_LLM_* environment variables"""
+    app = FastAPI(title="Mock LLM provider", docs_url=None, redoc_url=None)
+    mock = MockProvider(config or MockConfig.from_env())
+    app.state.mock = mock
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        outcome, text = await mock.call("openai", openai_image(body))
+        if outcome == "rate_limited":
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit reached (mock)", "type": "requests", "code": "rate_limit_exceeded"}},
+                headers={"retry-after": str(mock.config.retry_after)}
+            )
+        if outcome == "error":
+            return JSONResponse(
+                status_code=mock.config.error_status,
+                content={"error": {"message": "The server had an error (mock)", "type": "server_error", "code": None}}
+            )
+        return {
+            "id": f"chatcmpl-mock-{mock.calls.total()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 800, "completion_tokens": 60, "total_tokens": 860},
+        }
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        body = await request.json()
+        outcome, text = await mock.call("anthropic", anthropic_image(body))
+        if outcome == "rate_limited":
+            return JSONResponse(
+                status_code=429,
+                content={"type": "error", "error": {"type": "rate_limit_error", "message": "Rate limit reached (mock)"}},
+                headers={"retry-after": str(mock.config.retry_after)}
+            )
+        if outcome == "error":
+            return JSONResponse(
+                status_code=mock.config.error_status,
+                content={"type": "error", "error": {"type": "api_error", "message": "Internal server error (mock)"}}
+            )
+        return {
+            "id": f"msg_mock_{mock.calls.total()}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "mock"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": 800, "output_tokens": 60},
+        }
+
+    @app.get("/v1/models")
+    async def models():
+        # Health probes of both SDKs; one body fits both response shapes
+        model = {"id": "mock", "object": "model", "type": "model", "created": 0, "owned_by": "mock",
+                 "display_name": "Mock", "created_at": "2024-01-01T00:00:00Z"}
+        return {"object": "list", "data": [model], "has_more": False, "first_id": "mock", "last_id": "mock"}
+
+    @app.get("/_mock/stats")
+    async def stats():
+        return mock.stats()
+
+    @app.post("/_mock/reset")
+    async def reset():
+        mock.reset()
+        return mock.stats()
+
+    @app.put("/_mock/config")
+    async def configure(request: Request):
+        updates = await request.json()
+        unknown = set(updates) - {field.name for field in fields(MockConfig)}
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown options: {', '.join(sorted(unknown))}")
+        try:
+            mock.configure(MockConfig(**{**asdict(mock.config), **updates}))
+        except (TypeError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return asdict(mock.config)
+
+    return app
+
+
+def main():
+    defaults = MockConfig.from_env()
+    parser = argparse.ArgumentParser(description="Mock OpenAI/Anthropic provider for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", default=defaults.latency, help="fixed:S, uniform:LO,HI, lognormal:MEDIAN,SIGMA or exponential:MEAN")
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--error-status", type=int, default=defaults.error_status)
+    parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate)
+    parser.add_argument("--retry-after", type=int, default=defaults.retry_after)
+    parser.add_argument("--malformed-rate", type=float, default=defaults.malformed_rate)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    config = MockConfig(**{field.name: getattr(args, field.name) for field in fields(MockConfig)})
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Replay captured production traffic against a candidate build
+
+Reads the traces written with LOGODETH_TRAFFIC_CAPTURE_DIR and sends the
+same mix of uploads and lookups at the recorded arrival times, or scaled
+with --speed. Every traced image becomes a synthetic image of the recorded
+size, the same for each of its requests, so repeat rates and cache
+behaviour carry over. Requests are sent open-loop: a slow server does not
+slow down arrivals, just as in production.
+
+Run the candidate against the mock provider (scripts/load_test.sh replay
+does both), then:
+
+    python tests/load/replay.py logs/traffic/*.jsonl --target http://localhost:8001 \\
+        --speed 2 --report candidate.json --compare baseline.json
+
+--prime uploads the images that were already cached when the trace started
+before the clock starts, so hits stay hits. --compare prints the change of
+each headline number against an earlier report; lower is better for
+everything except throughput and hit ratio.
+"""
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import random
+import struct
+import sys
+import time
+import zlib
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+RECOGNIZE = "/api/v1/recognize"
+DEFAULT_SIZE = 200 * 1024
+HIGHER_IS_BETTER = {"throughput_rps", "hit_ratio"}
+
+
+def make_png(size: int, seed) -> bytes:
+    """Bytes that pass upload validation as a PNG, the same for the same seed"""
+    header = b"\x89PNG\r\n\x1a\n"
+    ihdr = struct.pack(">IIBBBBB", 512, 512, 8, 6, 0, 0, 0)
+    header += struct.pack(">I", len(ihdr)) + b"IHDR" + ihdr + struct.pack(">I", zlib.crc32(b"IHDR" + ihdr))
+    return header + random.Random(seed).randbytes(max(0, size - len(header)))
+
+
+def load_trace(patterns: List[str]) -> List[Dict]:
+    """Events from all trace files, in arrival order"""
+    events = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            with open(path) as f:
+                events.extend(json.loads(line) for line in f if line.strip())
+    return sorted(events, key=lambda event: event["at"])
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    ordered = sorted(values)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 1)
+    return {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99)}
+
+
+def hit_ratio(outcomes: Counter) -> Optional[float]:
+    served = outcomes["hit"] + outcomes["miss"]
+    return round(outcomes["hit"] / served, 3) if served else None
+
+
+class Images:
+    """Synthetic stand-ins for the traced images"""
+
+    def __init__(self, events: List[Dict]):
+        self.sizes = {}
+        for event in events:
+            if event["kind"] == "upload" and event["image"] and event["bytes"]:
+                self.sizes.setdefault(event["image"], event["bytes"])
+        self._cache: Dict[str, bytes] = {}
+
+    def content(self, image_id: Optional[str], size: Optional[int]) -> bytes:
+        if image_id is None:
+            # Untraced (rejected before it was read): always a new image
+            return make_png(size or DEFAULT_SIZE, random.getrandbits(64))
+        if image_id not in self._cache:
+            self._cache[image_id] = make_png(self.sizes.get(image_id, size or DEFAULT_SIZE), image_id)
+        return self._cache[image_id]
+
+    def hash(self, image_id: str) -> str:
+        return hashlib.sha256(self.content(image_id, None)).hexdigest()
+
+
+def initially_cached(events: List[Dict]) -> List[str]:
+    """Images whose first traced request was answered from the cache"""
+    seen, cached = set(), []
+    for event in events:
+        image_id = event["image"]
+        if image_id and image_id not in seen:
+            seen.add(image_id)
+            if event["outcome"] in ("hit", "not_modified"):
+                cached.append(image_id)
+    return cached
+
+
+def server_timing(header: str) -> Dict[str, float]:
+    stages = {}
+    for entry in filter(None, (part.strip() for part in header.split(","))):
+        name, _, duration = entry.partition(";dur=")
+        try:
+            stages[name] = float(duration)
+        except ValueError:
+            pass
+    return stages
+
+
+class Replayer:
+    def __init__(self, target: str, images: Images, max_in_flight: int):
+        self.target = target.rstrip("/")
+        self.images = images
+        self.client = httpx.AsyncClient(
+            timeout=300,
+            limits=httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+        )
+        self.slots = asyncio.Semaphore(max_in_flight)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.stages: Dict[str, List[float]] = defaultdict(list)
+        self.outcomes: Counter = Counter()
+        self.statuses: Counter = Counter()
+        self.send_lag: List[float] = []
+
+    async def send(self, event: Dict) -> httpx.Response:
+        if event["kind"] == "lookup":
+            return await self.client.get(f"{self.target}{RECOGNIZE}/{self.images.hash(event['image'])}")
+        content = self.images.content(event["image"], event["bytes"])
+        return await self.client.post(
+            f"{self.target}{RECOGNIZE}", files={"file": ("logo.png", content, "image/png")}
+        )
+
+    async def replay_one(self, event: Dict, due: float) -> None:
+        async with self.slots:
+            self.send_lag.append((time.perf_counter() - due) * 1000)
+            started = time.perf_counter()
+            try:
+                response = await self.send(event)
+            except httpx.HTTPError as e:
+                self.statuses[type(e).__name__] += 1
+                return
+            self.latencies[event["kind"]].append((time.perf_counter() - started) * 1000)
+
+        self.statuses[response.status_code] += 1
+        for stage, ms in server_timing(response.headers.get("server-timing", "")).items():
+            self.stages[stage].append(ms)
+        if response.status_code == 200 and event["kind"] == "upload":
+            self.outcomes["hit" if response.json().get("cached") else "miss"] += 1
+        elif response.status_code in (200, 304):
+            self.outcomes["hit"] += 1
+        else:
+            self.outcomes["miss" if response.status_code == 404 else "error"] += 1
+
+    async def prime(self, image_ids: List[str]) -> int:
+        async def upload(image_id):
+            return (await self.send({"kind": "upload", "image": image_id, "bytes": None})).status_code == 200
+
+        results = []
+        for start in range(0, len(image_ids), 50):
+            results += await asyncio.gather(*(upload(image_id) for image_id in image_ids[start:start + 50]))
+        return sum(results)
+
+    async def run(self, events: List[Dict], speed: float) -> float:
+        tasks = []
+        first = events[0]["at"]
+        clock = time.perf_counter()
+        for event in events:
+            due = clock + (event["at"] - first) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(self.replay_one(event, due)))
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - clock
+
+
+async def mock_calls(mock_url: Optional[str]) -> Optional[Dict]:
+    if not mock_url:
+        return None
+    async with httpx.AsyncClient(timeout=5) as client:
+        try:
+            return (await client.get(f"{mock_url}/_mock/stats")).json()["calls"]
+        except (httpx.HTTPError, ValueError, KeyError):
+            return None
+
+
+def calls_between(before: Optional[Dict], after: Optional[Dict]) -> Optional[Dict]:
+    if before is None or after is None:
+        return None
+    return {
+        provider: {outcome: count - before.get(provider, {}).get(outcome, 0) for outcome, count in counts.items()}
+        for provider, counts in after.items()
+    }
+
+
+def summarize(events: List[Dict], replayer: Replayer, elapsed: float, speed: float, upstream) -> Dict:
+    recorded_span = events[-1]["at"] - events[0]["at"]
+    recorded_outcomes = Counter(event["outcome"] for event in events)
+    all_latencies = [ms for values in replayer.latencies.values() for ms in values]
+    upstream_total = sum(sum(counts.values()) for counts in upstream.values()) if upstream else None
+
+    return {
+        "events": len(events),
+        "speed": speed,
+        "offered_rps": round(len(events) * speed / recorded_span, 2) if recorded_span else None,
+        "throughput_rps": round(len(events) / elapsed, 2) if elapsed else None,
+        "latency_ms": percentiles(all_latencies),
+        "latency_ms_by_kind": {kind: percentiles(values) for kind, values in replayer.latencies.items()},
+        "stages_ms": {stage: percentiles(values) for stage, values in sorted(replayer.stages.items())},
+        "hit_ratio": hit_ratio(replayer.outcomes),
+        "statuses": {str(status): count for status, count in replayer.statuses.items()},
+        "upstream_calls": upstream,
+        "upstream_calls_total": upstream_total,
+        # The replayer could not keep up with the schedule if this is large
+        "send_lag_ms": percentiles(replayer.send_lag),
+        "recorded": {
+            "latency_ms": percentiles([event["ms"]["total"] for event in events]),
+            "hit_ratio": hit_ratio(recorded_outcomes),
+            "statuses": dict(Counter(str(event["status"]) for event in events)),
+        },
+    }
+
+
+def headline(report: Dict) -> Dict[str, Optional[float]]:
+    numbers = {
+        "throughput_rps": report["throughput_rps"],
+        "hit_ratio": report["hit_ratio"],
+        "upstream_calls_total": report["upstream_calls_total"],
+    }
+    numbers.update({f"latency_{q}_ms": value for q, value in report["latency_ms"].items()})
+    for stage, values in report["stages_ms"].items():
+        numbers[f"{stage}_p95_ms"] = values["p95"]
+    return numbers
+
+
+def compare(baseline: Dict, candidate: Dict) -> None:
+    before, after = headline(baseline), headline(candidate)
+    print(f"\n{'metric':<28}{'baseline':>12}{'candidate':>12}{'change':>12}")
+    for metric in after:
+        old, new = before.get(metric), after[metric]
+        if old is None or new is None:
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        better = (change > 0) == (metric in HIGHER_IS_BETTER) if abs(change) >= 1 else None
+        verdict = "" if better is None else ("  better" if better else "  worse")
+        print(f"{metric:<28}{old:>12}{new:>12}{change:>+11.1f}%{verdict}")
+
+
+async def main(args) -> None:
+    events = load_trace(args.trace)
+    if args.limit:
+        events = events[:args.limit]
+    if not events:
+        sys.exit("No events in the trace")
+
+    images = Images(events)
+    replayer = Replayer(args.target, images, args.max_in_flight)
+    try:
+        if args.prime:
+            cached = initially_cached(events)
+            primed = await replayer.prime(cached)
+            print(f"Primed {primed}/{len(cached)} images that were cached when the trace started")
+
+        before = await mock_calls(args.mock_url)
+        print(f"Replaying {len(events)} requests at {args.speed}x")
+        elapsed = await replayer.run(events, args.speed)
+        upstream = calls_between(before, await mock_calls(args.mock_url))
+    finally:
+        await replayer.client.aclose()
+
+    report = summarize(events, replayer, elapsed, args.speed, upstream)
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay captured LOGODETH traffic")
+    parser.add_argument("trace", nargs="+", help="Trace files or globs (traffic-*.jsonl)")
+    parser.add_argument("--target", default="http://localhost:8001", help="Base URL of the build under test")
+    parser.add_argument("--speed", type=float, default=1.0, help="Arrival rate multiplier (2 = twice as fast)")
+    parser.add_argument("--limit", type=int, help="Replay only the first N requests")
+    parser.add_argument("--prime", action="store_true", help="Cache images the trace starts out with hits for")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="Cap on concurrent requests")
+    parser.add_argument("--mock-url", help="Mock provider URL, to count upstream calls")
+    parser.add_argument("--report", help="Write the report as JSON to this file")
+    parser.add_argument("--compare", help="Earlier report to compare against")
+    asyncio.run(main(parser.parse_args()))
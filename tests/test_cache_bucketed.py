@@ -0,0 +1,109 @@
+"""
+Bucketed layout expiry: expired fields are dropped, replaced and pruned
+"""
+import asyncio
+import time
+
+import fakeredis
+import pytest
+
+import backend.services.cache as cache_module
+from backend.config import get_settings
+from backend.services.cache import CacheService, prune_periodically
+
+KEY = "ab" + "2" * 62
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    monkeypatch.setenv("LOGODETH_CACHE_LAYOUT", "bucketed")
+    get_settings.cache_clear()
+    monkeypatch.setattr(cache_module, "_fallback_checked", True)
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(cache_module, "get_redis_client", lambda role="primary": client)
+    yield client
+    get_settings.cache_clear()
+
+
+@pytest.fixture
+def cache(redis_client):
+    return CacheService()
+
+
+async def expire(cache, client, key, value):
+    """Store an entry whose value expired ten seconds ago, still indexed"""
+    bucket, field = cache.layout._locate(key)
+    await client.hset(bucket, field, cache.layout.encode(key, value, time.time() - 10))
+    await client.zadd(cache.expires_index, {key: time.time() - 10})
+    await client.zadd(cache.created_index, {key: time.time() - 100})
+
+
+def test_reading_an_expired_field_removes_it(cache, redis_client):
+    async def scenario():
+        await expire(cache, redis_client, KEY, {"band_name": "Mayhem", "confidence": 90})
+        assert await cache.get(KEY) is None
+        bucket, field = cache.layout._locate(KEY)
+        return (
+            await redis_client.hexists(bucket, field),
+            await redis_client.zscore(cache.expires_index, KEY),
+            await redis_client.zscore(cache.created_index, KEY),
+        )
+
+    assert asyncio.run(scenario()) == (False, None, None)
+
+
+def test_writes_replace_expired_fields_but_keep_live_ones(cache, redis_client):
+    other = "cd" + "2" * 62
+
+    async def scenario():
+        await expire(cache, redis_client, KEY, {"band_name": "Mayhem", "confidence": 90})
+        await cache.set(other, {"band_name": "Emperor", "confidence": 90})
+
+        await cache.set(KEY, {"band_name": "Darkthrone", "confidence": 90}, only_if_missing=True)
+        await cache.set(other, {"band_name": "Burzum", "confidence": 90}, only_if_missing=True)
+        return (
+            await cache.get(KEY),
+            await cache.get(other),
+            await redis_client.zscore(cache.expires_index, KEY),
+        )
+
+    replaced, kept, expires_at = asyncio.run(scenario())
+    assert replaced["band_name"] == "Darkthrone"
+    assert kept["band_name"] == "Emperor"
+    assert expires_at > time.time()
+
+
+def test_stats_do_not_prune(cache, redis_client):
+    async def scenario():
+        await expire(cache, redis_client, KEY, {"band_name": "Mayhem", "confidence": 90})
+        # fakeredis has no INFO, so the stats pipeline fails; pruning used to happen before it
+        await cache.get_stats()
+        return await redis_client.zscore(cache.expires_index, KEY)
+
+    assert asyncio.run(scenario()) is not None
+
+
+def test_expired_entries_are_pruned_in_the_background(cache, redis_client):
+    async def scenario():
+        await expire(cache, redis_client, KEY, {"band_name": "Mayhem", "confidence": 90})
+        pruner = asyncio.create_task(prune_periodically(1))
+        await asyncio.sleep(1.2)
+        pruner.cancel()
+        bucket, field = cache.layout._locate(KEY)
+        return await redis_client.hexists(bucket, field), await redis_client.zcard(cache.expires_index)
+
+    assert asyncio.run(scenario()) == (False, 0)
+
+
+def test_invalidating_by_model_version_matches_bucketed_tags(cache, redis_client):
+    async def scenario():
+        await cache.set(KEY, {"band_name": "Mayhem", "confidence": 90}, version="gpt-4o:prompt-v1")
+        await cache.set("cd" + "2" * 62, {"band_name": "Emperor", "confidence": 90}, version="gpt-4o:prompt-v2")
+        progress = None
+        async for progress in cache.invalidate(model_version="gpt-4o:prompt-v1"):
+            pass
+        return progress, await cache.get(KEY)
+
+    progress, value = asyncio.run(scenario())
+    assert progress == {"scanned": 2, "matched": 1, "deleted": 1}
+    assert value is None
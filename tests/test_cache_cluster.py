@@ -0,0 +1,87 @@
+"""
+CacheService against a Redis Cluster and a standalone read replica
+
+Skipped unless the local multi-node setup is running:
+
+    docker compose -f docker-compose.cluster.yml up -d
+    LOGODETH_TEST_REDIS_CLUSTER_URL=redis://localhost:7000 \
+    LOGODETH_TEST_REDIS_REPLICA_URLS=redis://localhost:6380,redis://localhost:6381 \
+        pytest tests/test_cache_cluster.py
+"""
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+from backend.config import get_settings
+from backend.services.cache import CacheService, close_redis_clients
+
+CLUSTER_URL = os.getenv("LOGODETH_TEST_REDIS_CLUSTER_URL")
+REPLICA_URLS = os.getenv("LOGODETH_TEST_REDIS_REPLICA_URLS")
+
+
+def configure(**env: str) -> None:
+    """Point settings at the given Redis setup"""
+    for name in ("REDIS_URL", "REDIS_CLUSTER", "REDIS_REPLICA_URL", "CACHE_LAYOUT"):
+        os.environ.pop(f"LOGODETH_{name}", None)
+    os.environ.update({f"LOGODETH_{name}": value for name, value in env.items()})
+    get_settings.cache_clear()
+
+
+async def round_trip(layout: str, replica_lag: float = 0.0) -> None:
+    """Write, read, invalidate and count entries spread over many slots"""
+    os.environ["LOGODETH_CACHE_LAYOUT"] = layout
+    get_settings.cache_clear()
+    cache = CacheService()
+    keys = [hashlib.sha256(f"{layout}{i}".encode()).hexdigest() for i in range(50)]
+    try:
+        async for _ in cache.invalidate():
+            pass
+
+        for i, key in enumerate(keys):
+            await cache.set(key, {"band_name": f"Band {i}", "confidence": i * 2}, version="test")
+        await asyncio.sleep(replica_lag)
+
+        assert (await cache.get(keys[0]))["band_name"] == "Band 0"
+        assert (await cache.get_stats())["total_keys"] == len(keys)
+
+        progress = {}
+        async for progress in cache.invalidate(max_confidence=49):
+            pass
+        assert progress["deleted"] == 25
+
+        assert await cache.delete(keys[-1])
+        await asyncio.sleep(replica_lag)
+        assert await cache.get(keys[0]) is None
+        assert await cache.get(keys[-1]) is None
+        assert (await cache.get(keys[-2]))["band_name"] == "Band 48"
+    finally:
+        await cache.close()
+        configure()
+
+
+@pytest.mark.skipif(not CLUSTER_URL, reason="LOGODETH_TEST_REDIS_CLUSTER_URL not set")
+@pytest.mark.parametrize("layout", ["string", "bucketed"])
+def test_cluster_round_trip(layout):
+    configure(REDIS_URL=CLUSTER_URL, REDIS_CLUSTER="true")
+    asyncio.run(round_trip(layout, replica_lag=0.2))
+
+
+@pytest.mark.skipif(not REPLICA_URLS, reason="LOGODETH_TEST_REDIS_REPLICA_URLS not set")
+@pytest.mark.parametrize("layout", ["string", "bucketed"])
+def test_replica_round_trip(layout):
+    primary, replica = REPLICA_URLS.split(",")
+    configure(REDIS_URL=primary, REDIS_REPLICA_URL=replica)
+    asyncio.run(round_trip(layout, replica_lag=0.2))
+
+
+def test_shared_clients_are_reused():
+    configure()
+    try:
+        first, second = CacheService(), CacheService()
+        assert asyncio.run(first._get_client()) is asyncio.run(second._get_client())
+        # Without a replica, lookups go to the primary
+        assert asyncio.run(first._get_read_client()) is asyncio.run(first._get_client())
+    finally:
+        asyncio.run(close_redis_clients())
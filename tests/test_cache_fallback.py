@@ -0,0 +1,81 @@
+"""
+Redis outage handling: fail fast, serve from the local fallback store, sync back
+"""
+import asyncio
+import time
+from collections import Counter
+
+import fakeredis
+import pytest
+import redis.asyncio as redis
+
+import backend.services.cache as cache_module
+from backend.config import get_settings
+from backend.services.cache import CacheService
+
+KEY = "ab" + "1" * 62
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOGODETH_FALLBACK_CACHE_PATH", str(tmp_path / "fallback.db"))
+    monkeypatch.setenv("LOGODETH_REDIS_CIRCUIT_FAILURES", "2")
+    get_settings.cache_clear()
+    for name, value in (("_circuit", None), ("_fallback_store", None), ("_sync_task", None)):
+        monkeypatch.setattr(cache_module, name, value)
+
+    service = CacheService()
+    # Nothing listens on port 1, so every call fails with a connection error
+    service.redis_client = redis.from_url("redis://127.0.0.1:1", decode_responses=True)
+    yield service
+    get_settings.cache_clear()
+
+
+def test_outage_uses_fallback_and_fails_fast(cache):
+    async def scenario():
+        assert await cache.set(KEY, {"band_name": "Mayhem", "confidence": 90})
+        assert (await cache.get(KEY))["band_name"] == "Mayhem"
+        assert cache.circuit.is_open
+
+        # With the circuit open Redis is not touched at all
+        cache.redis_client = None
+        assert (await cache.get(KEY))["band_name"] == "Mayhem"
+        assert await cache.get_failure(KEY) is None
+
+    asyncio.run(scenario())
+
+
+def test_recovery_syncs_fallback_entries_to_redis(cache):
+    async def scenario():
+        await cache.set(KEY, {"band_name": "Mayhem", "confidence": 90})
+        await cache.get(KEY)
+        assert cache.circuit.is_open
+
+        cache.redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        cache.circuit.opened_at = time.monotonic() - cache.circuit.reset_timeout
+        assert (await cache.get(KEY)) is None  # the probe reads Redis, which is still empty
+        assert cache.circuit.state == "closed"
+
+        await cache_module._sync_task
+        assert (await cache.get(KEY))["band_name"] == "Mayhem"
+        assert cache_module.get_fallback_store().count() == 0
+
+    asyncio.run(scenario())
+
+
+def test_counters_survive_a_failed_flush(cache, monkeypatch):
+    monkeypatch.setattr(cache_module, "_pending_counters", Counter(hits=3))
+    monkeypatch.setattr(cache_module, "_pending_hits", Counter({KEY: 2}))
+
+    async def scenario():
+        await cache.get(KEY)  # fails, so nothing was sent
+        assert cache_module._pending_counters["hits"] == 3
+        assert cache_module._pending_hits[KEY] == 2
+
+        cache.redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        cache.circuit.opened_at = time.monotonic() - cache.circuit.reset_timeout
+        await cache.get(KEY)
+        assert await cache.redis_client.hget(cache.stats_key, "hits") == "3"
+        assert not cache_module._pending_hits
+
+    asyncio.run(scenario())
@@ -0,0 +1,86 @@
+"""
+Chunked cache invalidation tests
+"""
+import asyncio
+
+import fakeredis
+import pytest
+
+import backend.services.cache as cache_module
+from backend.services.cache import CacheService
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(cache_module, "_fallback_checked", True)
+    cache = CacheService()
+    cache.layout = cache.layouts[-1]  # string layout
+    cache.layouts = [cache.layout]
+    cache.redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    return cache
+
+
+async def _drain(progress):
+    last = None
+    async for last in progress:
+        pass
+    return last
+
+
+def test_undecodable_values_are_skipped_by_filters(cache):
+    good, bad = "ab" * 32, "cd" * 32
+
+    async def scenario():
+        await cache.set(good, {"band_name": "Emperor", "confidence": 90})
+        await cache.redis_client.set(cache.layout.value_key(bad), "not json")
+        progress = await _drain(cache.invalidate(band_name="emperor"))
+        return progress, await cache.redis_client.exists(cache.layout.value_key(bad))
+
+    progress, bad_left = asyncio.run(scenario())
+    assert progress == {"scanned": 2, "matched": 1, "deleted": 1}
+    assert bad_left == 1
+
+
+def test_clearing_removes_undecodable_values_and_sibling_keys(cache):
+    key, bad = "ab" * 32, "cd" * 32
+
+    async def scenario():
+        await cache.set(key, {"band_name": "Emperor", "confidence": 90})
+        await cache.redis_client.set(cache.layout.value_key(bad), "not json")
+        await cache.redis_client.set(f"{cache.negative_prefix}{key}", "{}")
+        await cache.redis_client.set(f"{cache.refresh_prefix}{key}", "1")
+        deleted = await cache.clear_all()
+        return deleted, await cache.redis_client.keys("logodeth:*")
+
+    deleted, left = asyncio.run(scenario())
+    assert deleted == 2
+    assert left == [cache.stats_key]
+
+
+def test_entries_gone_before_the_delete_are_not_counted(cache, monkeypatch):
+    kept, gone = "ab" * 32, "cd" * 32
+    scan = cache.layout.scan
+
+    async def scan_then_expire(client, chunk_size, with_values):
+        async for chunk in scan(client, chunk_size, with_values):
+            # Expires between the scan and the delete
+            await client.delete(cache.layout.value_key(gone))
+            yield chunk
+
+    monkeypatch.setattr(cache.layout, "scan", scan_then_expire)
+
+    async def scenario():
+        await cache.set(kept, {"band_name": "Emperor", "confidence": 90})
+        await cache.set(gone, {"band_name": "Emperor", "confidence": 90})
+        return await _drain(cache.invalidate(band_name="emperor"))
+
+    assert asyncio.run(scenario()) == {"scanned": 2, "matched": 2, "deleted": 1}
+
+
+def test_clear_all_survives_redis_errors(cache, monkeypatch):
+    async def failing_invalidate(*args, **kwargs):
+        raise ConnectionError("Redis went away")
+        yield
+
+    monkeypatch.setattr(cache, "invalidate", failing_invalidate)
+    assert asyncio.run(cache.clear_all()) == 0
@@ -0,0 +1,49 @@
+"""
+Popularity- and confidence-aware cache TTL tests
+"""
+import asyncio
+from collections import Counter
+
+import fakeredis
+
+import backend.services.cache as cache_module
+from backend.services.cache import CacheService
+
+
+def test_low_confidence_entries_get_short_ttl():
+    cache = CacheService()
+    settings = cache.settings
+
+    assert cache.ttl_for({"confidence": 10}) == settings.cache_min_ttl
+    assert cache.ttl_for({"confidence": 90}) == settings.cache_ttl
+
+
+def test_hits_extend_ttl_up_to_cap():
+    cache = CacheService()
+    settings = cache.settings
+
+    assert cache.ttl_for({"confidence": 90}, hits=2) == min(settings.cache_max_ttl, settings.cache_ttl * 3)
+    assert cache.ttl_for({"confidence": 90}, hits=10_000) == settings.cache_max_ttl
+    # Popular but unsure results never outlive a normal entry
+    assert cache.ttl_for({"confidence": 10}, hits=10_000) == settings.cache_ttl
+
+
+def test_only_hits_are_counted(monkeypatch):
+    monkeypatch.setattr(cache_module, "_pending_hits", Counter())
+    monkeypatch.setattr(cache_module, "_fallback_checked", True)
+    cache = CacheService()
+    cache.layout = cache.layouts[-1]  # string layout, which keeps hit counters
+    cache.redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    key = "cd" * 32
+
+    async def scenario():
+        assert await cache.get("ef" * 32) is None
+        await cache.set(key, {"band_name": "Emperor", "confidence": 90})
+        await cache.get(key)
+        await cache.get(key)
+        await cache.get("ef" * 32)  # flushes the pending hits
+        return await cache.redis_client.keys(f"{cache.hits_prefix}*"), await cache.redis_client.get(cache.layout.hits_key(key))
+
+    hit_keys, hits = asyncio.run(scenario())
+    assert hit_keys == [cache.layout.hits_key(key)]
+    assert hits == "2"
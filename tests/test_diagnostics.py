@@ -0,0 +1,71 @@
+"""
+Event loop lag monitor and admin profiling endpoints
+"""
+import asyncio
+import pstats
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import backend.routers.recognition as recognition_router
+from backend.app import app
+from backend.config import get_settings
+from backend.services.cache import CacheService
+from backend.utils.loop_monitor import LoopLagMonitor
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("LOGODETH_OPENAI_API_KEY", "test")
+    monkeypatch.setenv("LOGODETH_ADMIN_TOKEN", "s3cret")
+    get_settings.cache_clear()
+    yield TestClient(app)
+    get_settings.cache_clear()
+
+
+def test_profile_requires_the_admin_token(client):
+    response = client.post("/api/v1/admin/profile/cpu?seconds=0.1", headers={"Authorization": "Bearer wrong"})
+    assert response.status_code == 401
+
+
+def test_cpu_profile_is_a_pstats_file(client, tmp_path):
+    response = client.post(
+        "/api/v1/admin/profile/cpu?seconds=0.1",
+        headers={"Authorization": "Bearer s3cret"}
+    )
+    assert response.status_code == 200
+
+    path = tmp_path / "cpu.prof"
+    path.write_bytes(response.content)
+    pstats.Stats(str(path))
+
+
+def test_blocking_call_is_measured_as_lag():
+    async def scenario():
+        monitor = LoopLagMonitor(interval=0.01, threshold=0.05)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.2)  # Blocks the loop
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(scenario())
+    assert monitor.stats()["max"] >= 0.15
+    assert monitor.stalls == 1
+
+
+def test_redis_details_need_the_admin_token(client, monkeypatch):
+    async def get_stats(self):
+        return {"total_keys": 1, "hits": 2, "redis_memory_used": "1M", "redis_connected_clients": 3}
+
+    monkeypatch.setattr(CacheService, "get_stats", get_stats)
+    monkeypatch.setattr(recognition_router, "_cache_stats", (0.0, None))
+
+    public = client.get("/api/v1/cache/stats").json()
+    admin = client.get("/api/v1/admin/cache/stats", headers={"Authorization": "Bearer s3cret"}).json()
+
+    assert "hits" in public and "redis_memory_used" not in public
+    assert "redis_memory_used" in admin
+    assert client.get("/api/v1/admin/cache/stats").status_code == 401
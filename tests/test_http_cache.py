@@ -0,0 +1,85 @@
+"""
+Conditional GET / ETag tests for cached result lookups
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app import app
+from backend.routers.recognition import get_recognition_service
+from backend.services.recognition import RecognitionService
+
+IMAGE_HASH = "a" * 64
+
+ENTRY = {
+    "band_name": "Darkthrone",
+    "confidence": 91.0,
+    "genre": "Black Metal",
+    "description": "Jagged, symmetrical black metal lettering",
+    "ai_model": "gpt-4o",
+    "cached": False,
+    "processing_time": 0,
+    "timestamp": "2024-12-07T10:30:00",
+    "_cache_metadata": {
+        "cached_at": "2024-12-07T10:30:00",
+        "cache_key": IMAGE_HASH,
+        "ttl_seconds": 86400
+    }
+}
+
+
+class FakeRecognitionService:
+    """Serves a fixed cache entry without Redis"""
+
+    result_from_entry = staticmethod(RecognitionService.result_from_entry)
+
+    async def get_cached_entry(self, image_hash):
+        return dict(ENTRY) if image_hash == IMAGE_HASH else None
+
+    def is_current(self, entry):
+        return True
+
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[get_recognition_service] = FakeRecognitionService
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_recognition_service, None)
+
+
+def test_get_sets_validators_and_cache_control(client):
+    response = client.get(f"/api/v1/recognize/{IMAGE_HASH}")
+
+    assert response.status_code == 200
+    assert response.json()["band_name"] == "Darkthrone"
+    assert response.json()["cached"] is True
+    assert response.headers["etag"].startswith('"')
+    assert "s-maxage=" in response.headers["cache-control"]
+    assert response.headers["last-modified"] == "Sat, 07 Dec 2024 10:30:00 GMT"
+
+
+def test_if_none_match_returns_304(client):
+    etag = client.get(f"/api/v1/recognize/{IMAGE_HASH}").headers["etag"]
+
+    response = client.get(
+        f"/api/v1/recognize/{IMAGE_HASH}",
+        headers={"If-None-Match": f'W/"other", {etag}'}
+    )
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+
+def test_head_returns_headers_only(client):
+    response = client.head(f"/api/v1/recognize/{IMAGE_HASH}")
+
+    assert response.status_code == 200
+    assert "etag" in response.headers
+    assert response.content == b""
+
+
+def test_miss_is_not_cacheable(client):
+    response = client.get(f"/api/v1/recognize/{'b' * 64}")
+
+    assert response.status_code == 404
+    assert response.headers["cache-control"] == "no-store"
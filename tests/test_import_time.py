@@ -0,0 +1,51 @@
+"""
+Cold import cost of the API (Railway cold starts, scale from zero)
+
+Set LOGODETH_IMPORT_BUDGET_MS to adjust the budget on slow machines; run
+`python -X importtime -c "import backend.app"` to see where the time goes.
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+IMPORT_BUDGET_MS = float(os.getenv("LOGODETH_IMPORT_BUDGET_MS", "1200"))
+
+# Loaded on first use; the provider SDKs alone take well over a second
+DEFERRED_MODULES = ("openai", "anthropic", "magic")
+
+PROBE = f"""
+import json, sys, threading, time
+start = time.perf_counter()
+import backend.app
+print(json.dumps({{
+    "ms": (time.perf_counter() - start) * 1000,
+    "loaded": [name for name in {DEFERRED_MODULES!r} if name in sys.modules],
+    "threads": threading.active_count(),
+}}))
+"""
+
+
+def cold_import() -> dict:
+    """Import backend.app in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=Path(__file__).resolve().parents[1],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_import_defers_sdks_and_starts_no_threads():
+    probe = cold_import()
+    assert probe["loaded"] == []
+    # Threads started at import would not survive a fork into workers
+    assert probe["threads"] == 1
+
+
+def test_import_time_within_budget():
+    best = min(cold_import()["ms"] for _ in range(3))
+    assert best < IMPORT_BUDGET_MS, f"import backend.app took {best:.0f}ms (budget {IMPORT_BUDGET_MS:.0f}ms)"
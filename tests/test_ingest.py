@@ -0,0 +1,116 @@
+"""
+Offline bulk ingest of image directories and tarballs
+"""
+import asyncio
+import csv
+import hashlib
+import json
+import tarfile
+
+import pytest
+from fastapi import HTTPException
+
+import backend.services.ingest as ingest_module
+from backend.models.recognition import RecognitionResult
+from backend.services.ingest import BulkIngest
+from backend.services.recognition import RecognitionService
+
+CACHED = b"cached logo"
+BAD = b"not a logo"
+
+
+class FakeRecognitionService:
+    result_from_entry = staticmethod(RecognitionService.result_from_entry)
+
+    def __init__(self):
+        self.recognized = []
+        self.cache = {
+            hashlib.sha256(CACHED).hexdigest(): {
+                "band_name": "Emperor", "confidence": 90, "ai_model": "mock", "processing_time": 0
+            }
+        }
+
+    async def get_cached_entry(self, image_hash):
+        return self.cache.get(image_hash)
+
+    async def recognize_logo(self, image_data, filename, priority="interactive", tenant="default"):
+        assert priority == "bulk"
+        self.recognized.append(filename)
+        if image_data == BAD:
+            raise HTTPException(status_code=422, detail={"error": "no_logo", "message": "No logo found"})
+        return RecognitionResult(band_name="Mayhem", confidence=80, ai_model="mock", processing_time=0.1)
+
+
+@pytest.fixture(autouse=True)
+def fake_service(monkeypatch):
+    monkeypatch.setattr(ingest_module, "RecognitionService", FakeRecognitionService)
+
+
+def make_images(directory):
+    directory.mkdir()
+    (directory / "a.png").write_bytes(b"logo one")
+    (directory / "copy-of-a.png").write_bytes(b"logo one")
+    (directory / "b.png").write_bytes(CACHED)
+    (directory / "c.png").write_bytes(BAD)
+    (directory / "notes.txt").write_bytes(b"not an image")
+    return directory
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return {row["name"]: row for row in csv.DictReader(f)}
+
+
+def test_directory_ingest_recognizes_each_image_once(tmp_path):
+    source = make_images(tmp_path / "images")
+    output = str(tmp_path / "results.csv")
+    job = BulkIngest(str(source), output, concurrency=2, workers=1)
+
+    report = asyncio.run(job.run())
+    rows = read_rows(output)
+
+    assert sorted(rows) == ["a.png", "b.png", "c.png", "copy-of-a.png"]
+    assert rows["a.png"]["band_name"] == rows["copy-of-a.png"]["band_name"] == "Mayhem"
+    assert rows["b.png"]["status"] == "cached"
+    assert rows["c.png"]["status"] == "failed" and rows["c.png"]["error"] == "No logo found"
+    # Duplicates are recognized once, cached images not at all
+    assert len(job.service.recognized) == 2
+    assert (report.files, report.unique_images, report.cached, report.recognized, report.failed) == (4, 3, 1, 2, 1)
+
+
+def test_rerun_resumes_and_retries_failures(tmp_path):
+    source = make_images(tmp_path / "images")
+    output = str(tmp_path / "results.jsonl")
+    asyncio.run(BulkIngest(str(source), output, workers=1).run())
+
+    resumed = BulkIngest(str(source), output, workers=1)
+    report = asyncio.run(resumed.run())
+    assert resumed.service.recognized == []
+    assert report.resumed == 4
+
+    retried = BulkIngest(str(source), output, workers=1, retry_failed=True)
+    asyncio.run(retried.run())
+    assert retried.service.recognized == ["c.png"]
+    with open(output, encoding="utf-8") as f:
+        assert [json.loads(line)["name"] for line in f].count("c.png") == 2
+
+
+def test_tarball_ingest(tmp_path):
+    source = make_images(tmp_path / "images")
+    archive = tmp_path / "images.tar.gz"
+    with tarfile.open(archive, "w:gz") as tar:
+        for file in sorted(source.iterdir()):
+            tar.add(file, arcname=file.name)
+    output = str(tmp_path / "results.csv")
+
+    report = asyncio.run(BulkIngest(str(archive), output, workers=1).run())
+
+    assert sorted(read_rows(output)) == ["a.png", "b.png", "c.png", "copy-of-a.png"]
+    assert (report.cached, report.recognized, report.failed) == (1, 2, 1)
+
+
+def test_rejects_sources_that_are_not_directories_or_tarballs(tmp_path):
+    path = tmp_path / "image.png"
+    path.write_bytes(b"logo")
+    with pytest.raises(ValueError):
+        BulkIngest(str(path), str(tmp_path / "results.csv"))
@@ -0,0 +1,135 @@
+"""
+Recognition job queue: acknowledgements, retries and dead-lettering
+"""
+import asyncio
+from unittest.mock import ANY
+
+import fakeredis
+import pytest
+
+import backend.services.cache as cache_module
+from backend.config import get_settings
+from backend.models.recognition import RecognitionResult
+from backend.services.jobs import JobQueue
+from backend.worker import JobWorker
+
+
+class FakeService:
+    """Stands in for RecognitionService, failing the first `failures` calls"""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.calls = 0
+
+    async def recognize_logo(self, image_data, filename, original_hash=None, priority="api", tenant="default"):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("provider exploded")
+        return RecognitionResult(band_name="Emperor", confidence=95, ai_model="test", processing_time=0)
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    monkeypatch.setenv("LOGODETH_OPENAI_API_KEY", "test")
+    monkeypatch.setenv("LOGODETH_JOB_RETRY_DELAY", "1")
+    get_settings.cache_clear()
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setitem(cache_module._clients, "primary", client)
+    yield client
+    get_settings.cache_clear()
+
+
+async def run_until_final(worker: JobWorker, job_id: str) -> dict:
+    """Run the worker until the job is completed or failed"""
+    task = asyncio.create_task(worker.run())
+    job = await worker.queue.wait(job_id, timeout=10, interval=0.05)
+    worker.stop()
+    await task
+    return job
+
+
+def test_job_completes_and_is_acknowledged(redis_client):
+    async def scenario():
+        worker = JobWorker()
+        worker.service = FakeService()
+        job_id = await worker.queue.submit(b"logo", "logo.png")
+
+        job = await run_until_final(worker, job_id)
+        assert job["status"] == JobQueue.COMPLETED
+        assert job["result"]["band_name"] == "Emperor"
+        assert (await redis_client.xpending(worker.queue.stream, worker.queue.group))["pending"] == 0
+        # Finished jobs leave the stream
+        assert await redis_client.xlen(worker.queue.stream) == 0
+
+    asyncio.run(scenario())
+
+
+def test_job_is_retried_then_dead_lettered(redis_client, monkeypatch):
+    monkeypatch.setenv("LOGODETH_JOB_MAX_ATTEMPTS", "2")
+    get_settings.cache_clear()
+
+    async def scenario():
+        worker = JobWorker()
+        worker.service = FakeService(failures=5)
+        job_id = await worker.queue.submit(b"logo", "logo.png")
+
+        job = await run_until_final(worker, job_id)
+        assert job["status"] == JobQueue.FAILED
+        assert job["attempts"] == 2
+        assert worker.service.calls == 2
+        dead = await redis_client.xrange(worker.queue.dead_letter)
+        assert [fields["job_id"] for _, fields in dead] == [job_id]
+        assert await redis_client.xlen(worker.queue.stream) == 0
+
+    asyncio.run(scenario())
+
+
+def test_expired_job_is_dropped_without_recreating_it(redis_client):
+    async def scenario():
+        worker = JobWorker()
+        worker.service = FakeService()
+        job_id = await worker.queue.submit(b"logo", "logo.png")
+        await redis_client.delete(worker.queue._job_key(job_id), worker.queue._image_key(job_id))
+        await worker.queue.ensure_group()
+
+        [(stream, message_id, claimed)] = await worker.queue.claim(worker.consumer, 1, block_ms=0)
+        await worker.process(stream, message_id, claimed)
+
+        assert worker.service.calls == 0
+        assert await redis_client.exists(worker.queue._job_key(job_id)) == 0
+        assert await redis_client.xlen(worker.queue.stream) == 0
+        assert (await redis_client.xpending(worker.queue.stream, worker.queue.group))["pending"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_api_jobs_are_taken_before_bulk_jobs(redis_client):
+    async def scenario():
+        queue = JobQueue()
+        await queue.ensure_group()
+        bulk = [await queue.submit(b"bulk", "bulk.png", priority="bulk") for _ in range(3)]
+        api = await queue.submit(b"api", "api.png")
+
+        claimed = await queue.claim("worker", 2, block_ms=100)
+        assert [job_id for _, _, job_id in claimed] == [api, bulk[0]]
+        assert [stream for stream, _, _ in claimed] == [queue.stream, queue.bulk_stream]
+
+        depth = await queue.depth()
+        assert (depth["waiting"], depth["processing"]) == (2, 2)
+
+    asyncio.run(scenario())
+
+
+def test_bulk_retries_go_back_to_the_bulk_stream(redis_client):
+    async def scenario():
+        queue = JobQueue()
+        await queue.ensure_group()
+        job_id = await queue.submit(b"bulk", "bulk.png", priority="bulk")
+        [(stream, message_id, _)] = await queue.claim("worker", 1, block_ms=100)
+        await queue.retry_or_fail(stream, message_id, job_id, "provider exploded", attempts=1)
+
+        await redis_client.zadd(queue.delayed, {job_id: 0})
+        assert await queue.claim("worker", 1, block_ms=100) == [(queue.bulk_stream, ANY, job_id)]
+        assert await redis_client.xlen(queue.stream) == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,24 @@
+"""
+Daily log files shared by worker processes
+"""
+import time
+
+from backend.utils.logging import dated_file_writer
+
+
+def test_writers_share_the_day_file_and_prune_old_ones(tmp_path):
+    old = time.strftime("%Y-%m-%d", time.localtime(time.time() - 30 * 86400))
+    recent = time.strftime("%Y-%m-%d", time.localtime(time.time() - 86400))
+    (tmp_path / f"app_{old}.log").write_text("old\n")
+    (tmp_path / f"app_{recent}.log").write_text("yesterday\n")
+    (tmp_path / "other.log").write_text("not ours\n")
+
+    first = dated_file_writer(str(tmp_path / "app.log"))
+    second = dated_file_writer(str(tmp_path / "app.log"))
+    first("one\n")
+    second("two\n")
+    first("three\n")
+
+    today = tmp_path / f"app_{time.strftime('%Y-%m-%d')}.log"
+    assert today.read_text() == "one\ntwo\nthree\n"
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted([today.name, f"app_{recent}.log", "other.log"])
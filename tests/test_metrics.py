@@ -0,0 +1,22 @@
+"""
+Prometheus metrics endpoint
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+pytest.importorskip("prometheus_client")
+
+from backend.app import app
+from backend.utils.metrics import track_stage
+
+
+def test_metrics_exposes_stage_histograms():
+    with track_stage("hashing"):
+        pass
+
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'logodeth_stage_duration_seconds_count{stage="hashing"}' in response.text
+    assert "logodeth_requests_in_flight" in response.text
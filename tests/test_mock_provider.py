@@ -0,0 +1,64 @@
+"""
+Mock LLM provider used by the load tests
+"""
+import asyncio
+import socket
+import threading
+import time
+
+import httpx
+import pytest
+import uvicorn
+from fastapi.testclient import TestClient
+
+from backend.config import get_settings
+from backend.services.llm_client import LLMClient
+from tests.load.mock_provider import MockConfig, answer_for, create_app
+
+
+@pytest.fixture
+def mock_url():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(
+        create_app(MockConfig(latency="fixed:0.01", seed=1)), host="127.0.0.1", port=port, log_level="warning"
+    ))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+def test_llm_client_parses_mock_answers(monkeypatch, mock_url):
+    monkeypatch.setenv("LOGODETH_OPENAI_API_KEY", "mock")
+    monkeypatch.setenv("LOGODETH_OPENAI_BASE_URL", f"{mock_url}/v1")
+    get_settings.cache_clear()
+    try:
+        result = asyncio.run(LLMClient().recognize_with_openai("aGVsbG8="))
+    finally:
+        get_settings.cache_clear()
+
+    expected = answer_for("data:image/jpeg;base64,aGVsbG8=")
+    assert f'"band_name": "{result["band_name"]}"' in expected
+    assert httpx.get(f"{mock_url}/_mock/stats").json()["calls"] == {"openai": {"ok": 1}}
+
+
+def test_injected_rate_limits_use_provider_error_format():
+    client = TestClient(create_app(MockConfig(latency="fixed:0", rate_limit_rate=1.0, retry_after=3)))
+    body = {"model": "claude", "messages": [{"role": "user", "content": [{"type": "image", "source": {"data": "x"}}]}]}
+
+    response = client.post("/v1/messages", json=body)
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "3"
+    assert response.json()["error"]["type"] == "rate_limit_error"
+    assert client.get("/_mock/stats").json()["calls"] == {"anthropic": {"rate_limited": 1}}
+
+    assert client.put("/_mock/config", json={"error_rate": 0.5}).status_code == 400
+    assert client.put("/_mock/config", json={"rate_limit_rate": 0, "malformed_rate": 1}).status_code == 200
+    assert client.post("/v1/messages", json=body).status_code == 200
@@ -0,0 +1,99 @@
+"""
+Passive provider health and the cached /health report
+"""
+import asyncio
+import time
+
+import fakeredis
+import httpx
+import openai
+import pytest
+from fastapi.testclient import TestClient
+
+import backend.services.cache as cache_module
+import backend.services.health as health_module
+import backend.utils.provider_health as provider_health_module
+from backend.app import app
+from backend.config import get_settings
+from backend.services.health import HealthMonitor
+from backend.utils.metrics import track_provider
+from backend.utils.provider_health import ProviderHealth, is_provider_failure, provider_health
+
+
+def test_status_follows_recent_calls():
+    health = ProviderHealth("openai", window=0.05)
+    assert health.snapshot()["status"] == "unknown"
+
+    for _ in range(9):
+        health.record(True, 0.2)
+    health.record(False, 1.0, "RateLimitError")
+    snapshot = health.snapshot()
+    assert (snapshot["status"], snapshot["calls"], snapshot["success_rate"]) == ("ok", 10, 0.9)
+    assert snapshot["latency_ms"] == {"p50": 200.0, "p95": 200.0}
+    assert snapshot["last_error"] == "RateLimitError"
+
+    time.sleep(0.06)
+    health.record(False, 1.0, "APIConnectionError")
+    health.record(False, 1.0, "APIConnectionError")
+    # A couple of failures are not enough to call a provider down
+    assert health.snapshot()["status"] == "degraded"
+    health.record(False, 1.0, "APIConnectionError")
+    assert health.snapshot()["status"] == "down"
+
+
+def status_error(status: int) -> openai.APIStatusError:
+    response = httpx.Response(status, request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+    return openai.APIStatusError("provider error", response=response, body=None)
+
+
+@pytest.mark.parametrize("error, failure", [
+    (status_error(500), True),
+    (status_error(503), True),
+    (status_error(401), True),
+    (status_error(403), True),
+    (status_error(429), True),
+    (openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com")), True),
+    (openai.APITimeoutError(request=httpx.Request("POST", "https://api.openai.com")), True),
+    (asyncio.TimeoutError(), True),
+    (status_error(400), False),
+    (status_error(422), False),
+    (ValueError("content refused"), False),
+])
+def test_only_provider_side_errors_are_failures(error, failure):
+    assert is_provider_failure(error) is failure
+
+
+def test_track_provider_records_failures_but_not_rejections_or_cancellations(monkeypatch):
+    monkeypatch.setattr(provider_health_module, "_providers", {})
+    calls = provider_health("test-provider").calls
+    with pytest.raises(openai.APIStatusError):
+        with track_provider("test-provider", "model"):
+            raise status_error(503)
+    with pytest.raises(openai.APIStatusError):
+        with track_provider("test-provider", "model"):
+            raise status_error(400)
+    with pytest.raises(asyncio.CancelledError):
+        with track_provider("test-provider", "model"):
+            raise asyncio.CancelledError()
+    with track_provider("test-provider", "model"):
+        pass
+
+    assert [ok for _, ok, _ in calls] == [False, True]
+
+
+def test_health_serves_the_cached_report(monkeypatch):
+    monkeypatch.setenv("LOGODETH_OPENAI_API_KEY", "test")
+    get_settings.cache_clear()
+    # No calls recorded by other tests, so the provider is unknown
+    monkeypatch.setattr(provider_health_module, "_providers", {})
+    monkeypatch.setitem(cache_module._clients, "primary", fakeredis.FakeAsyncRedis(decode_responses=True))
+    monitor = HealthMonitor()
+    asyncio.run(monitor.refresh())
+    monkeypatch.setattr(health_module, "_monitor", monitor)
+
+    report = TestClient(app).get("/health").json()
+
+    assert report["status"] == "healthy"
+    assert report["checks"]["redis"]["status"] == "ok"
+    assert report["checks"]["queue"] == {"waiting": 0, "processing": 0, "delayed": 0}
+    assert report["checks"]["providers"]["openai"]["status"] == "unknown"
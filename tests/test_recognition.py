@@ -0,0 +1,179 @@
+"""
+Recognition service: per-image failure tracking and stale-entry refreshes
+"""
+import asyncio
+
+import fakeredis
+import httpx
+import openai
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+
+import backend.routers.recognition as recognition_router
+import backend.services.cache as cache_module
+import backend.services.recognition as recognition_module
+from backend.app import app
+from backend.routers.recognition import get_recognition_service
+from backend.services.cache import CacheService
+from backend.services.recognition import RecognitionService
+
+IMAGE_HASH = "ab" * 32
+
+
+def status_error(status: int) -> openai.APIStatusError:
+    response = httpx.Response(status, request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+    return openai.APIStatusError("provider error", response=response, body=None)
+
+
+class FailingClient:
+    def __init__(self, error):
+        self.error = error
+
+    async def recognize_with_openai(self, base64_image):
+        raise self.error
+
+
+class RecordingCache:
+    def __init__(self):
+        self.failures = []
+
+    async def record_failure(self, key, error):
+        self.failures.append(key)
+
+
+@pytest.fixture
+def service():
+    service = RecognitionService()
+    service.settings = service.settings.model_copy(update={"anthropic_api_key": None})
+    service.cache = RecordingCache()
+    return service
+
+
+def call_providers(service, error) -> list:
+    service.llm_client = FailingClient(error)
+    with pytest.raises(Exception):
+        asyncio.run(service._call_providers("", IMAGE_HASH))
+    return service.cache.failures
+
+
+@pytest.mark.parametrize("error", [
+    status_error(500),
+    status_error(503),
+    status_error(429),
+    status_error(401),
+    openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com")),
+    openai.APITimeoutError(request=httpx.Request("POST", "https://api.openai.com")),
+    asyncio.TimeoutError(),
+])
+def test_provider_outages_do_not_count_against_the_image(service, error):
+    assert call_providers(service, error) == []
+
+
+@pytest.mark.parametrize("error", [
+    status_error(400),
+    ValueError("Could not parse provider response"),
+])
+def test_rejected_images_and_unparseable_answers_count(service, error):
+    assert call_providers(service, error) == [IMAGE_HASH]
+
+
+class StaleCache:
+    """Serves one entry from an older model version"""
+
+    def __init__(self):
+        self.locks = []
+
+    async def get(self, key):
+        return {"band_name": "Emperor", "confidence": 90, "ai_model": "gpt-4o", "processing_time": 0,
+                "_cache_metadata": {"version": "old"}}
+
+    @staticmethod
+    def is_current(value, version):
+        return value["_cache_metadata"]["version"] == version
+
+    async def acquire_refresh_lock(self, key, ttl):
+        self.locks.append(key)
+        await asyncio.sleep(0)  # Redis round trip
+        return True
+
+
+def test_stale_entry_is_served_and_refreshed_within_the_cap(service, monkeypatch):
+    monkeypatch.setattr(recognition_module, "_refreshes_running", 0)
+    service.settings = service.settings.model_copy(update={"refresh_concurrency": 2})
+    service.cache = StaleCache()
+    refreshed = []
+
+    async def refresh_entry(key, image_data):
+        refreshed.append(key)
+        await asyncio.sleep(0.01)
+
+    monkeypatch.setattr(service, "_refresh_entry", refresh_entry)
+
+    async def scenario():
+        images = [bytes([n]) for n in range(5)]
+        results = await asyncio.gather(*(service.recognize_logo(image, "logo.png") for image in images))
+        await asyncio.gather(*recognition_module._refresh_tasks)
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(result.cached and result.band_name == "Emperor" for result in results)
+    # Five stale hits at once, but only two refresh slots
+    assert len(service.cache.locks) == len(refreshed) == 2
+    assert recognition_module._refreshes_running == 0
+
+
+class RecognizingClient:
+    result_version = "new"
+
+    async def recognize_with_openai(self, base64_image):
+        return {"band_name": "Darkthrone", "confidence": 80}
+
+
+def test_stale_entry_under_a_client_hash_is_never_overwritten(service, monkeypatch):
+    monkeypatch.setattr(recognition_module, "_refreshes_running", 0)
+    monkeypatch.setattr(cache_module, "_fallback_checked", True)
+    cache = CacheService()
+    cache.redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    service.cache = cache
+    service.llm_client = RecognizingClient()
+    upload = b"unrelated bytes"
+
+    async def scenario():
+        entry = {"band_name": "Emperor", "confidence": 90, "ai_model": "gpt-4o", "processing_time": 0}
+        await cache.set(IMAGE_HASH, entry, version="old")
+        result = await service.recognize_logo(upload, "logo.png", original_hash=IMAGE_HASH)
+        await asyncio.gather(*recognition_module._refresh_tasks)
+        return result, await cache.get(IMAGE_HASH), await cache.get(service.hash_image(upload))
+
+    result, claimed, uploaded = asyncio.run(scenario())
+    assert result.cached and result.band_name == "Emperor"
+    assert claimed["band_name"] == "Emperor" and claimed["_cache_metadata"]["version"] == "old"
+    # The refresh only wrote the entry for the bytes actually uploaded
+    assert uploaded["band_name"] == "Darkthrone"
+
+
+def test_lookup_treats_stale_entries_as_misses(service, monkeypatch):
+    service.cache = StaleCache()
+    app.dependency_overrides[get_recognition_service] = lambda: service
+    try:
+        response = TestClient(app).get(f"/api/v1/recognize/{IMAGE_HASH}")
+    finally:
+        app.dependency_overrides.pop(get_recognition_service, None)
+
+    assert response.status_code == 404
+
+
+def make_request(headers):
+    raw = [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "headers": raw, "client": ("203.0.113.7", 4321)})
+
+
+def test_tenant_header_is_ignored_unless_trusted(monkeypatch):
+    request = make_request({"X-Tenant-ID": "someone-else"})
+    monkeypatch.setattr(recognition_router, "settings", recognition_router.settings.model_copy(update={"trust_tenant_header": False}))
+    assert recognition_router.get_tenant(request) == "203.0.113.7"
+
+    monkeypatch.setattr(recognition_router, "settings", recognition_router.settings.model_copy(update={"trust_tenant_header": True}))
+    assert recognition_router.get_tenant(request) == "someone-else"
+    assert recognition_router.get_tenant(make_request({})) == "203.0.113.7"
@@ -0,0 +1,96 @@
+"""
+Provider call scheduling: reserved interactive capacity and fairness between tenants
+"""
+import asyncio
+
+from backend.services.scheduler import LLMScheduler
+
+
+def make_scheduler(capacity: int = 2, reserved: int = 1) -> LLMScheduler:
+    return LLMScheduler(capacity, reserved, {"interactive": 8, "api": 4, "bulk": 1})
+
+
+def test_bulk_cannot_take_reserved_slots():
+    async def scenario():
+        scheduler = make_scheduler()
+        await scheduler.acquire("bulk", "a")
+        waiting = asyncio.create_task(scheduler.acquire("bulk", "a"))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+
+        # The reserved slot still admits interactive traffic straight away
+        await asyncio.wait_for(scheduler.acquire("interactive", "b"), timeout=1)
+
+        scheduler.release("interactive")
+        await asyncio.sleep(0)
+        assert not waiting.done()
+
+        scheduler.release("bulk")
+        await asyncio.sleep(0)
+        assert waiting.done()
+
+    asyncio.run(scenario())
+
+
+def test_tenants_share_a_class_fairly():
+    async def scenario():
+        scheduler = make_scheduler(capacity=1, reserved=0)
+        await scheduler.acquire("bulk", "setup")
+        order = []
+
+        async def request(tenant: str) -> None:
+            async with scheduler.slot("bulk", tenant):
+                order.append(tenant)
+
+        # One tenant floods the queue before another sends a single request
+        tasks = [asyncio.create_task(request("flood")) for _ in range(5)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(request("other")))
+        await asyncio.sleep(0)
+
+        scheduler.release("bulk")
+        await asyncio.gather(*tasks)
+        assert order.index("other") <= 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiters_do_not_leak_slots():
+    async def scenario():
+        scheduler = make_scheduler(capacity=1, reserved=0)
+        await scheduler.acquire("api", "a")
+        waiting = asyncio.create_task(scheduler.acquire("api", "b"))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.sleep(0)
+
+        scheduler.release("api")
+        await asyncio.wait_for(scheduler.acquire("api", "c"), timeout=1)
+        assert scheduler.stats()["api"] == {"in_flight": 1, "queued": 0}
+
+    asyncio.run(scenario())
+
+
+def test_class_share_does_not_grow_with_its_tenants():
+    async def scenario():
+        scheduler = make_scheduler(capacity=1, reserved=0)
+        await scheduler.acquire("bulk", "setup")
+        order = []
+
+        async def request(priority: str, tenant: str) -> None:
+            async with scheduler.slot(priority, tenant):
+                order.append(priority)
+                await asyncio.sleep(0)
+
+        # One api tenant against twenty bulk tenants, all with plenty queued
+        tasks = [asyncio.create_task(request("api", "api-client")) for _ in range(100)]
+        tasks += [asyncio.create_task(request("bulk", f"bulk-{n}")) for n in range(20) for _ in range(5)]
+        await asyncio.sleep(0)
+
+        scheduler.release("bulk")
+        await asyncio.gather(*tasks)
+        return order[:100]
+
+    first = asyncio.run(scenario())
+    # Weights 4:1, so api gets about four of every five grants
+    assert 75 <= first.count("api") <= 85
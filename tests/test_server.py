@@ -0,0 +1,42 @@
+"""
+Production launcher settings
+"""
+import runpy
+
+import pytest
+
+from backend import server
+from backend.config import Settings
+
+
+def test_worker_count_defaults_to_available_cpus():
+    assert server.worker_count(Settings(worker_count=3)) == 3
+    assert server.worker_count(Settings()) == server.available_cpus() >= 1
+
+
+@pytest.mark.parametrize("files, expected", [
+    ({"cpu.max": "150000 100000\n"}, 1.5),
+    ({"cpu.max": "max 100000\n"}, None),
+    ({"cpu/cpu.cfs_quota_us": "200000\n", "cpu/cpu.cfs_period_us": "100000\n"}, 2.0),
+    ({"cpu/cpu.cfs_quota_us": "-1\n", "cpu/cpu.cfs_period_us": "100000\n"}, None),
+    ({}, None),
+])
+def test_cgroup_cpu_quota(tmp_path, files, expected):
+    for name, content in files.items():
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).write_text(content)
+    assert server.cgroup_cpu_quota(tmp_path) == expected
+
+
+def test_gunicorn_config_follows_settings(monkeypatch):
+    pytest.importorskip("gunicorn")
+    monkeypatch.setenv("PORT", "9100")
+    monkeypatch.setattr("backend.config.get_settings", lambda: Settings(worker_count=2, worker_max_requests=500))
+
+    config = runpy.run_path(str(server.CONFIG_PATH))
+
+    assert config["bind"].endswith(":9100")
+    assert config["workers"] == 2
+    assert config["max_requests"] == 500
+    assert config["max_requests_jitter"] == 50
+    assert config["worker_class"] == "uvicorn.workers.UvicornWorker"
@@ -0,0 +1,23 @@
+"""
+Server-Timing header on API responses
+"""
+import fakeredis
+from fastapi.testclient import TestClient
+
+import backend.services.cache as cache_module
+from backend.app import app
+from backend.config import get_settings
+
+
+def test_cache_lookup_is_reported_in_server_timing(monkeypatch):
+    monkeypatch.setenv("LOGODETH_OPENAI_API_KEY", "test")
+    get_settings.cache_clear()
+    monkeypatch.setattr(app, "dependency_overrides", {})
+    monkeypatch.setitem(cache_module._clients, "primary", fakeredis.FakeAsyncRedis(decode_responses=True))
+
+    response = TestClient(app).get(f"/api/v1/recognize/{'0' * 64}")
+
+    assert response.status_code == 404
+    stages = dict(entry.split(";dur=") for entry in response.headers["server-timing"].split(", "))
+    assert set(stages) >= {"cache_get", "total"}
+    assert float(stages["cache_get"]) <= float(stages["total"])
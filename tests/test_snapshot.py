@@ -0,0 +1,95 @@
+"""
+Cache snapshot export, import and warm start
+"""
+import asyncio
+import gzip
+import json
+
+import fakeredis
+import pytest
+
+import backend.services.cache as cache_module
+from backend.services.cache import CacheService
+from backend.services.snapshot import export_snapshot, import_snapshot, warm_cache
+
+KEYS = ["ab" * 32, "cd" * 32, "ef" * 32]
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    monkeypatch.setattr(cache_module, "_fallback_checked", True)
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(cache_module, "get_redis_client", lambda role="primary": client)
+    return client
+
+
+async def drain(progress):
+    last = None
+    async for last in progress:
+        pass
+    return last
+
+
+def test_snapshot_round_trip_keeps_metadata(redis_client, tmp_path):
+    path = str(tmp_path / "cache.jsonl.gz")
+    cache = CacheService()
+
+    async def scenario():
+        for i, key in enumerate(KEYS):
+            await cache.set(key, {"band_name": f"Band {i}", "confidence": 90}, version="v1")
+        exported = await drain(export_snapshot(cache, path, chunk_size=2))
+        originals = {key: await cache.get(key) for key in KEYS}
+
+        await redis_client.flushall()
+        imported = await drain(import_snapshot(cache, path, batch_size=2))
+        return exported, imported, originals, {key: await cache.get(key) for key in KEYS}
+
+    exported, imported, originals, restored = asyncio.run(scenario())
+    assert exported == imported == len(KEYS)
+    for key in KEYS:
+        assert restored[key]["band_name"] == originals[key]["band_name"]
+        assert restored[key]["_cache_metadata"]["cached_at"] == originals[key]["_cache_metadata"]["cached_at"]
+        assert CacheService.is_current(restored[key], "v1")
+
+
+def test_import_keeps_existing_entries_unless_overwriting(redis_client, tmp_path):
+    path = tmp_path / "cache.jsonl.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"format": "logodeth-cache-snapshot", "version": 1}) + "\n")
+        f.write(json.dumps({"k": KEYS[0], "v": {"band_name": "Imported", "confidence": 90}}) + "\n")
+    cache = CacheService()
+
+    async def scenario():
+        await cache.set(KEYS[0], {"band_name": "Existing", "confidence": 90})
+        await drain(import_snapshot(cache, str(path)))
+        kept = (await cache.get(KEYS[0]))["band_name"]
+        await drain(import_snapshot(cache, str(path), overwrite=True))
+        return kept, (await cache.get(KEYS[0]))["band_name"]
+
+    assert asyncio.run(scenario()) == ("Existing", "Imported")
+
+
+def test_import_rejects_other_files(redis_client, tmp_path):
+    path = tmp_path / "other.jsonl.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"k": KEYS[0], "v": {}}) + "\n")
+
+    with pytest.raises(ValueError):
+        asyncio.run(drain(import_snapshot(CacheService(), str(path))))
+
+
+def test_only_one_worker_warms_the_cache(redis_client, tmp_path):
+    path = str(tmp_path / "cache.jsonl.gz")
+    cache = CacheService()
+
+    async def scenario():
+        await cache.set(KEYS[0], {"band_name": "Mayhem", "confidence": 90})
+        await drain(export_snapshot(cache, path))
+        await redis_client.flushall()
+        return await warm_cache(path), await warm_cache(path)
+
+    assert asyncio.run(scenario()) == (1, 0)
+
+
+def test_missing_warm_snapshot_is_skipped(redis_client, tmp_path):
+    assert asyncio.run(warm_cache(str(tmp_path / "missing.jsonl.gz"))) == 0
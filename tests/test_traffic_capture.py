@@ -0,0 +1,83 @@
+"""
+Traffic capture for replay
+"""
+import json
+import os
+
+import fakeredis
+from fastapi.testclient import TestClient
+
+import backend.routers.recognition as recognition_router
+import backend.services.cache as cache_module
+from backend.app import app
+from backend.config import get_settings
+from backend.models.recognition import RecognitionResult
+from backend.routers.recognition import get_recognition_service
+from backend.utils import traffic
+
+
+def trace_file(directory):
+    (path,) = directory.glob(f"traffic-{os.getpid()}_*.jsonl")
+    return path
+
+
+def test_lookups_are_traced_without_the_image_hash(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOGODETH_OPENAI_API_KEY", "test")
+    get_settings.cache_clear()
+    monkeypatch.setattr(app, "dependency_overrides", {})
+    monkeypatch.setitem(cache_module._clients, "primary", fakeredis.FakeAsyncRedis(decode_responses=True))
+    recorder = traffic.start_traffic_capture(str(tmp_path), "secret")
+    try:
+        response = TestClient(app).get(f"/api/v1/recognize/{'ab' * 32}")
+    finally:
+        traffic.stop_traffic_capture()
+
+    assert response.status_code == 404
+    (line,) = trace_file(tmp_path).read_text().splitlines()
+    event = json.loads(line)
+    assert event["kind"] == "lookup"
+    assert event["image"] == recorder.image_id("ab" * 32) != "ab" * 32
+    assert (event["outcome"], event["status"]) == ("not_found", 404)
+    assert "cache_get" in event["ms"] and event["ms"]["total"] >= event["ms"]["cache_get"]
+
+
+def test_capture_needs_an_explicit_key(tmp_path):
+    assert traffic.start_traffic_capture(str(tmp_path), None) is None
+    with traffic.capture_traffic("upload") as event:
+        assert event.recorder is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_uploads_are_traced_with_the_recognition_hash(monkeypatch, tmp_path):
+    content = b"\x89PNG logo"
+    hashed = []
+
+    class FakeRecognitionService:
+        def hash_image(self, image_data):
+            hashed.append(image_data)
+            return "cd" * 32
+
+        async def recognize_logo(self, image_data, filename, original_hash=None, priority="interactive",
+                                 tenant="default", image_hash=None):
+            assert image_hash == "cd" * 32
+            return RecognitionResult(band_name="Emperor", confidence=90, ai_model="test", processing_time=0,
+                                     cached=True)
+
+    async def allow(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(recognition_router, "check_request_limits", allow)
+    monkeypatch.setattr(recognition_router, "validate_image_file", allow)
+    monkeypatch.setattr(app, "dependency_overrides", {get_recognition_service: FakeRecognitionService})
+    recorder = traffic.start_traffic_capture(str(tmp_path), "secret")
+    try:
+        response = TestClient(app).post("/api/v1/recognize", files={"file": ("logo.png", content, "image/png")})
+    finally:
+        traffic.stop_traffic_capture()
+
+    assert response.status_code == 200
+    assert hashed == [content]
+    (line,) = trace_file(tmp_path).read_text().splitlines()
+    event = json.loads(line)
+    assert (event["kind"], event["bytes"], event["outcome"]) == ("upload", len(content), "hit")
+    assert event["image"] == recorder.image_id("cd" * 32)
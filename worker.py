@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+"""
+Recognition job worker entry point for LOGODETH
+"""
+import sys
+from pathlib import Path
+
+# Ensure backend is in path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.worker import main
+
+if __name__ == "__main__":
+    main()